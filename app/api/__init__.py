@@ -1,9 +1,26 @@
 from fastapi import APIRouter
 
 from .predict import router as predict_router
+from .predict_stream import router as predict_stream_router
+from .predict_file import router as predict_file_router
+from .jobs import router as jobs_router
 from .logs import router as logs_router
+from .stats import router as stats_router
+from .admin import router as admin_router
+
+from app.core.config import get_settings
 
 router = APIRouter()
+if get_settings().DB_ASYNC:
+    # enregistrées en premier: ces routes async remplacent leurs équivalents synchrones
+    from .predict_async import router as predict_async_router
+
+    router.include_router(predict_async_router)
 router.include_router(predict_router)
+router.include_router(predict_stream_router)
+router.include_router(predict_file_router)
+router.include_router(jobs_router)
 router.include_router(logs_router)
+router.include_router(stats_router)
+router.include_router(admin_router)
 
@@ -0,0 +1,30 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.api.deps import get_api_key
+from app.ml.reload import model_reloader
+from app.ml.serve import ModelValidationError
+
+router = APIRouter()
+
+
+@router.post("/admin/model/reload", dependencies=[Depends(get_api_key)])
+def reload_model() -> Dict[str, Any]:
+    """Recharge `model.pkl` à chaud, sans redémarrer le service.
+
+    Le nouvel artefact est chargé, préchauffé et validé pendant que l'ancien
+    continue de répondre, puis substitué d'un bloc. Les requêtes en cours
+    terminent sur l'ancien modèle.
+
+    Returns:
+        Dictionnaire `{"swapped", "previous_version", "version"}` ; `swapped`
+        vaut `False` si le fichier n'a pas changé.
+
+    Raises:
+        HTTPException: 422 si l'artefact est refusé (le modèle actif est conservé).
+    """
+    try:
+        return model_reloader.reload()
+    except ModelValidationError as e:
+        raise HTTPException(status_code=422, detail=f"Modèle refusé: {e}")
@@ -0,0 +1,105 @@
+import os
+import uuid
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from starlette.concurrency import run_in_threadpool
+
+from app.api.deps import get_api_key
+from app.api.predict_file import save_upload, upload_format
+from app.api.schemas import JobResultsPage, JobStatusResponse, JobSubmitIn
+from app.core.config import get_settings
+from app.ml.jobs import job_runner
+
+router = APIRouter()
+
+
+@router.post("/jobs", response_model=JobStatusResponse, status_code=202, dependencies=[Depends(get_api_key)])
+def submit_job(body: JobSubmitIn) -> JobStatusResponse:
+    """Soumet un job de scoring sur une liste d'identifiants ou un filtre de `employee_features`.
+
+    Le job est traité en arrière-plan, par blocs de `JOBS_CHUNK_SIZE` lignes
+    dont les résultats sont enregistrés en base ; il survit à un redémarrage
+    de l'API et reprend au dernier bloc commité.
+
+    Args:
+        body: `{"ids": [...]}` ou `{"filter": {...}}`.
+
+    Returns:
+        État initial du job (`status="pending"`), dont `job_id`.
+
+    Raises:
+        HTTPException: 422 si le filtre porte sur une colonne ou un opérateur inconnu.
+    """
+    try:
+        if body.ids is not None:
+            return job_runner.submit_ids(body.ids)
+        return job_runner.submit_filter(body.filter)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@router.post("/jobs/file", response_model=JobStatusResponse, status_code=202, dependencies=[Depends(get_api_key)])
+async def submit_file_job(
+    request: Request,
+    format: Optional[str] = Query(None, description="Format du fichier envoyé (csv ou parquet)"),
+) -> JobStatusResponse:
+    """Soumet un job de scoring sur un fichier CSV ou Parquet envoyé dans le corps de la requête.
+
+    Mêmes colonnes et même traitement que `POST /predict/file` ; le fichier
+    est conservé sur disque (`JOBS_DIR`) jusqu'à la fin du job.
+
+    Raises:
+        HTTPException: 413 au-delà de `PREDICT_FILE_MAX_BYTES`, 415 si le format n'est pas reconnu.
+    """
+    settings = get_settings()
+    fmt = upload_format(request, format)
+    os.makedirs(settings.JOBS_DIR, exist_ok=True)
+    path = os.path.join(settings.JOBS_DIR, f"upload-{uuid.uuid4().hex}.{fmt}")
+    try:
+        await save_upload(request, path, settings.PREDICT_FILE_MAX_BYTES)
+        return await run_in_threadpool(job_runner.submit_file, path, fmt)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse, dependencies=[Depends(get_api_key)])
+def get_job(job_id: str) -> JobStatusResponse:
+    """État d'un job: lignes traitées, progression, débit (lignes/s) et temps restant estimé.
+
+    Raises:
+        HTTPException: 404 si le job est inconnu.
+    """
+    status = job_runner.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Job inconnu: {job_id}")
+    return status
+
+
+@router.get("/jobs/{job_id}/results", response_model=JobResultsPage, dependencies=[Depends(get_api_key)])
+def get_job_results(
+    job_id: str,
+    after: int = Query(-1, ge=-1, description="Renvoie les résultats de numéro (seq) strictement supérieur"),
+    limit: int = Query(1000, ge=1, le=10000),
+) -> JobResultsPage:
+    """Parcourt les résultats d'un job par pages, y compris pendant son exécution.
+
+    Les résultats sont numérotés (`seq`) dans l'ordre de production ; passer
+    `next_after` comme `after` de la requête suivante. Une page vide sur un
+    job terminé marque la fin des résultats.
+
+    Raises:
+        HTTPException: 404 si le job est inconnu.
+    """
+    status = job_runner.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Job inconnu: {job_id}")
+    items = job_runner.results(job_id, after=after, limit=limit)
+    return {
+        "job_id": job_id,
+        "status": status["status"],
+        "items": items,
+        "next_after": items[-1]["seq"] if items else after,
+    }
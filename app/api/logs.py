@@ -20,7 +20,8 @@ def get_prediction_log(employee_id: int, db: Session = Depends(get_db)):
         HTTPException: Si aucun log n’existe pour l’identifiant donné.
 
     Returns:
-        Dictionnaire avec le payload loggé et le résultat de la prédiction.
+        Dictionnaire avec le payload loggé, le résultat de la prédiction et
+        la version du modèle qui l'a produit.
     """
     row = get_prediction_log_by_employee_id(db, employee_id=employee_id)
     if row is None:
@@ -29,4 +30,5 @@ def get_prediction_log(employee_id: int, db: Session = Depends(get_db)):
         "employee_id": employee_id,
         "payload": row.payload,
         "pred_quitte_entreprise": row.output.get("pred_quitte_entreprise") if isinstance(row.output, dict) else None,
+        "model_version": row.output.get("model_version") if isinstance(row.output, dict) else None,
     }
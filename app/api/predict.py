@@ -1,16 +1,34 @@
 import time
 import math
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Path
+from fastapi import APIRouter, Body, Depends, HTTPException, Path
+from pydantic import ValidationError
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
-from app.api.schemas import ALL_FEATURES, PredictIn, PredictionResponse
+from app.api.schemas import (
+    ALL_FEATURES,
+    PredictIn,
+    PredictionResponse,
+    PredictBatchItem,
+    PredictBatchResponse,
+    PredictByIdsIn,
+    PredictByIdsResponse,
+)
 from app.api.deps import get_api_key
+from app.core.config import get_settings
 from app.db.session import get_db
-from app.db.models import EmployeeFeatures as EmployeeORM
-from app.ml.serve import model_service
-from app.db.repository import save_prediction_log
+from app.db.models import EmployeeFeatures as EmployeeORM, EmployeeScore
+from app.ml.serve import SEUIL_FIXE, model_service
+from app.ml.batching import micro_batcher
+from app.ml.executor import inference_executor
+from app.ml.cache import prediction_cache
+from app.ml.feature_store import feature_store
+from app.ml.scoring import NON_VALUES, NORMALIZED_STR_COLS, OUI_VALUES, normalize_frame
+from app.db.log_writer import log_writer
 import logging
 
 
@@ -59,23 +77,15 @@ def _normalize_payload(d: Dict[str, Any]) -> Dict[str, Any]:
     """
     out = dict(d)
 
-    for k in [
-        "genre",
-        "statut_marital",
-        "departement",
-        "poste",
-        "heure_supplementaires",
-        "domaine_etude",
-        "frequence_deplacement",
-    ]:
+    for k in NORMALIZED_STR_COLS:
         if k in out and isinstance(out[k], str):
             out[k] = out[k].strip().upper()
 
     if "heure_supplementaires" in out and isinstance(out["heure_supplementaires"], str):
         vv = out["heure_supplementaires"]
-        if vv in {"OUI", "YES", "Y", "1", "TRUE"}:
+        if vv in OUI_VALUES:
             out["heure_supplementaires"] = "OUI"
-        elif vv in {"NON", "NO", "N", "0", "FALSE"}:
+        elif vv in NON_VALUES:
             out["heure_supplementaires"] = "NON"
 
     for k, v in list(out.items()):
@@ -85,52 +95,269 @@ def _normalize_payload(d: Dict[str, Any]) -> Dict[str, Any]:
     return out
 
 
+def _log_positive(v: Any) -> Optional[float]:
+    return math.log(v) if (isinstance(v, (int, float)) and v > 0) else None
+
+
+def _to_model_input(d: Dict[str, Any]) -> Dict[str, Any]:
+    """Construit le dictionnaire d'entrée du modèle à partir d'un payload `PredictIn`.
+
+    Args:
+        d: Payload issu de `PredictIn.model_dump(exclude_none=True)`.
+
+    Returns:
+        Dictionnaire normalisé, limité à `EXPECTED_COLS`, avec les features
+        logarithmiques dérivées des années d'ancienneté et d'expérience.
+    """
+    d = _normalize_payload(d)
+    d["anciennete_log"] = _log_positive(d.get("annees_dans_l_entreprise"))
+    d["annee_experience_totale_log"] = _log_positive(d.get("annee_experience_totale"))
+    return {c: d.get(c, None) for c in EXPECTED_COLS}
+
+
+def _predict_proba(x: Dict[str, Any], version: Optional[str] = None) -> float:
+    # cache (si actif), puis micro-batcher quand il tourne, sinon appel direct au modèle;
+    # version lue une fois par requête: un rechargement concurrent ne mélange pas les entrées du cache
+    version = version or model_service.version
+    cached = prediction_cache.get(x, version)
+    if cached is not None:
+        return cached
+    if micro_batcher.running:
+        proba = micro_batcher.predict_proba(x)
+    else:
+        proba = inference_executor.predict_proba(x)
+    prediction_cache.put(x, version, proba)
+    return proba
+
+
+def _predict_label(x: Dict[str, Any], version: Optional[str] = None) -> int:
+    return int(_predict_proba(x, version) >= SEUIL_FIXE)
+
+
+def _materialized_score(db: Session, employee_id: int) -> Optional[EmployeeScore]:
+    # Score précalculé, utilisable seulement s'il provient du modèle actuellement chargé
+    version = model_service.version
+    if version is None:
+        return None
+    try:
+        score = db.get(EmployeeScore, employee_id)
+    except SQLAlchemyError as e:
+        db.rollback()
+        logging.getLogger(__name__).debug("Lecture employee_scores impossible: %s", e)
+        return None
+    if score is None or score.model_version != version:
+        return None
+    return score
+
+
+def _validation_errors(exc: ValidationError) -> List[Dict[str, Any]]:
+    # ne garde que les champs serialisables (ctx peut contenir des exceptions)
+    return [{"loc": list(e["loc"]), "msg": e["msg"], "type": e["type"]} for e in exc.errors()]
+
+
 @router.post("/predict", response_model=PredictionResponse, dependencies=[Depends(get_api_key)])
-def predict(features: PredictIn, db: Session = Depends(get_db)) -> PredictionResponse:
+def predict(features: PredictIn) -> PredictionResponse:
     """Effectue une prédiction à partir du JSON envoyé par le client.
 
+    Aucune session SQL n'est ouverte : le log est confié au `log_writer`.
+
     Args:
         features: Payload validé par `PredictIn`.
-        db: Session SQLAlchemy (utilisée pour journaliser la requête).
 
     Returns:
-        `PredictionResponse` contenant l'identifiant et le label `OUI/NON`.
+        `PredictionResponse` contenant l'identifiant, le label `OUI/NON` et
+        la version du modèle qui l'a produit.
     """
     t0 = time.perf_counter()
     d = features.model_dump(exclude_none=True)
-    d = _normalize_payload(d)
-
-    a_ent = d.get("annees_dans_l_entreprise")
-    a_tot = d.get("annee_experience_totale")
-    d["anciennete_log"] = math.log(a_ent) if (isinstance(a_ent, (int, float)) and a_ent > 0) else None
-    d["annee_experience_totale_log"] = (
-        math.log(a_tot) if (isinstance(a_tot, (int, float)) and a_tot > 0) else None
-    )
-    Xro = {c: d.get(c, None) for c in EXPECTED_COLS}
+    Xro = _to_model_input(d)
+    version = model_service.version
 
     try:
-        label_int = model_service.predict_label(Xro)
+        label_int = _predict_label(Xro, version)
         pred_str = "OUI" if int(label_int) == 1 else "NON"
     except Exception as e:
         logging.getLogger(__name__).exception("Echec predict_label: %s", e)
         raise
 
+    log_writer.write(
+        {
+            "endpoint": "/predict",
+            "requested_by": None,
+            "employee_id": d.get("id_employee"),
+            "latency_ms": int((time.perf_counter() - t0) * 1000),
+            "status": "OK",
+            "payload": Xro,
+            "output": {"pred_quitte_entreprise": pred_str, "model_version": version},
+        }
+    )
+
+    return PredictionResponse(
+        employee_id=d.get("id_employee"), pred_quitte_entreprise=pred_str, model_version=version
+    )
+
+
+@router.post("/predict/batch", response_model=PredictBatchResponse, dependencies=[Depends(get_api_key)])
+def predict_batch(items: List[Dict[str, Any]] = Body(...)) -> PredictBatchResponse:
+    """Effectue les prédictions d'une liste de payloads en un seul appel modèle.
+
+    Chaque élément est validé individuellement par `PredictIn` : un élément
+    invalide est rapporté avec ses erreurs sans faire échouer le lot. Les
+    éléments valides sont normalisés puis scorés via un unique `predict_proba`
+    sur un DataFrame multi-lignes ; les logs sont confiés au `log_writer`.
+
+    Args:
+        items: Liste de payloads bruts (même format que `/predict`).
+
+    Returns:
+        `PredictBatchResponse` avec un résultat par élément, dans l'ordre reçu.
+
+    Raises:
+        HTTPException: 413 si le lot dépasse `PREDICT_BATCH_MAX_SIZE`.
+    """
+    t0 = time.perf_counter()
+    max_size = get_settings().PREDICT_BATCH_MAX_SIZE
+    if len(items) > max_size:
+        raise HTTPException(status_code=413, detail=f"Lot trop volumineux: {len(items)} > {max_size}")
+
+    results: List[PredictBatchItem] = []
+    valid_idx: List[int] = []
+    inputs: List[Dict[str, Any]] = []
+    for i, raw in enumerate(items):
+        raw_id = raw.get("id_employee") if isinstance(raw, dict) else None
+        try:
+            features = PredictIn.model_validate(raw)
+        except ValidationError as e:
+            results.append(
+                PredictBatchItem(
+                    index=i,
+                    employee_id=raw_id if isinstance(raw_id, int) else None,
+                    errors=_validation_errors(e),
+                )
+            )
+            continue
+        results.append(PredictBatchItem(index=i, employee_id=features.id_employee))
+        valid_idx.append(i)
+        inputs.append(_to_model_input(features.model_dump(exclude_none=True)))
+
+    version = model_service.version
     try:
-        latency_ms = int((time.perf_counter() - t0) * 1000)
-        save_prediction_log(
-            db,
-            endpoint="/predict",
-            requested_by=None,
-            employee_id=d.get("id_employee"),
-            latency_ms=latency_ms,
-            status="OK",
-            payload=Xro,
-            output={"pred_quitte_entreprise": pred_str},
-        )
+        labels = inference_executor.predict_label_batch(inputs)
     except Exception as e:
-        logging.warning("save_prediction_log failed on /predict: %s", e)
+        logging.getLogger(__name__).exception("Echec predict_label_batch: %s", e)
+        raise
+
+    for i, label_int in zip(valid_idx, labels):
+        results[i].pred_quitte_entreprise = "OUI" if int(label_int) == 1 else "NON"
+
+    latency_ms = int((time.perf_counter() - t0) * 1000)
+    log_writer.write_many(
+        [
+            {
+                "endpoint": "/predict/batch",
+                "requested_by": None,
+                "employee_id": results[i].employee_id,
+                "latency_ms": latency_ms,
+                "status": "OK",
+                "payload": x,
+                "output": {"pred_quitte_entreprise": results[i].pred_quitte_entreprise, "model_version": version},
+            }
+            for i, x in zip(valid_idx, inputs)
+        ]
+    )
+
+    return PredictBatchResponse(
+        n_ok=len(valid_idx),
+        n_errors=len(items) - len(valid_idx),
+        results=results,
+        model_version=version,
+    )
 
-    return PredictionResponse(employee_id=d.get("id_employee"), pred_quitte_entreprise=pred_str)
+
+def _fetch_features(db: Session, ids: List[int]) -> pd.DataFrame:
+    # un seul SELECT ... WHERE id_employee IN (...), limité aux colonnes du modèle
+    cols = [EmployeeORM.id_employee] + [getattr(EmployeeORM, c) for c in ALL_FEATURES]
+    rows = db.execute(select(*cols).where(EmployeeORM.id_employee.in_(ids))).all()
+    return pd.DataFrame(rows, columns=["id_employee"] + ALL_FEATURES)
+
+
+@router.post(
+    "/predict/by-ids",
+    response_model=PredictByIdsResponse,
+    dependencies=[Depends(get_api_key)],
+)
+def predict_by_ids(body: PredictByIdsIn, db: Session = Depends(get_db)) -> PredictByIdsResponse:
+    """Effectue les prédictions de plusieurs employés stockés en base.
+
+    Les identifiants présents dans le feature store sont scorés depuis la
+    mémoire ; les autres sont lus en une seule requête `IN` sur les colonnes
+    du modèle, puis scorés en un seul appel vectorisé. Les logs sont confiés
+    au `log_writer`.
+
+    Args:
+        body: Liste d'identifiants (doublons autorisés).
+        db: Session SQLAlchemy pour lire `EmployeeFeatures`.
+
+    Returns:
+        `PredictByIdsResponse` avec un résultat par identifiant trouvé, dans
+        l'ordre de la requête, et la liste des identifiants introuvables.
+
+    Raises:
+        HTTPException: 413 si la liste dépasse `PREDICT_BATCH_MAX_SIZE`.
+    """
+    t0 = time.perf_counter()
+    max_size = get_settings().PREDICT_BATCH_MAX_SIZE
+    if len(body.employee_ids) > max_size:
+        raise HTTPException(status_code=413, detail=f"Lot trop volumineux: {len(body.employee_ids)} > {max_size}")
+
+    ids = list(dict.fromkeys(body.employee_ids))
+    version = model_service.version
+    proba: Dict[int, float] = {}
+    features: Dict[int, Dict[str, Any]] = {}
+
+    pos, found = feature_store.lookup(ids)
+    if found.any():
+        store_ids = [i for i, ok in zip(ids, found) if ok]
+        store_pos = pos[found]
+        proba.update(zip(store_ids, feature_store.predict_proba(store_pos).tolist()))
+        features.update(zip(store_ids, feature_store.payloads(store_pos)))
+
+    remaining = [i for i in ids if i not in proba]
+    if remaining:
+        df = _fetch_features(db, remaining)
+        if not df.empty:
+            X = normalize_frame(df[ALL_FEATURES])
+            records = X.astype(object).where(X.notna(), None).to_dict("records")
+            db_ids = [int(i) for i in df["id_employee"]]
+            proba.update(zip(db_ids, inference_executor.predict_proba_batch(records).tolist()))
+            features.update(zip(db_ids, records))
+
+    labels = {i: "OUI" if p >= SEUIL_FIXE else "NON" for i, p in proba.items()}
+    results = [
+        PredictionResponse(employee_id=i, pred_quitte_entreprise=labels[i], model_version=version)
+        for i in body.employee_ids
+        if i in labels
+    ]
+    missing = [i for i in ids if i not in labels]
+
+    latency_ms = int((time.perf_counter() - t0) * 1000)
+    log_writer.write_many(
+        [
+            {
+                "endpoint": "/predict/by-ids",
+                "requested_by": None,
+                "employee_id": i,
+                "latency_ms": latency_ms,
+                "status": "OK",
+                "payload": {"employee_id": i, "features": features[i]},
+                "output": {"pred_quitte_entreprise": labels[i], "model_version": version},
+            }
+            for i in ids
+            if i in labels
+        ]
+    )
+
+    return PredictByIdsResponse(results=results, missing=missing)
 
 
 @router.get("/health")
@@ -147,9 +374,14 @@ def health():
 def predict_by_id(employee_id: int = Path(..., ge=1), db: Session = Depends(get_db)) -> PredictionResponse:
     """Effectue une prédiction en lisant les features déjà stockées en base.
 
+    Si `employee_scores` contient un score calculé par le modèle actuellement
+    chargé, il est renvoyé directement (une lecture par clé primaire, sans
+    inférence). Sinon les features sont prises dans le feature store en
+    mémoire s'il est chargé, ou relues en base, puis le modèle est appelé.
+
     Args:
         employee_id: Identifiant de l'employé dont on lit les features.
-        db: Session SQLAlchemy pour lire `EmployeeFeatures` et sauver les logs.
+        db: Session SQLAlchemy pour lire `EmployeeFeatures`.
 
     Returns:
         `PredictionResponse` identique à celui de `/predict`.
@@ -158,30 +390,47 @@ def predict_by_id(employee_id: int = Path(..., ge=1), db: Session = Depends(get_
         HTTPException: Si aucune ligne de features n'est trouvée pour l'identifiant.
     """
     t0 = time.perf_counter()
-    row: Optional[EmployeeORM] = (
-        db.query(EmployeeORM).filter(EmployeeORM.id_employee == employee_id).one_or_none()
+    version = model_service.version
+    score = _materialized_score(db, employee_id)
+    if score is not None:
+        pred_str = score.pred_quitte_entreprise
+        version = score.model_version
+        log_payload: Dict[str, Any] = {
+            "employee_id": employee_id,
+            "source": "employee_scores",
+            "model_version": score.model_version,
+        }
+    else:
+        pos, found = feature_store.lookup([employee_id])
+        if found[0]:
+            # features déjà normalisées et prétraitées en mémoire: ni SQL ni préprocesseur
+            x: Dict[str, Any] = feature_store.payloads(pos)[0]
+            proba = float(feature_store.predict_proba(pos)[0])
+            pred_str = "OUI" if proba >= SEUIL_FIXE else "NON"
+            log_payload = {"employee_id": employee_id, "source": "feature_store", "features": x}
+        else:
+            row: Optional[EmployeeORM] = (
+                db.query(EmployeeORM).filter(EmployeeORM.id_employee == employee_id).one_or_none()
+            )
+            if row is None:
+                raise HTTPException(status_code=422, detail=f"Aucune features trouvée pour employee_id='{employee_id}'")
+
+            raw_dict: Dict[str, Any] = {col: getattr(row, col) for col in ALL_FEATURES}
+            x = _normalize_payload(raw_dict)
+            label_int: int = _predict_label(x, version)
+            pred_str = "OUI" if int(label_int) == 1 else "NON"
+            log_payload = {"employee_id": employee_id, "features": x}
+
+    log_writer.write(
+        {
+            "endpoint": f"/predict/by-id/{employee_id}",
+            "requested_by": None,
+            "employee_id": employee_id,
+            "latency_ms": int((time.perf_counter() - t0) * 1000),
+            "status": "OK",
+            "payload": log_payload,
+            "output": {"pred_quitte_entreprise": pred_str, "model_version": version},
+        }
     )
-    if row is None:
-        raise HTTPException(status_code=422, detail=f"Aucune features trouvée pour employee_id='{employee_id}'")
-
-    raw_dict: Dict[str, Any] = {col: getattr(row, col) for col in ALL_FEATURES}
-    x: Dict[str, Any] = _normalize_payload(raw_dict)
-    label_int: int = model_service.predict_label(x)
-    pred_str = "OUI" if int(label_int) == 1 else "NON"
-
-    try:
-        latency_ms = int((time.perf_counter() - t0) * 1000)
-        save_prediction_log(
-            db,
-            endpoint=f"/predict/by-id/{employee_id}",
-            requested_by=None,
-            employee_id=employee_id,
-            latency_ms=latency_ms,
-            status="OK",
-            payload={"employee_id": employee_id, "features": x},
-            output={"pred_quitte_entreprise": pred_str},
-        )
-    except Exception as e:
-        logging.warning("save_prediction_log failed on /predict/by-id: %s", e)
 
-    return PredictionResponse(employee_id=employee_id, pred_quitte_entreprise=pred_str)
+    return PredictionResponse(employee_id=employee_id, pred_quitte_entreprise=pred_str, model_version=version)
@@ -0,0 +1,156 @@
+import time
+import logging
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Path
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.api.schemas import ALL_FEATURES, PredictIn, PredictionResponse
+from app.api.deps import get_api_key
+from app.api.predict import _normalize_payload, _predict_label, _to_model_input
+from app.db.async_session import get_async_db
+from app.db.log_writer import log_writer
+from app.db.models import EmployeeScore
+from app.db.repository import (
+    get_employee_features_async,
+    get_prediction_log_by_employee_id_async,
+    save_prediction_log_async,
+)
+from app.ml.feature_store import feature_store
+from app.ml.serve import SEUIL_FIXE, model_service
+
+# Variantes `async def` de /predict, /predict/by-id et /logs/prediction (DB_ASYNC=true).
+# Les accès base passent par une AsyncSession et l'inférence (CPU) est confiée au threadpool:
+# la boucle d'événements n'est jamais bloquée et la concurrence n'est plus bornée par les threads.
+router = APIRouter()
+
+_logger = logging.getLogger(__name__)
+
+
+async def _write_log(db: Optional[AsyncSession], record: Dict[str, Any]) -> None:
+    # writer de fond s'il tourne (aucune attente), sinon upsert asynchrone
+    if log_writer.running or db is None:
+        log_writer.write(record)
+        return
+    try:
+        await save_prediction_log_async(db, **record)
+    except Exception as e:
+        await db.rollback()
+        logging.warning("save_prediction_log_async failed on %s: %s", record["endpoint"], e)
+
+
+async def _materialized_score(db: AsyncSession, employee_id: int) -> Optional[EmployeeScore]:
+    version = model_service.version
+    if version is None:
+        return None
+    try:
+        score = await db.get(EmployeeScore, employee_id)
+    except SQLAlchemyError as e:
+        await db.rollback()
+        _logger.debug("Lecture employee_scores impossible: %s", e)
+        return None
+    if score is None or score.model_version != version:
+        return None
+    return score
+
+
+@router.post("/predict", response_model=PredictionResponse, dependencies=[Depends(get_api_key)])
+async def predict(features: PredictIn) -> PredictionResponse:
+    """Variante asynchrone de `/predict` (inférence dans le threadpool)."""
+    t0 = time.perf_counter()
+    d = features.model_dump(exclude_none=True)
+    Xro = _to_model_input(d)
+    version = model_service.version
+    label_int = await run_in_threadpool(_predict_label, Xro, version)
+    pred_str = "OUI" if int(label_int) == 1 else "NON"
+    await _write_log(
+        None,
+        {
+            "endpoint": "/predict",
+            "requested_by": None,
+            "employee_id": d.get("id_employee"),
+            "latency_ms": int((time.perf_counter() - t0) * 1000),
+            "status": "OK",
+            "payload": Xro,
+            "output": {"pred_quitte_entreprise": pred_str, "model_version": version},
+        },
+    )
+    return PredictionResponse(
+        employee_id=d.get("id_employee"), pred_quitte_entreprise=pred_str, model_version=version
+    )
+
+
+@router.get(
+    "/predict/by-id/{employee_id}",
+    response_model=PredictionResponse,
+    dependencies=[Depends(get_api_key)],
+)
+async def predict_by_id(
+    employee_id: int = Path(..., ge=1),
+    db: AsyncSession = Depends(get_async_db),
+) -> PredictionResponse:
+    """Variante asynchrone de `/predict/by-id` (même ordre: scores, feature store, base).
+
+    Raises:
+        HTTPException: Si aucune ligne de features n'est trouvée pour l'identifiant.
+    """
+    t0 = time.perf_counter()
+    version = model_service.version
+    score = await _materialized_score(db, employee_id)
+    if score is not None:
+        pred_str = score.pred_quitte_entreprise
+        version = score.model_version
+        log_payload: Dict[str, Any] = {
+            "employee_id": employee_id,
+            "source": "employee_scores",
+            "model_version": score.model_version,
+        }
+    else:
+        pos, found = feature_store.lookup([employee_id])
+        if found[0]:
+            x: Dict[str, Any] = feature_store.payloads(pos)[0]
+            proba = float((await run_in_threadpool(feature_store.predict_proba, pos))[0])
+            pred_str = "OUI" if proba >= SEUIL_FIXE else "NON"
+            log_payload = {"employee_id": employee_id, "source": "feature_store", "features": x}
+        else:
+            raw_dict = await get_employee_features_async(db, employee_id=employee_id, columns=ALL_FEATURES)
+            if raw_dict is None:
+                raise HTTPException(status_code=422, detail=f"Aucune features trouvée pour employee_id='{employee_id}'")
+            x = _normalize_payload(raw_dict)
+            label_int = await run_in_threadpool(_predict_label, x, version)
+            pred_str = "OUI" if int(label_int) == 1 else "NON"
+            log_payload = {"employee_id": employee_id, "features": x}
+
+    await _write_log(
+        db,
+        {
+            "endpoint": f"/predict/by-id/{employee_id}",
+            "requested_by": None,
+            "employee_id": employee_id,
+            "latency_ms": int((time.perf_counter() - t0) * 1000),
+            "status": "OK",
+            "payload": log_payload,
+            "output": {"pred_quitte_entreprise": pred_str, "model_version": version},
+        },
+    )
+    return PredictionResponse(employee_id=employee_id, pred_quitte_entreprise=pred_str, model_version=version)
+
+
+@router.get("/logs/prediction/{employee_id}", dependencies=[Depends(get_api_key)])
+async def get_prediction_log(employee_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Variante asynchrone de `/logs/prediction/{employee_id}`.
+
+    Raises:
+        HTTPException: Si aucun log n’existe pour l’identifiant donné.
+    """
+    row = await get_prediction_log_by_employee_id_async(db, employee_id=employee_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"Aucun log pour employee_id={employee_id}")
+    return {
+        "employee_id": employee_id,
+        "payload": row.payload,
+        "pred_quitte_entreprise": row.output.get("pred_quitte_entreprise") if isinstance(row.output, dict) else None,
+        "model_version": row.output.get("model_version") if isinstance(row.output, dict) else None,
+    }
@@ -0,0 +1,110 @@
+import os
+import shutil
+import tempfile
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+
+from app.api.deps import get_api_key
+from app.core.config import get_settings
+from app.ml.file_scoring import FORMATS, MEDIA_TYPES, FileScorer, pq
+
+router = APIRouter()
+
+_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+}
+
+
+def upload_format(request: Request, fmt: Optional[str]) -> str:
+    """Format du fichier reçu: paramètre explicite, sinon `Content-Type` (415 si inconnu)."""
+    if fmt is None:
+        content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+        fmt = _CONTENT_TYPES.get(content_type)
+    if fmt not in FORMATS:
+        raise HTTPException(
+            status_code=415,
+            detail="Format attendu: CSV (text/csv) ou Parquet (application/vnd.apache.parquet), ou ?format=csv|parquet",
+        )
+    if fmt == "parquet" and pq is None:
+        raise HTTPException(status_code=415, detail="Parquet indisponible: pyarrow n'est pas installé")
+    return fmt
+
+
+async def save_upload(request: Request, path: str, max_bytes: int) -> int:
+    """Recopie le corps de la requête dans `path` au fil de l'eau (413 au-delà de `max_bytes`)."""
+    size = 0
+    with open(path, "wb") as f:
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(status_code=413, detail=f"Fichier trop volumineux: > {max_bytes} octets")
+            f.write(chunk)
+    return size
+
+
+@router.post("/predict/file", dependencies=[Depends(get_api_key)])
+async def predict_file(
+    request: Request,
+    format: Optional[str] = Query(None, description="Format du fichier envoyé (csv ou parquet)"),
+    output_format: Optional[str] = Query(None, description="Format du fichier renvoyé (défaut: celui d'entrée)"),
+) -> FileResponse:
+    """Score un fichier CSV ou Parquet envoyé tel quel dans le corps de la requête.
+
+    Le corps est recopié sur disque au fil de l'eau, puis lu et scoré par
+    blocs de `PREDICT_FILE_CHUNK_SIZE` lignes (nettoyage de l'ETL,
+    normalisation, un appel modèle par bloc) ; la mémoire reste bornée quelle
+    que soit la taille du fichier. Les colonnes attendues sont celles des
+    extraits SIRH / évaluations / sondage, éventuellement fusionnés.
+
+    Args:
+        request: Requête dont le corps est le fichier à scorer.
+        format: Format d'entrée (défaut: déduit du `Content-Type`).
+        output_format: Format de sortie (défaut: format d'entrée).
+
+    Returns:
+        Fichier `id_employee, proba, pred_quitte_entreprise, model_version` ;
+        les en-têtes `X-Rows-Scored` et `X-Rows-Skipped` (lignes sans
+        identifiant) résument le traitement.
+
+    Raises:
+        HTTPException: 413 au-delà de `PREDICT_FILE_MAX_BYTES`, 415 si le
+            format n'est pas reconnu, 422 si le fichier est illisible.
+    """
+    settings = get_settings()
+    fmt = upload_format(request, format)
+    out_fmt = upload_format(request, output_format or fmt)
+
+    workdir = tempfile.mkdtemp(prefix="predict-file-")
+    try:
+        src = os.path.join(workdir, f"input.{fmt}")
+        await save_upload(request, src, settings.PREDICT_FILE_MAX_BYTES)
+
+        dst = os.path.join(workdir, f"scores.{out_fmt}")
+        scorer = FileScorer(chunk_size=settings.PREDICT_FILE_CHUNK_SIZE)
+        try:
+            stats = await run_in_threadpool(scorer.score_file, src, dst, fmt, out_fmt)
+        except (ValueError, OSError) as e:
+            # CSV mal formé, Parquet illisible...
+            raise HTTPException(status_code=422, detail=f"Fichier illisible: {e}")
+    except BaseException:
+        shutil.rmtree(workdir, ignore_errors=True)
+        raise
+
+    return FileResponse(
+        dst,
+        media_type=MEDIA_TYPES[out_fmt],
+        filename=f"scores.{out_fmt}",
+        headers={
+            "X-Rows-Scored": str(stats["rows_scored"]),
+            "X-Rows-Skipped": str(stats["rows_skipped"]),
+            "X-Model-Version": str(stats["model_version"]),
+        },
+        background=BackgroundTask(shutil.rmtree, workdir, ignore_errors=True),
+    )
@@ -0,0 +1,295 @@
+import json
+import logging
+import tempfile
+import time
+from typing import AsyncIterator, List, Tuple
+
+import anyio
+import numpy as np
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+from starlette.types import Receive, Scope, Send
+
+from app.api.deps import get_api_key
+from app.api.predict import _to_model_input, _validation_errors
+from app.api.schemas import PredictIn, PredictStreamItem
+from app.core.config import get_settings
+from app.db.log_writer import log_writer
+from app.ml.executor import inference_executor
+from app.ml.serve import SEUIL_FIXE, model_service
+
+# Scoring NDJSON en flux: le corps est lu au fil de l'eau, scoré par paquets de taille fixe et
+# chaque paquet est renvoyé dès qu'il est prêt. La mémoire reste bornée par la taille d'un paquet.
+router = APIRouter()
+
+_logger = logging.getLogger(__name__)
+
+NDJSON = "application/x-ndjson"
+
+
+class _Spool:
+    """File d'octets FIFO en mémoire jusqu'à `max_memory`, puis sur disque (fichier temporaire)."""
+
+    def __init__(self, max_memory: int):
+        self._f = tempfile.SpooledTemporaryFile(max_size=max_memory)
+        self._r = 0
+        self._w = 0
+
+    @property
+    def pending(self) -> int:
+        # octets écrits et pas encore relus
+        return self._w - self._r
+
+    def write(self, data: bytes) -> None:
+        self._f.seek(self._w)
+        self._f.write(data)
+        self._w += len(data)
+
+    def read(self, n: int = 64 * 1024) -> bytes:
+        self._f.seek(self._r)
+        data = self._f.read(n)
+        self._r += len(data)
+        if self._r == self._w:
+            # tout a été envoyé: on repart du début du fichier
+            self._f.seek(0)
+            self._f.truncate()
+            self._r = self._w = 0
+        return data
+
+    def close(self) -> None:
+        self._f.close()
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """Réponse en flux produite pendant la lecture du corps de la requête.
+
+    La lecture/scoring du corps et l'envoi des résultats sont deux tâches
+    reliées par un tampon (`_Spool`) : un client qui envoie tout son corps
+    avant de lire la réponse (clients HTTP synchrones) ne bloque pas la
+    lecture, les résultats en attente débordant sur disque au-delà de
+    `spool_bytes`. `StreamingResponse` écoute aussi la déconnexion en lisant
+    `receive`, ce qui consommerait le corps : ici seul le générateur le lit
+    (une déconnexion y lève `ClientDisconnect`).
+
+    Le tampon est plafonné à `max_spool_bytes` (mémoire et disque) : si le
+    client ne lit pas assez vite la réponse, la lecture du corps s'arrête,
+    `overflow_line` est ajoutée et la réponse se termine après l'envoi de ce
+    qui est déjà en attente.
+    """
+
+    media_type = NDJSON
+
+    def __init__(
+        self,
+        content: AsyncIterator[bytes],
+        spool_bytes: int = 8 * 1024 * 1024,
+        max_spool_bytes: int | None = None,
+        overflow_line: bytes = b"",
+    ):
+        super().__init__(content, media_type=NDJSON)
+        self.spool_bytes = spool_bytes
+        self.max_spool_bytes = max_spool_bytes
+        self.overflow_line = overflow_line
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        spool = _Spool(self.spool_bytes)
+        state = {"done": False, "failed": False, "event": anyio.Event()}
+
+        def wake() -> None:
+            state["event"].set()
+
+        async def produce() -> None:
+            try:
+                async for data in self.body_iterator:
+                    spool.write(data)
+                    wake()
+                    if self.max_spool_bytes is not None and spool.pending > self.max_spool_bytes:
+                        # client qui ne lit pas: arrêt plutôt qu'un fichier temporaire sans limite
+                        _logger.warning("Flux NDJSON interrompu: %s octets non lus par le client", spool.pending)
+                        spool.write(self.overflow_line)
+                        await self.body_iterator.aclose()
+                        break
+            except BaseException:
+                # pas de fin de corps: le client voit une réponse interrompue, pas un flux complet
+                state["failed"] = True
+                raise
+            finally:
+                state["done"] = True
+                wake()
+
+        async def consume() -> None:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            while True:
+                data = spool.read()
+                if data:
+                    await send({"type": "http.response.body", "body": data, "more_body": True})
+                    continue
+                if state["failed"]:
+                    return
+                if state["done"]:
+                    break
+                state["event"] = anyio.Event()
+                await state["event"].wait()
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+        try:
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(produce)
+                await consume()
+        finally:
+            spool.close()
+        if self.background is not None:
+            await self.background()
+
+
+def _error_line(index: int, msg: str, type_: str) -> bytes:
+    item = PredictStreamItem(index=index, errors=[{"loc": [], "msg": msg, "type": type_}])
+    return item.model_dump_json(exclude_none=True).encode("utf-8") + b"\n"
+
+
+async def _lines(request: Request, max_line_bytes: int) -> AsyncIterator[Tuple[int, bytes | None]]:
+    """Découpe le corps reçu en lignes `(index, contenu)` ; `None` pour une ligne trop longue."""
+    buf = bytearray()
+    index = 0
+    skipping = False
+    async for chunk in request.stream():
+        buf += chunk
+        while True:
+            nl = buf.find(b"\n")
+            if nl < 0:
+                break
+            line = bytes(buf[:nl])
+            del buf[: nl + 1]
+            if skipping:
+                skipping = False
+            else:
+                yield index, line if len(line) <= max_line_bytes else None
+            index += 1
+        if len(buf) > max_line_bytes and not skipping:
+            # ligne trop longue: signalée une fois, le reste est ignoré jusqu'au prochain saut de ligne
+            yield index, None
+            skipping = True
+        if skipping:
+            buf.clear()
+    if buf and not skipping:
+        yield index, bytes(buf) if len(buf) <= max_line_bytes else None
+
+
+def _parse(index: int, line: bytes | None) -> Tuple[PredictIn | None, bytes | None]:
+    # une ligne -> (payload validé, None) ou (None, ligne d'erreur NDJSON)
+    if line is None:
+        return None, _error_line(index, "Ligne trop longue", "line_too_long")
+    try:
+        raw = json.loads(line)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        return None, _error_line(index, f"JSON invalide: {e}", "json_invalid")
+    try:
+        return PredictIn.model_validate(raw), None
+    except ValidationError as e:
+        raw_id = raw.get("id_employee") if isinstance(raw, dict) else None
+        item = PredictStreamItem(
+            index=index,
+            employee_id=raw_id if isinstance(raw_id, int) else None,
+            errors=_validation_errors(e),
+        )
+        return None, item.model_dump_json(exclude_none=True).encode("utf-8") + b"\n"
+
+
+def _score_chunk(chunk: List[Tuple[int, PredictIn]]) -> bytes:
+    """Score un paquet en un seul appel modèle ; renvoie ses lignes NDJSON et confie son log au writer.
+
+    Un seul log par paquet (lignes, identifiants, répartition OUI/NON) et non
+    un par ligne : un flux de plusieurs centaines de milliers de lignes ne
+    sature pas la file bornée du writer. Ces prédictions n'apparaissent donc
+    pas dans `/logs/prediction/{employee_id}`.
+    """
+    t0 = time.perf_counter()
+    inputs = [_to_model_input(f.model_dump(exclude_none=True)) for _, f in chunk]
+    try:
+        # modèle figé pour le paquet: la version renvoyée est celle qui a produit les scores
+        active = model_service.active()
+        proba = inference_executor.predict_proba_encoded(model_service.transform(inputs, active), active)
+        labels = np.asarray(proba, dtype=float) >= SEUIL_FIXE
+    except Exception as e:
+        # le flux continue: les lignes du paquet sont rapportées en erreur
+        _logger.exception("Echec predict_label_batch (stream): %s", e)
+        return b"".join(_error_line(i, f"Echec de prédiction: {e}", "prediction_error") for i, _ in chunk)
+
+    version = active.version
+    preds = ["OUI" if label else "NON" for label in labels]
+    latency_ms = int((time.perf_counter() - t0) * 1000)
+    n_oui = preds.count("OUI")
+    log_writer.write(
+        {
+            "endpoint": "/predict/stream",
+            "requested_by": None,
+            "employee_id": None,
+            "latency_ms": latency_ms,
+            "status": "OK",
+            "payload": {
+                "rows": len(chunk),
+                "first_index": chunk[0][0],
+                "last_index": chunk[-1][0],
+                "employee_ids": [f.id_employee for _, f in chunk],
+            },
+            "output": {"n_oui": n_oui, "n_non": len(preds) - n_oui, "model_version": version},
+        }
+    )
+    return b"".join(
+        PredictStreamItem(
+            index=i, employee_id=f.id_employee, pred_quitte_entreprise=p, model_version=version
+        ).model_dump_json(exclude_none=True).encode("utf-8")
+        + b"\n"
+        for (i, f), p in zip(chunk, preds)
+    )
+
+
+async def _stream(request: Request) -> AsyncIterator[bytes]:
+    settings = get_settings()
+    chunk_size = max(1, settings.PREDICT_STREAM_CHUNK_SIZE)
+    chunk: List[Tuple[int, PredictIn]] = []
+    async for index, line in _lines(request, settings.PREDICT_STREAM_MAX_LINE_BYTES):
+        if line is not None and not line.strip():
+            continue
+        features, error = _parse(index, line)
+        if error is not None:
+            yield error
+            continue
+        chunk.append((index, features))
+        if len(chunk) >= chunk_size:
+            yield await run_in_threadpool(_score_chunk, chunk)
+            chunk = []
+    if chunk:
+        yield await run_in_threadpool(_score_chunk, chunk)
+
+
+@router.post("/predict/stream", dependencies=[Depends(get_api_key)])
+async def predict_stream(request: Request) -> NDJSONStreamingResponse:
+    """Score un flux NDJSON de payloads `PredictIn` (un objet JSON par ligne).
+
+    Le corps est lu au fil de l'eau et scoré par paquets de
+    `PREDICT_STREAM_CHUNK_SIZE` lignes (un appel modèle par paquet) ; les
+    résultats de chaque paquet sont renvoyés dès qu'il est terminé, sans
+    attendre la fin de l'entrée. Une ligne invalide (JSON, schéma, longueur)
+    produit une ligne d'erreur sans interrompre le flux.
+
+    Args:
+        request: Requête dont le corps est au format NDJSON.
+
+    Returns:
+        Réponse NDJSON en flux, une ligne `PredictStreamItem` par ligne
+        non vide reçue (`index` = numéro de ligne), dans l'ordre de l'entrée
+        pour les lignes valides. Si plus de `PREDICT_STREAM_SPOOL_MAX_BYTES`
+        de résultats attendent d'être lus, le flux s'arrête sur une ligne
+        d'erreur `spool_overflow` d'`index` -1.
+    """
+    settings = get_settings()
+    max_spool = settings.PREDICT_STREAM_SPOOL_MAX_BYTES
+    return NDJSONStreamingResponse(
+        _stream(request),
+        spool_bytes=settings.PREDICT_STREAM_SPOOL_BYTES,
+        max_spool_bytes=max_spool,
+        overflow_line=_error_line(-1, f"Réponse non lue au-delà de {max_spool} octets: flux interrompu", "spool_overflow"),
+    )
@@ -1,6 +1,7 @@
 # app/schemas.py
 from __future__ import annotations
-from typing import Optional, Literal
+from datetime import datetime
+from typing import Annotated, Any, Dict, List, Optional, Literal
 from pydantic import BaseModel, Field, field_validator, ValidationError, ConfigDict, StrictInt
 from pydantic import model_validator
 
@@ -135,5 +136,104 @@ class PredictIn(BaseModel):
 
 
 class PredictionResponse(BaseModel):
+    # protected_namespaces=(): autorise le champ model_version
+    model_config = ConfigDict(protected_namespaces=())
+
+    employee_id: Optional[int] = None
+    pred_quitte_entreprise: Literal["OUI", "NON"]
+    # version (hash court) du modèle qui a produit la prédiction
+    model_version: Optional[str] = None
+
+
+class PredictBatchItem(BaseModel):
+    # une ligne du resultat batch: soit une prediction, soit des erreurs de validation
+    index: int
     employee_id: Optional[int] = None
+    pred_quitte_entreprise: Optional[Literal["OUI", "NON"]] = None
+    errors: Optional[List[Dict[str, Any]]] = None
+
+
+class PredictStreamItem(PredictBatchItem):
+    # une ligne NDJSON de /predict/stream: index = numero de ligne (0-based) dans le corps recu
+    model_config = ConfigDict(protected_namespaces=())
+
+    model_version: Optional[str] = None
+
+
+class PredictBatchResponse(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())
+
+    n_ok: int
+    n_errors: int
+    results: List[PredictBatchItem]
+    model_version: Optional[str] = None
+
+
+class PredictByIdsIn(BaseModel):
+    employee_ids: List[Annotated[int, Field(ge=1)]] = Field(..., min_length=1)
+
+
+class PredictByIdsResponse(BaseModel):
+    # resultats dans l'ordre de la requete, identifiants introuvables a part
+    results: List[PredictionResponse]
+    missing: List[int]
+
+
+class JobSubmitIn(BaseModel):
+    # soit une liste d'identifiants, soit un filtre sur employee_features (pas les deux)
+    model_config = ConfigDict(extra="forbid")
+
+    ids: Optional[List[StrictInt]] = Field(default=None, description="Identifiants employés à scorer")
+    filter: Optional[Dict[str, Any]] = Field(
+        default=None,
+        description='Filtre sur employee_features, ex. {"departement": "COMMERCIAL", "age": {"gte": 30}}',
+    )
+
+    @model_validator(mode="after")
+    def _une_seule_source(self):
+        if (self.ids is None) == (self.filter is None):
+            raise ValueError("Renseigner exactement un champ parmi 'ids' et 'filter'")
+        if self.ids is not None and not self.ids:
+            raise ValueError("La liste 'ids' est vide")
+        return self
+
+
+class JobStatusResponse(BaseModel):
+    # avancement d'un job de scoring: progress = processed / total (None si total inconnu)
+    model_config = ConfigDict(protected_namespaces=())
+
+    job_id: str
+    source: Literal["ids", "filter", "file"]
+    status: Literal["pending", "running", "succeeded", "failed"]
+    total: Optional[int] = None
+    processed: int
+    rows_scored: int
+    rows_skipped: int
+    progress: Optional[float] = None
+    chunks_done: int
+    rows_per_second: Optional[float] = None
+    eta_seconds: Optional[float] = None
+    model_version: Optional[str] = None
+    attempts: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+
+class JobResultItem(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())
+
+    seq: int
+    id_employee: int
+    proba: float
     pred_quitte_entreprise: Literal["OUI", "NON"]
+    model_version: Optional[str] = None
+
+
+class JobResultsPage(BaseModel):
+    # next_after: valeur de ?after= pour la page suivante (inchangée si aucun nouveau résultat)
+    job_id: str
+    status: Literal["pending", "running", "succeeded", "failed"]
+    items: List[JobResultItem]
+    next_after: int
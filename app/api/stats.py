@@ -0,0 +1,44 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends
+
+from app.api.deps import get_api_key
+from app.core.memory import process_memory
+from app.ml.serve import model_service
+from app.ml.registry import model_registry
+from app.ml.batching import micro_batcher
+from app.ml.executor import inference_executor
+from app.ml.cache import prediction_cache
+from app.ml.feature_store import feature_store
+from app.ml.reload import model_reloader
+from app.ml.jobs import job_runner
+from app.db.log_writer import log_writer
+
+router = APIRouter()
+
+
+@router.get("/stats", dependencies=[Depends(get_api_key)])
+def get_stats() -> Dict[str, Any]:
+    """Expose les compteurs internes du service (modèle, rechargement, exécuteur, cache, micro-batching, feature store, logs, jobs).
+
+    Returns:
+        Dictionnaire par composant, destiné au monitoring.
+    """
+    return {
+        "model": {
+            "path": model_service.model_path,
+            "version": model_service.version,
+            "loaded": model_service.model is not None,
+            "compiled": model_service.compiled_active,
+            "flat_engine": model_service.flat_active,
+        },
+        "model_reload": model_reloader.stats(),
+        "model_registry": model_registry.stats(),
+        "process": process_memory(),
+        "prediction_cache": prediction_cache.stats(),
+        "micro_batcher": micro_batcher.stats(),
+        "inference_executor": inference_executor.stats(),
+        "feature_store": feature_store.stats(),
+        "prediction_log_writer": log_writer.stats(),
+        "jobs": job_runner.stats(),
+    }
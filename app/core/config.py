@@ -18,7 +18,80 @@ class Settings(BaseSettings):
     
     model_path: str = Field(default="./models/model.pkl")
 
-    
+    # Inférence "compilée" (sans DataFrame ni ColumnTransformer), activée après contrôle de parité
+    MODEL_COMPILED: bool = Field(default=False)
+    # Moteur d'évaluation des arbres: "sklearn" ou "flat" (tableaux NumPy aplatis, activé après contrôle de parité)
+    MODEL_ENGINE: str = Field(default="sklearn")
+    # Chargement du modèle avec joblib.load(mmap_mode="r") (tableaux partagés entre processus)
+    MODEL_MMAP: bool = Field(default=False)
+    # Surveillance de model.pkl (secondes entre deux vérifications, 0 = désactivée): rechargement à chaud
+    MODEL_WATCH_SECONDS: float = Field(default=0.0)
+
+    # Cache LRU+TTL des prédictions unitaires (clé = hash du payload normalisé + version du modèle)
+    PREDICTION_CACHE_ENABLED: bool = Field(default=False)
+    PREDICTION_CACHE_MAX_ENTRIES: int = Field(default=10000)
+    PREDICTION_CACHE_MAX_BYTES: int = Field(default=32 * 1024 * 1024)
+    PREDICTION_CACHE_TTL_SECONDS: float = Field(default=300.0)
+
+    # Nombre maximum de payloads acceptés par /predict/batch
+    PREDICT_BATCH_MAX_SIZE: int = Field(default=10000)
+    # /predict/stream (NDJSON): lignes scorées par appel modèle et taille maximale d'une ligne
+    PREDICT_STREAM_CHUNK_SIZE: int = Field(default=1000)
+    PREDICT_STREAM_MAX_LINE_BYTES: int = Field(default=1024 * 1024)
+    # résultats en attente d'envoi gardés en mémoire au-delà desquels ils débordent sur disque
+    PREDICT_STREAM_SPOOL_BYTES: int = Field(default=8 * 1024 * 1024)
+    # plafond des résultats en attente (mémoire + disque): au-delà, le flux est interrompu par une ligne d'erreur
+    PREDICT_STREAM_SPOOL_MAX_BYTES: int = Field(default=256 * 1024 * 1024)
+    # /predict/file (CSV/Parquet): lignes lues et scorées par bloc, taille maximale du fichier reçu
+    PREDICT_FILE_CHUNK_SIZE: int = Field(default=50000)
+    PREDICT_FILE_MAX_BYTES: int = Field(default=1024 * 1024 * 1024)
+
+    # Jobs de scoring asynchrones (/jobs): threads de travail par processus (0 = aucun), lignes par bloc commité
+    JOBS_WORKERS: int = Field(default=1)
+    JOBS_CHUNK_SIZE: int = Field(default=1000)
+    JOBS_POLL_SECONDS: float = Field(default=1.0)
+    # un job "running" sans battement de cœur depuis ce délai est repris par un autre runner
+    JOBS_STALE_SECONDS: float = Field(default=60.0)
+    # fichiers reçus par /jobs/file, conservés jusqu'à la fin de leur job
+    JOBS_DIR: str = Field(default="./data/jobs")
+
+    # ETL SQLite (create_db): extraits lus et écrits par blocs (mémoire constante), lignes par bloc, lecteur CSV ("pandas" ou "pyarrow")
+    ETL_STREAMING: bool = Field(default=False)
+    ETL_CHUNK_SIZE: int = Field(default=50000)
+    ETL_CSV_ENGINE: str = Field(default="pandas")
+    # chargement en masse de employee_features (executemany par lots, PRAGMA rapides le temps du chargement)
+    ETL_BULK_LOAD: bool = Field(default=False)
+    ETL_BULK_BATCH_SIZE: int = Field(default=10000)
+    # ingestion delta: n'écrit que les lignes insérées, modifiées (empreinte row_hash) ou supprimées
+    ETL_DELTA: bool = Field(default=False)
+    # chargement en mémoire: threads lisant et nettoyant les trois extraits en parallèle (1 = l'un après l'autre)
+    ETL_READ_WORKERS: int = Field(default=3)
+
+    # Exécution de l'inférence: "inline" (thread appelant), "thread" ou "process" (pool, un modèle par processus)
+    INFERENCE_EXECUTOR: str = Field(default="inline")
+    # Nombre de threads/processus du pool (0 = un par cœur)
+    INFERENCE_WORKERS: int = Field(default=0)
+    # Threads BLAS/OpenMP autorisés par tâche (threadpoolctl)
+    INFERENCE_THREADS_PER_WORKER: int = Field(default=1)
+
+    # Micro-batching des requêtes unitaires (/predict, /predict/by-id)
+    MICROBATCH_ENABLED: bool = Field(default=False)
+    MICROBATCH_MAX_SIZE: int = Field(default=64)
+    MICROBATCH_MAX_WAIT_US: int = Field(default=2000)
+
+    # Chemin de requête asynchrone (AsyncSession via aiosqlite / asyncpg) pour /predict, /predict/by-id et /logs
+    DB_ASYNC: bool = Field(default=False)
+
+    # Écriture des logs de prédiction en arrière-plan (file bornée, écritures par lots)
+    PREDICTION_LOG_ASYNC: bool = Field(default=True)
+    PREDICTION_LOG_QUEUE_SIZE: int = Field(default=10000)
+    PREDICTION_LOG_BATCH_SIZE: int = Field(default=500)
+    PREDICTION_LOG_FLUSH_MS: int = Field(default=200)
+
+    # Copie en mémoire (par colonnes) de employee_features pour /predict/by-id
+    FEATURE_STORE_ENABLED: bool = Field(default=False)
+    FEATURE_STORE_REFRESH_SECONDS: float = Field(default=60.0)
+
     database_url_env: str | None = Field(default=None, alias="DATABASE_URL")
 
     model_config = SettingsConfigDict(
@@ -0,0 +1,45 @@
+# app/core/memory.py
+import os
+from typing import Dict, Optional
+
+try:
+    import resource
+except ImportError:  # pragma: no cover (Windows)
+    resource = None
+
+# Champs de /proc/<pid>/smaps_rollup (en kB) utiles pour mesurer le partage entre workers:
+# Rss compte les pages partagées dans chaque processus, Pss les répartit entre eux.
+_SMAPS_FIELDS = {
+    "Rss": "rss_bytes",
+    "Pss": "pss_bytes",
+    "Shared_Clean": "shared_clean_bytes",
+    "Shared_Dirty": "shared_dirty_bytes",
+    "Private_Clean": "private_clean_bytes",
+    "Private_Dirty": "private_dirty_bytes",
+}
+
+
+def process_memory(pid: Optional[int] = None) -> Dict[str, int]:
+    """Mémoire résidente d'un processus (par défaut le processus courant).
+
+    Sous Linux, lit `/proc/<pid>/smaps_rollup` : RSS, PSS et pages
+    partagées/privées, ce qui permet de vérifier le partage copy-on-write
+    entre workers. Ailleurs, seul le pic RSS du processus courant est connu.
+    """
+    pid = os.getpid() if pid is None else pid
+    out: Dict[str, int] = {"pid": pid}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                name = _SMAPS_FIELDS.get(key)
+                if name is not None:
+                    out[name] = int(rest.split()[0]) * 1024
+        return out
+    except OSError:
+        pass
+    if pid == os.getpid() and resource is not None:
+        # ru_maxrss: kB sous Linux, octets sous macOS
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        out["max_rss_bytes"] = maxrss if os.uname().sysname == "Darwin" else maxrss * 1024
+    return out
@@ -0,0 +1,68 @@
+import importlib.util
+from functools import lru_cache
+from typing import AsyncIterator
+
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from app.core.config import get_settings
+
+# Pilotes asynchrones par backend: aiosqlite pour SQLite, asyncpg pour PostgreSQL.
+# psycopg (v3) sait déjà travailler en asynchrone: l'URL est gardée telle quelle.
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+_ASYNC_CAPABLE = {"aiosqlite", "asyncpg", "psycopg", "psycopg_async"}
+# Module Python importé par chaque pilote (paquet pip du même nom)
+_DRIVER_MODULES = {"aiosqlite": "aiosqlite", "asyncpg": "asyncpg", "psycopg": "psycopg", "psycopg_async": "psycopg"}
+
+
+def async_database_url(url: str) -> str:
+    """Convertit une URL SQLAlchemy synchrone vers son équivalent asynchrone."""
+    u = make_url(url)
+    if u.get_driver_name() in _ASYNC_CAPABLE:
+        return u.render_as_string(hide_password=False)
+    drivername = _ASYNC_DRIVERS.get(u.get_backend_name())
+    if drivername is None:
+        raise ValueError(f"Pas de pilote asynchrone connu pour {u.get_backend_name()!r}")
+    return u.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+def check_async_driver(url: str) -> None:
+    """Refuse `DB_ASYNC=true` au démarrage si le pilote asynchrone de `url` n'est pas installé.
+
+    Sans ce contrôle, l'erreur d'import n'apparaîtrait qu'à la première
+    requête servie par une route asynchrone.
+
+    Raises:
+        RuntimeError: Si le module du pilote (aiosqlite, asyncpg, psycopg) est introuvable.
+    """
+    async_url = make_url(async_database_url(url))
+    driver = async_url.get_driver_name()
+    module = _DRIVER_MODULES.get(driver, driver)
+    if importlib.util.find_spec(module) is None:
+        raise RuntimeError(
+            f"DB_ASYNC=true requiert le pilote {module!r} pour {async_url.get_backend_name()!r}: "
+            f"pip install {module}, ou DB_ASYNC=false"
+        )
+
+
+@lru_cache
+def get_async_engine() -> AsyncEngine:
+    # Créé à la demande: le pilote (aiosqlite, asyncpg) n'est requis qu'avec DB_ASYNC
+    return create_async_engine(async_database_url(get_settings().DATABASE_URL), pool_pre_ping=True)
+
+
+@lru_cache
+def get_async_sessionmaker() -> async_sessionmaker:
+    return async_sessionmaker(get_async_engine(), expire_on_commit=False, autoflush=False)
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+async def dispose_async_engine() -> None:
+    if get_async_engine.cache_info().currsize:
+        await get_async_engine().dispose()
@@ -0,0 +1,166 @@
+# app/db/log_writer.py
+from __future__ import annotations
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.db.repository import save_prediction_logs
+
+_logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class PredictionLogWriter:
+    """Écrit les logs de prédiction en arrière-plan, par lots.
+
+    Les endpoints déposent des records (mêmes clés que les arguments de
+    `save_prediction_log`) dans une file bornée et répondent sans attendre
+    la base. Un thread de fond vide la file dès que `batch_size` records
+    sont disponibles ou que `flush_interval_ms` s'est écoulé, et les écrit
+    via `save_prediction_logs` (un SELECT, un commit par lot).
+
+    File pleine: le record est abandonné et compté dans `dropped` plutôt que
+    de bloquer la requête. Writer arrêté: écriture directe dans le thread
+    appelant.
+    """
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], Session]] = None,
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_interval_ms: int = 200,
+    ):
+        if session_factory is None:
+            from app.db.session import SessionLocal
+
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+        self.max_queue = max(1, int(max_queue))
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval_ms = max(0, int(flush_interval_ms))
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=self.max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self.n_written = 0
+        self.n_flushes = 0
+        self.n_dropped = 0
+        self.n_failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> "PredictionLogWriter":
+        if not self.running:
+            self._thread = threading.Thread(target=self._run, name="prediction-log-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Arrête le thread après avoir écrit tous les records en attente."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def write(self, record: Dict[str, Any]) -> bool:
+        return self.write_many([record]) == 1
+
+    def write_many(self, records: List[Dict[str, Any]]) -> int:
+        """Met les records en file (ou les écrit directement si le writer est arrêté).
+
+        Returns:
+            Nombre de records acceptés.
+        """
+        if not records:
+            return 0
+        if not self.running:
+            self._flush(list(records))
+            return len(records)
+        accepted = 0
+        for rec in records:
+            try:
+                self._queue.put_nowait(rec)
+                accepted += 1
+            except queue.Full:
+                self.n_dropped += 1
+        if accepted < len(records):
+            _logger.warning("File des logs pleine: %s record(s) abandonné(s)", len(records) - accepted)
+        return accepted
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "queue_depth": self._queue.qsize(),
+            "max_queue": self.max_queue,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": self.flush_interval_ms,
+            "written": self.n_written,
+            "flushes": self.n_flushes,
+            "dropped": self.n_dropped,
+            "failed": self.n_failed,
+        }
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.perf_counter() + self.flush_interval_ms / 1000
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+        # Draine ce qui reste pour ne perdre aucun log à l'arrêt
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftovers.append(item)
+        for i in range(0, len(leftovers), self.batch_size):
+            self._flush(leftovers[i:i + self.batch_size])
+
+    def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        db = self.session_factory()
+        try:
+            save_prediction_logs(db, batch)
+            self.n_written += len(batch)
+            self.n_flushes += 1
+        except Exception as e:
+            db.rollback()
+            self.n_failed += len(batch)
+            _logger.warning("Écriture de %s log(s) de prédiction impossible: %s", len(batch), e)
+        finally:
+            db.close()
+
+
+def log_writer_from_settings() -> PredictionLogWriter:
+    from app.core.config import get_settings
+
+    settings = get_settings()
+    return PredictionLogWriter(
+        max_queue=settings.PREDICTION_LOG_QUEUE_SIZE,
+        batch_size=settings.PREDICTION_LOG_BATCH_SIZE,
+        flush_interval_ms=settings.PREDICTION_LOG_FLUSH_MS,
+    )
+
+
+log_writer = log_writer_from_settings()
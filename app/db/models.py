@@ -56,7 +56,32 @@ class EmployeeFeatures(Base):
     heure_supplementaires: Mapped[str] = mapped_column(String)  
     domaine_etude: Mapped[str] = mapped_column(String)
     frequence_deplacement: Mapped[str] = mapped_column(String)
-    
+    # empreinte du contenu de la ligne (app/etl/delta.py): base de l'ingestion delta
+    row_hash: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)
+
+class EmployeeScore(Base):
+    # Scores matérialisés: une ligne par employé, recalculée en une passe après ETL ou changement de modèle
+    __tablename__ = "employee_scores"
+    __table_args__ = ({"schema": "mart"} if not IS_SQLITE else {})
+
+    id_employee: Mapped[int] = mapped_column(Integer, primary_key=True)
+    proba: Mapped[float] = mapped_column(Float, nullable=False)
+    pred_quitte_entreprise: Mapped[str] = mapped_column(String, nullable=False)
+    model_version: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    scored_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    # empreinte des features normalisées ayant produit ce score (re-scoring incrémental)
+    features_hash: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)
+
+class EtlManifest(Base):
+    # Empreinte des extraits chargés dans employee_features (une ligne par source + version du schéma)
+    __tablename__ = "etl_manifest"
+    __table_args__ = ({"schema": "mart"} if not IS_SQLITE else {})
+
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    digest: Mapped[str] = mapped_column(String(64), nullable=False)
+    rows: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    loaded_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+
 class PredictionLog(Base):
     __tablename__ = "prediction_log"
     __table_args__ = (
@@ -84,3 +109,45 @@ class ErrorLog(Base):
     error_class: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     error_message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     context: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False, default=dict)
+
+
+class ScoringJob(Base):
+    # Job de scoring asynchrone (/jobs): source, avancement et curseur de reprise du dernier bloc commité
+    __tablename__ = "scoring_jobs"
+    __table_args__ = ({"schema": "ml_logs"} if not IS_SQLITE else {})
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    source: Mapped[str] = mapped_column(String, nullable=False)
+    params: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False)
+    status: Mapped[str] = mapped_column(String, nullable=False, default="pending", index=True)
+    total: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    rows_scored: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    rows_skipped: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    chunks_done: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    cursor: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    rows_per_second: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    model_version: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    owner: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+
+class ScoringJobResult(Base):
+    # Résultats d'un job, numérotés dans l'ordre de production (pagination par seq)
+    __tablename__ = "scoring_job_results"
+    __table_args__ = ({"schema": "ml_logs"} if not IS_SQLITE else {})
+
+    job_id: Mapped[str] = mapped_column(
+        String(32),
+        ForeignKey(("ml_logs." if not IS_SQLITE else "") + "scoring_jobs.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True)
+    id_employee: Mapped[int] = mapped_column(BigIntCompat, nullable=False)
+    proba: Mapped[float] = mapped_column(Float, nullable=False)
+    pred_quitte_entreprise: Mapped[str] = mapped_column(String, nullable=False)
+    model_version: Mapped[Optional[str]] = mapped_column(String, nullable=True)
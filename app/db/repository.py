@@ -2,8 +2,9 @@ from typing import Optional, Dict, Any, List
 from datetime import datetime
 from decimal import Decimal
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from .models import  PredictionLog, ErrorLog
+from .models import  EmployeeFeatures, PredictionLog, ErrorLog
 
 try:
     import numpy as _np  # type: ignore
@@ -32,6 +33,40 @@ def _to_jsonable(val: Any) -> Any:
         return val.isoformat()
     # Dernier recours: stringifier
     return str(val)
+# Colonnes réécrites quand un log existe déjà pour l'employé (created_at garde la première écriture)
+_UPSERT_COLS = ("endpoint", "requested_by", "latency_ms", "status", "payload", "output")
+
+
+def _log_row(rec: Dict[str, Any]) -> Dict[str, Any]:
+    # Nettoyage des structures JSON pour éviter les erreurs (Decimal non sérialisable, numpy, ...)
+    return {
+        "created_at": datetime.utcnow(),
+        "endpoint": rec["endpoint"],
+        "requested_by": rec.get("requested_by"),
+        "employee_id": rec.get("employee_id"),
+        "latency_ms": rec.get("latency_ms"),
+        "status": rec.get("status", "OK"),
+        "payload": _to_jsonable(rec["payload"]),
+        "output": _to_jsonable(rec["output"]),
+    }
+
+
+def _upsert_statement(db: Session | AsyncSession):
+    # INSERT ... ON CONFLICT (employee_id) DO UPDATE, selon le dialecte; None si non supporté
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    stmt = dialect_insert(PredictionLog)
+    return stmt.on_conflict_do_update(
+        index_elements=[PredictionLog.employee_id],
+        set_={c: stmt.excluded[c] for c in _UPSERT_COLS},
+    )
+
+
 def save_prediction_log(
     db: Session,
     *,
@@ -43,21 +78,11 @@ def save_prediction_log(
     payload: Dict[str, Any],
     output: Dict[str, Any],
 ) -> PredictionLog:
-    # Upsert par employee_id: si une ligne existe déjà, on l'écrase
-    # Nettoyage des structures JSON pour éviter les erreurs (Decimal non sérialisable, numpy, ...)
-    payload = _to_jsonable(payload)
-    output = _to_jsonable(output)
-    row = None
-    if employee_id is not None:
-        # Utilise first() pour éviter toute exception MultipleResultsFound si des doublons existent déjà
-        row = (
-            db.query(PredictionLog)
-            .filter(PredictionLog.employee_id == employee_id)
-            .order_by(PredictionLog.id.desc())
-            .first()
-        )
-    if row is None:
-        row = PredictionLog(
+    # Upsert par employee_id: si une ligne existe déjà, on l'écrase.
+    # Une seule instruction (ON CONFLICT ... RETURNING) au lieu de SELECT + INSERT/UPDATE + refresh,
+    # ce qui règle aussi la course entre deux écritures concurrentes pour le même employé.
+    row = _log_row(
+        dict(
             endpoint=endpoint,
             requested_by=requested_by,
             employee_id=employee_id,
@@ -66,17 +91,66 @@ def save_prediction_log(
             payload=payload,
             output=output,
         )
-        db.add(row)
+    )
+    stmt = _upsert_statement(db)
+    if stmt is None:
+        _save_prediction_logs_orm(db, [row])
+        db.commit()
+        return get_prediction_log_by_employee_id(db, employee_id=employee_id) if employee_id is not None else None
+    log = db.scalars(
+        stmt.values(**row).returning(PredictionLog),
+        execution_options={"populate_existing": True},
+    ).one()
+    db.commit()
+    return log
+
+
+def save_prediction_logs(db: Session, records: List[Dict[str, Any]]) -> int:
+    # Variante bulk de save_prediction_log: une seule instruction upsert (executemany) et un seul commit.
+    # Chaque record porte les mêmes clés que les arguments nommés de save_prediction_log.
+    if not records:
+        return 0
+    # Dédoublonnage par employee_id: le dernier record du lot l'emporte (même sémantique d'upsert,
+    # et PostgreSQL refuse qu'une même instruction mette à jour deux fois la même ligne)
+    by_employee: Dict[int, Dict[str, Any]] = {}
+    anonymous: List[Dict[str, Any]] = []
+    for rec in records:
+        if rec.get("employee_id") is None:
+            anonymous.append(rec)
+        else:
+            by_employee[rec["employee_id"]] = rec
+    rows = [_log_row(rec) for rec in list(by_employee.values()) + anonymous]
+
+    stmt = _upsert_statement(db)
+    if stmt is None:
+        _save_prediction_logs_orm(db, rows)
     else:
-        row.endpoint = endpoint
-        row.requested_by = requested_by
-        row.latency_ms = latency_ms
-        row.status = status
-        row.payload = payload
-        row.output = output
+        # employee_id NULL n'entre jamais en conflit: simple insertion
+        db.execute(stmt, rows)
     db.commit()
-    db.refresh(row)
-    return row
+    return len(rows)
+
+
+def _save_prediction_logs_orm(db: Session, rows: List[Dict[str, Any]]) -> None:
+    # Repli pour les dialectes sans ON CONFLICT: un SELECT IN puis mise à jour ou insertion
+    ids = [r["employee_id"] for r in rows if r["employee_id"] is not None]
+    existing: Dict[int, PredictionLog] = {}
+    if ids:
+        found = (
+            db.query(PredictionLog)
+            .filter(PredictionLog.employee_id.in_(ids))
+            .order_by(PredictionLog.id.desc())
+            .all()
+        )
+        for log in found:
+            existing.setdefault(log.employee_id, log)
+    for r in rows:
+        log = existing.get(r["employee_id"]) if r["employee_id"] is not None else None
+        if log is None:
+            db.add(PredictionLog(**r))
+        else:
+            for c in _UPSERT_COLS:
+                setattr(log, c, r[c])
 
 def get_prediction_log_by_employee_id(db: Session, *, employee_id: int) -> Optional[PredictionLog]:
     return (
@@ -106,3 +180,57 @@ def save_error_log(
     db.commit()
     db.refresh(row)
     return row
+
+
+# --- Variantes AsyncSession (DB_ASYNC): mêmes requêtes, sans bloquer la boucle d'événements ---
+
+async def save_prediction_log_async(db: AsyncSession, **kwargs: Any) -> PredictionLog:
+    # Mêmes arguments nommés que save_prediction_log; upsert en une instruction
+    row = _log_row(kwargs)
+    stmt = _upsert_statement(db)
+    if stmt is None:
+        return await _save_prediction_log_orm_async(db, row)
+    log = (
+        await db.scalars(
+            stmt.values(**row).returning(PredictionLog),
+            execution_options={"populate_existing": True},
+        )
+    ).one()
+    await db.commit()
+    return log
+
+
+async def _save_prediction_log_orm_async(db: AsyncSession, row: Dict[str, Any]) -> PredictionLog:
+    # Repli sans ON CONFLICT, comme _save_prediction_logs_orm: dernier log de l'employé mis à jour, sinon insertion
+    log = None
+    if row["employee_id"] is not None:
+        log = await get_prediction_log_by_employee_id_async(db, employee_id=row["employee_id"])
+    if log is None:
+        log = PredictionLog(**row)
+        db.add(log)
+    else:
+        for c in _UPSERT_COLS:
+            setattr(log, c, row[c])
+    await db.commit()
+    return log
+
+
+async def get_prediction_log_by_employee_id_async(db: AsyncSession, *, employee_id: int) -> Optional[PredictionLog]:
+    stmt = (
+        select(PredictionLog)
+        .where(PredictionLog.employee_id == employee_id)
+        .order_by(PredictionLog.id.desc())
+        .limit(1)
+    )
+    return (await db.scalars(stmt)).first()
+
+
+async def get_employee_features_async(
+    db: AsyncSession, *, employee_id: int, columns: List[str]
+) -> Optional[Dict[str, Any]]:
+    # Lecture des seules colonnes du modèle (pas d'objet ORM complet)
+    stmt = select(*[getattr(EmployeeFeatures, c) for c in columns]).where(
+        EmployeeFeatures.id_employee == employee_id
+    )
+    row = (await db.execute(stmt)).first()
+    return dict(zip(columns, row)) if row is not None else None
@@ -0,0 +1,44 @@
+# app/db/schema.py
+from __future__ import annotations
+import logging
+from typing import List
+
+from sqlalchemy import inspect, text
+
+from .base import Base
+
+_logger = logging.getLogger(__name__)
+
+
+def add_missing_columns(bind, metadata=None) -> List[str]:
+    """Ajoute aux tables existantes les colonnes nullables déclarées depuis leur création.
+
+    `create_all` crée les tables absentes mais ne modifie jamais une table
+    existante ; une base créée par une version précédente reçoit ainsi les
+    nouvelles colonnes optionnelles (ALTER TABLE ... ADD COLUMN). Les
+    colonnes NOT NULL ne sont pas ajoutées (elles demandent une vraie
+    migration) et sont seulement signalées.
+
+    Returns:
+        Colonnes ajoutées, sous la forme `table.colonne`.
+    """
+    metadata = metadata or Base.metadata
+    insp = inspect(bind)
+    added = []
+    for table in metadata.sorted_tables:
+        if not insp.has_table(table.name, schema=table.schema):
+            continue
+        existing = {c["name"] for c in insp.get_columns(table.name, schema=table.schema)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable:
+                _logger.warning("Colonne %s.%s absente et NOT NULL: migration manuelle requise", table.fullname, column.name)
+                continue
+            col_type = column.type.compile(dialect=bind.dialect)
+            with bind.begin() as conn:
+                conn.execute(text(f'ALTER TABLE {table.fullname} ADD COLUMN "{column.name}" {col_type}'))
+            added.append(f"{table.fullname}.{column.name}")
+    if added:
+        _logger.info("Colonnes ajoutées: %s", ", ".join(added))
+    return added
@@ -0,0 +1,279 @@
+# app/etl/cleaning.py
+"""Nettoyage des extraits SIRH / évaluations / sondage vers le format `employee_features`.
+
+Partagé par l'initialisation de la base (`scripts/create_db.py`) et le
+scoring de fichiers (`app/ml/file_scoring.py`). Chaque fonction ne traite
+que les colonnes présentes : un même DataFrame peut contenir les colonnes
+d'un seul extrait ou des trois (fichier déjà fusionné).
+"""
+from __future__ import annotations
+import re
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+SIRH_NUM_COLS = [
+    "id_employee",
+    "age",
+    "revenu_mensuel",
+    "nombre_experiences_precedentes",
+    "nombre_heures_travailless",
+    "annee_experience_totale",
+    "annees_dans_l_entreprise",
+    "annees_dans_le_poste_actuel",
+]
+SIRH_CAT_COLS = ["genre", "statut_marital", "departement", "poste"]
+
+EVAL_NUM_COLS = [
+    "satisfaction_employee_environnement",
+    "note_evaluation_precedente",
+    "niveau_hierarchique_poste",
+    "satisfaction_employee_nature_travail",
+    "satisfaction_employee_equipe",
+    "satisfaction_employee_equilibre_pro_perso",
+    "note_evaluation_actuelle",
+    "augementation_salaire_precedente",
+]
+
+SONDAGE_CAT_COLS = [
+    "a_quitte_l_entreprise",
+    "domaine_etude",
+    "ayant_enfants",
+    "frequence_deplacement",
+]
+SONDAGE_NUM_COLS = [
+    "nombre_participation_pee",
+    "nb_formations_suivies",
+    "nombre_employee_sous_responsabilite",
+    "distance_domicile_travail",
+    "niveau_education",
+    "annees_depuis_la_derniere_promotion",
+    "annes_sous_responsable_actuel",
+]
+
+# Colonnes cibles selon le modèle ORM EmployeeFeatures
+FEATURE_TABLE_COLS = [
+    "id_employee",
+    "a_quitte_l_entreprise",
+    "age",
+    "nombre_experiences_precedentes",
+    "annees_dans_le_poste_actuel",
+    "satisfaction_employee_environnement",
+    "note_evaluation_precedente",
+    "niveau_hierarchique_poste",
+    "satisfaction_employee_nature_travail",
+    "satisfaction_employee_equipe",
+    "satisfaction_employee_equilibre_pro_perso",
+    "note_evaluation_actuelle",
+    "augementation_salaire_precedente",
+    "nombre_participation_pee",
+    "nb_formations_suivies",
+    "distance_domicile_travail",
+    "niveau_education",
+    "annees_depuis_la_derniere_promotion",
+    "annes_sous_responsable_actuel",
+    "anciennete_log",
+    "annee_experience_totale_log",
+    "genre",
+    "statut_marital",
+    "departement",
+    "poste",
+    "heure_supplementaires",
+    "domaine_etude",
+    "frequence_deplacement",
+]
+FEATURE_NUM_COLS = [
+    "age",
+    "nombre_experiences_precedentes",
+    "annees_dans_le_poste_actuel",
+    "satisfaction_employee_environnement",
+    "note_evaluation_precedente",
+    "niveau_hierarchique_poste",
+    "satisfaction_employee_nature_travail",
+    "satisfaction_employee_equipe",
+    "satisfaction_employee_equilibre_pro_perso",
+    "note_evaluation_actuelle",
+    "augementation_salaire_precedente",
+    "nombre_participation_pee",
+    "nb_formations_suivies",
+    "distance_domicile_travail",
+    "niveau_education",
+    "annees_depuis_la_derniere_promotion",
+    "annes_sous_responsable_actuel",
+    "anciennete_log",
+    "annee_experience_totale_log",
+]
+FEATURE_CAT_COLS = [
+    "a_quitte_l_entreprise",
+    "genre",
+    "statut_marital",
+    "departement",
+    "poste",
+    "heure_supplementaires",
+    "domaine_etude",
+    "frequence_deplacement",
+]
+
+# Version du nettoyage et du schéma de `employee_features` : à incrémenter quand
+# le résultat de l'ETL change pour des extraits identiques (nouvelle colonne,
+# règle de nettoyage modifiée), afin que le manifeste force un rechargement.
+ETL_SCHEMA_VERSION = 1
+
+
+# préfixe non numérique des identifiants d'évaluation ("E_12" -> "12")
+_LEADING_NON_DIGITS = re.compile(r"^\D+")
+
+
+def map_str_values(s: pd.Series, func: Callable[[str], object]) -> pd.Series:
+    """Applique `func` au texte (`str(v)`, comme `astype(str)`) de chaque valeur de `s`.
+
+    Une seule passe par colonne : `func` n'est évaluée qu'une fois par
+    valeur distincte, puis le résultat est redistribué par les codes de
+    `pd.factorize`. Remplace les chaînes d'appels `.str` (une copie de la
+    colonne par appel) ; les catégorielles n'ont que quelques valeurs
+    distinctes quel que soit le volume.
+    """
+    codes, uniques = pd.factorize(s)
+    mapped = np.empty(len(uniques) + 1, dtype=object)
+    mapped[:-1] = [func(str(v)) for v in uniques]
+    out = mapped.take(codes)
+    # absents (code -1) un par un: factorize confond NaN et None, que str() distingue ("nan" / "None")
+    missing = np.flatnonzero(codes < 0)
+    if len(missing):
+        values = s.to_numpy(dtype=object)
+        out[missing] = [func(str(values[i])) for i in missing]
+    return pd.Series(out, index=s.index, name=s.name)
+
+
+def _upper_strip(v: str) -> Optional[str]:
+    return v.strip().upper() or None
+
+
+def _eval_number_digits(v: str) -> str:
+    # espaces retirés puis préfixe non numérique supprimé (la casse ne change pas les chiffres)
+    return _LEADING_NON_DIGITS.sub("", v.replace(" ", ""))
+
+
+def _percent_text(v: str) -> str:
+    # "11 %" -> "11", "1,5" -> "1.5"
+    return v.strip().replace("%", "").replace(",", ".")
+
+
+def _without_spaces(v: str) -> str:
+    return v.replace(" ", "")
+
+
+def upper_strip_series(s: pd.Series) -> pd.Series:
+    return map_str_values(s, _upper_strip)
+
+
+def _id_from_text(s: pd.Series, func: Callable[[str], str]) -> pd.Series:
+    # colonne déjà numérique (lecture pandas par défaut): texte normalisé = même nombre, pas de passe texte
+    if pd.api.types.is_integer_dtype(s) or pd.api.types.is_float_dtype(s):
+        return pd.to_numeric(s, errors="coerce")
+    return pd.to_numeric(map_str_values(s, func), errors="coerce")
+
+
+def clean_sirh(df: pd.DataFrame) -> pd.DataFrame:
+    """SIRH: numériques + catégorielles en majuscules (modifie `df` en place)."""
+    for col in SIRH_NUM_COLS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    for col in SIRH_CAT_COLS:
+        if col in df.columns:
+            df[col] = upper_strip_series(df[col])
+    return df
+
+
+def clean_eval(df: pd.DataFrame) -> pd.DataFrame:
+    """EVAL: id_employee depuis eval_number + numériques + heure_supplementaires (en place)."""
+    if "eval_number" in df.columns and "id_employee" not in df.columns:
+        df["id_employee"] = _id_from_text(df["eval_number"], _eval_number_digits)
+    for col in EVAL_NUM_COLS:
+        if col in df.columns:
+            if col == "augementation_salaire_precedente":
+                df[col] = map_str_values(df[col], _percent_text)
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    if "heure_supplementaires" in df.columns:
+        df["heure_supplementaires"] = upper_strip_series(df["heure_supplementaires"])
+    return df
+
+
+def clean_sondage(df: pd.DataFrame) -> pd.DataFrame:
+    """SONDAGE: id depuis code_sondage + numériques + catégorielles (en place)."""
+    if "code_sondage" in df.columns and "id_employee" not in df.columns:
+        df["id_employee"] = _id_from_text(df["code_sondage"], _without_spaces)
+    for col in SONDAGE_CAT_COLS:
+        if col in df.columns:
+            df[col] = upper_strip_series(df[col])
+    for col in SONDAGE_NUM_COLS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df
+
+
+def clean_flat(df: pd.DataFrame) -> pd.DataFrame:
+    """Nettoie un extrait unique portant les colonnes d'un ou plusieurs des trois fichiers."""
+    return clean_sondage(clean_eval(clean_sirh(df)))
+
+
+def merge_sources(
+    sirh: pd.DataFrame,
+    evaldf: Optional[pd.DataFrame] = None,
+    sond: Optional[pd.DataFrame] = None,
+) -> pd.DataFrame:
+    """Jointures gauches SIRH -> évaluations -> sondage sur `id_employee`."""
+    df = sirh
+    for other in (evaldf, sond):
+        if other is not None:
+            df = df.merge(other, on="id_employee", how="left")
+    return df
+
+
+def log_positive(series: pd.Series) -> pd.Series:
+    # log naturel des valeurs > 0, NaN sinon
+    s = pd.to_numeric(series, errors="coerce")
+    s = s.mask(~(s > 0))
+    return np.log(s)
+
+
+def add_log_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Features dérivées `anciennete_log` et `annee_experience_totale_log` (en place)."""
+    if "annees_dans_l_entreprise" in df.columns:
+        df["anciennete_log"] = log_positive(df["annees_dans_l_entreprise"])
+    elif "anciennete_log" not in df.columns:
+        df["anciennete_log"] = np.nan
+    if "annee_experience_totale" in df.columns:
+        df["annee_experience_totale_log"] = log_positive(df["annee_experience_totale"])
+    elif "annee_experience_totale_log" not in df.columns:
+        df["annee_experience_totale_log"] = np.nan
+    return df
+
+
+def to_employee_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Restreint aux colonnes de `employee_features` et applique ses contraintes NOT NULL.
+
+    Les lignes sans `id_employee` sont écartées, les numériques manquants
+    valent 0 et les catégorielles manquantes une chaîne vide (normalisée à
+    `None` côté API).
+    """
+    cols_presentes = [c for c in FEATURE_TABLE_COLS if c in df.columns]
+    df_out = df[cols_presentes].copy()
+
+    # 1) id_employee non nul et entier
+    if "id_employee" in df_out.columns:
+        df_out = df_out[pd.notna(df_out["id_employee"])].copy()
+        df_out["id_employee"] = pd.to_numeric(df_out["id_employee"], errors="coerce").fillna(0).astype(int)
+
+    # 2) Remplissage des numériques manquants par 0
+    for c in FEATURE_NUM_COLS:
+        if c in df_out.columns:
+            df_out[c] = pd.to_numeric(df_out[c], errors="coerce").fillna(0)
+
+    # 3) Remplissage des catégorielles manquantes par chaîne vide
+    for c in FEATURE_CAT_COLS:
+        if c in df_out.columns:
+            df_out[c] = df_out[c].astype(object)
+            df_out[c] = df_out[c].where(pd.notna(df_out[c]), "")
+    return df_out
@@ -0,0 +1,220 @@
+# app/etl/delta.py
+"""Ingestion incrémentale de `employee_features` (insertions, mises à jour, suppressions).
+
+Chaque ligne porte l'empreinte de son contenu (`row_hash`). Une ingestion
+delta compare les lignes produites par l'ETL à l'état courant de la table,
+bloc par bloc, et n'écrit que les différences : upsert par `id_employee`
+pour les lignes nouvelles ou modifiées, suppression des identifiants
+absents des extraits. L'ensemble des identifiants touchés est renvoyé pour
+que les consommateurs (scores, caches) ne recalculent que ceux-là.
+"""
+from __future__ import annotations
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, insert, select, update
+
+from app.db.models import EmployeeFeatures, EtlManifest
+from app.etl.cleaning import FEATURE_CAT_COLS, FEATURE_NUM_COLS
+
+_logger = logging.getLogger(__name__)
+
+# Entrée du manifeste portant la version du schéma, le nombre de lignes de employee_features et
+# l'horodatage de sa dernière écriture (marqueur de changement lu par le feature store)
+MANIFEST_FEATURES_KEY = "employee_features"
+
+# identifiants par requête IN / DELETE (sous la limite de variables des anciens SQLite)
+_ID_BATCH = 500
+# identifiants lus par page lors de la recherche des suppressions
+_ID_PAGE = 100_000
+
+
+def hash_rows(canon: pd.DataFrame) -> np.ndarray:
+    """Empreinte 64 bits de chaque ligne d'un DataFrame déjà canonique, en 16 caractères hexadécimaux.
+
+    Un seul `hash_pandas_object` vectorisé (index exclu) ; partagé par
+    `row_hash` et `app.ml.scoring.features_hash`, qui ne diffèrent que par
+    leur forme canonique.
+    """
+    hashed = pd.util.hash_pandas_object(canon, index=False).to_numpy()
+    # octets gros-boutistes -> hexadécimal: identique à f"{h:016x}", sans boucle Python
+    hexed = hashed.astype(">u8").tobytes().hex().encode("ascii")
+    return np.frombuffer(hexed, dtype="S16").astype(str).astype(object)
+
+
+def row_hash(df: pd.DataFrame) -> np.ndarray:
+    """Empreinte (16 caractères hexadécimaux) du contenu de chaque ligne de `employee_features`.
+
+    Calculée hors `id_employee` sur une forme canonique (numériques en
+    flottants, catégorielles en texte) : le résultat ne dépend pas des types
+    produits par le chemin de lecture (en mémoire, par blocs, pandas ou
+    pyarrow).
+    """
+    canon = pd.DataFrame(index=df.index)
+    for c in FEATURE_NUM_COLS:
+        canon[c] = pd.to_numeric(df[c], errors="coerce").astype("float64")
+    for c in FEATURE_CAT_COLS:
+        canon[c] = df[c].astype(str)
+    return hash_rows(canon)
+
+
+@dataclass
+class DeltaResult:
+    """Identifiants insérés, mis à jour et supprimés par une ingestion.
+
+    `full` signale un rechargement complet de la table : les listes sont
+    alors vides et tous les identifiants doivent être considérés comme
+    modifiés.
+    """
+
+    inserted: List[int] = field(default_factory=list)
+    updated: List[int] = field(default_factory=list)
+    deleted: List[int] = field(default_factory=list)
+    unchanged: int = 0
+    full: bool = False
+
+    def changed_ids(self) -> List[int]:
+        """Identifiants touchés (insérés, mis à jour ou supprimés), triés."""
+        return sorted(set(self.inserted) | set(self.updated) | set(self.deleted))
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "inserted": len(self.inserted),
+            "updated": len(self.updated),
+            "deleted": len(self.deleted),
+            "unchanged": self.unchanged,
+            "full": self.full,
+        }
+
+
+def _features_upsert(conn):
+    # INSERT ... ON CONFLICT (id_employee) DO UPDATE selon le dialecte; None si non supporté
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    stmt = dialect_insert(EmployeeFeatures)
+    cols = [c.name for c in EmployeeFeatures.__table__.columns if c.name != "id_employee"]
+    return stmt.on_conflict_do_update(
+        index_elements=[EmployeeFeatures.id_employee],
+        set_={c: stmt.excluded[c] for c in cols},
+    )
+
+
+def upsert_employee_features(conn, df: pd.DataFrame) -> None:
+    """Écrit des lignes `employee_features` (avec `row_hash`) en remplaçant celles de même identifiant."""
+    if df.empty:
+        return
+    records = df.astype(object).where(df.notna(), None).to_dict("records")
+    stmt = _features_upsert(conn)
+    if stmt is None:
+        conn.execute(delete(EmployeeFeatures).where(EmployeeFeatures.id_employee.in_([r["id_employee"] for r in records])))
+        stmt = insert(EmployeeFeatures)
+    conn.execute(stmt, records)
+
+
+def mark_features_written(conn, rows: Optional[int] = None, digest: Optional[str] = None) -> datetime:
+    """Marque `employee_features` comme modifiée, dans la transaction de l'écriture.
+
+    Tout écrivain de la table (ETL ou non) appelle cette fonction : l'entrée
+    `MANIFEST_FEATURES_KEY` de `etl_manifest` reçoit un nouveau `loaded_at`,
+    toujours différent du précédent, que le feature store compare à son
+    instantané. `rows` et `digest` ne sont mis à jour que s'ils sont fournis ;
+    une entrée créée ici sans `digest` (écriture hors ETL) fera recharger la
+    table au prochain passage de l'ETL.
+
+    Returns:
+        Le nouvel horodatage.
+    """
+    previous = conn.execute(select(EtlManifest.loaded_at).where(EtlManifest.name == MANIFEST_FEATURES_KEY)).scalar()
+    now = datetime.now(timezone.utc)
+    if previous is not None and previous.replace(tzinfo=None) >= now.replace(tzinfo=None):
+        # horloge identique ou en retard: le marqueur change quand même
+        now = previous.replace(tzinfo=timezone.utc) + timedelta(microseconds=1)
+    values: Dict[str, Any] = {"loaded_at": now}
+    if rows is not None:
+        values["rows"] = rows
+    if digest is not None:
+        values["digest"] = digest
+    if previous is None:
+        conn.execute(insert(EtlManifest).values(name=MANIFEST_FEATURES_KEY, **{"digest": "", **values}))
+    else:
+        conn.execute(update(EtlManifest).where(EtlManifest.name == MANIFEST_FEATURES_KEY).values(**values))
+    return now
+
+
+def _current_hashes(conn, ids: np.ndarray) -> pd.Series:
+    # row_hash en base des identifiants demandés (NaN si absent ou jamais calculé)
+    lo, hi = int(ids.min()), int(ids.max())
+    cols = (EmployeeFeatures.id_employee, EmployeeFeatures.row_hash)
+    if hi - lo < 4 * len(ids):
+        prev = pd.read_sql(select(*cols).where(EmployeeFeatures.id_employee.between(lo, hi)), conn)
+    else:
+        prev = pd.concat(
+            [
+                pd.read_sql(select(*cols).where(EmployeeFeatures.id_employee.in_(ids[i:i + _ID_BATCH].tolist())), conn)
+                for i in range(0, len(ids), _ID_BATCH)
+            ],
+            ignore_index=True,
+        )
+    return prev.set_index("id_employee")["row_hash"]
+
+
+def apply_delta(conn, chunks: Iterable[pd.DataFrame]) -> DeltaResult:
+    """Applique à `employee_features` les seules différences avec les blocs produits par l'ETL.
+
+    Les blocs (format `to_employee_features`) sont comparés à la table par
+    leur `row_hash` ; les lignes nouvelles ou modifiées sont écrites par
+    upsert, puis les identifiants de la table absents de tous les blocs sont
+    supprimés. Tout se fait sur `conn`, dans la transaction de l'appelant.
+
+    Returns:
+        Identifiants insérés, mis à jour et supprimés, et nombre de lignes inchangées.
+    """
+    t0 = time.perf_counter()
+    result = DeltaResult()
+    seen: List[np.ndarray] = []
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        chunk = chunk.drop_duplicates("id_employee", keep="last").copy()
+        chunk["row_hash"] = row_hash(chunk)
+        ids = chunk["id_employee"].to_numpy(dtype=np.int64)
+        seen.append(ids)
+        prev = _current_hashes(conn, ids)
+        exists = np.isin(ids, prev.index.to_numpy())
+        # ligne existante sans empreinte (chargée avant row_hash): comptée comme mise à jour
+        changed = prev.reindex(ids).to_numpy() != chunk["row_hash"].to_numpy()
+        upsert_employee_features(conn, chunk[changed])
+        result.inserted.extend(ids[~exists].tolist())
+        result.updated.extend(ids[exists & changed].tolist())
+        result.unchanged += int((~changed).sum())
+
+    # suppressions: identifiants en base absents des extraits, lus par pages d'identifiants seuls
+    incoming = np.unique(np.concatenate(seen)) if seen else np.empty(0, dtype=np.int64)
+    after = None
+    while True:
+        stmt = select(EmployeeFeatures.id_employee).order_by(EmployeeFeatures.id_employee).limit(_ID_PAGE)
+        if after is not None:
+            stmt = stmt.where(EmployeeFeatures.id_employee > after)
+        page = np.fromiter(conn.execute(stmt).scalars(), dtype=np.int64)
+        if not len(page):
+            break
+        after = int(page[-1])
+        result.deleted.extend(page[~np.isin(page, incoming)].tolist())
+    for i in range(0, len(result.deleted), _ID_BATCH):
+        conn.execute(delete(EmployeeFeatures).where(EmployeeFeatures.id_employee.in_(result.deleted[i:i + _ID_BATCH])))
+
+    _logger.info(
+        "Ingestion delta: %s insérées, %s mises à jour, %s supprimées, %s inchangées en %.2fs",
+        len(result.inserted), len(result.updated), len(result.deleted), result.unchanged, time.perf_counter() - t0,
+    )
+    return result
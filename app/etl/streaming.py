@@ -0,0 +1,214 @@
+# app/etl/streaming.py
+"""ETL par blocs des extraits SIRH / évaluations / sondage (mémoire constante).
+
+Variante de la chaîne en mémoire de `scripts/create_db.py` pour les gros
+volumes : les extraits d'évaluation et de sondage sont d'abord nettoyés bloc
+par bloc et rangés dans une base SQLite temporaire indexée sur
+`id_employee` ; le SIRH est ensuite lu par blocs, et chaque bloc est joint
+aux seules lignes correspondantes de ces index, nettoyé et rendu au format
+`employee_features` avant la lecture du suivant. Le résultat est identique
+à `merge_sources` + `add_log_features` + `to_employee_features` sur les
+fichiers entiers.
+"""
+from __future__ import annotations
+import csv
+import logging
+import os
+import tempfile
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, create_engine, text
+
+from app.etl.cleaning import (
+    add_log_features,
+    clean_eval,
+    clean_sirh,
+    clean_sondage,
+    merge_sources,
+    to_employee_features,
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pragma: no cover
+    pa = None
+    pa_csv = None
+
+_logger = logging.getLogger(__name__)
+
+CSV_ENGINES = ("pandas", "pyarrow")
+
+# identifiants par requête IN (sous la limite de variables des anciens SQLite)
+_LOOKUP_BATCH = 500
+# recherche par plage tant que l'étendue des identifiants d'un bloc reste proche de sa taille
+_RANGE_SPAN_FACTOR = 4
+
+
+def _arrow_frame(table) -> pd.DataFrame:
+    df = table.to_pandas()
+    # valeurs absentes en NaN, comme pd.read_csv (le nettoyage convertit "None" en texte sinon)
+    return df.where(df.notna(), np.nan)
+
+
+def _read_csv_arrow(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    if pa_csv is None:
+        raise RuntimeError("pyarrow est requis pour ETL_CSV_ENGINE=pyarrow: pip install pyarrow")
+    with open(path, newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f), [])
+    convert = pa_csv.ConvertOptions(column_types={c: pa.string() for c in header}, strings_can_be_null=True)
+    pending, n = [], 0
+    with pa_csv.open_csv(path, convert_options=convert) as reader:
+        for batch in reader:
+            pending.append(batch)
+            n += batch.num_rows
+            # le lecteur produit des blocs d'octets: redécoupés en blocs de chunk_size lignes
+            while n >= chunk_size:
+                table = pa.Table.from_batches(pending)
+                yield _arrow_frame(table.slice(0, chunk_size))
+                rest = table.slice(chunk_size)
+                pending, n = rest.to_batches(), rest.num_rows
+    if n:
+        yield _arrow_frame(pa.Table.from_batches(pending))
+
+
+def read_csv_chunks(path: str, chunk_size: int, engine: str = "pandas") -> Iterator[pd.DataFrame]:
+    """Lit un CSV par blocs de `chunk_size` lignes, toutes colonnes en texte.
+
+    Le nettoyage convertit lui-même les numériques (ex. "11 %", "000001") ;
+    le moteur `pyarrow` décode le fichier par blocs sur plusieurs threads.
+    """
+    if engine not in CSV_ENGINES:
+        raise ValueError(f"Moteur CSV inconnu: {engine!r} (attendu: {', '.join(CSV_ENGINES)})")
+    chunk_size = max(1, int(chunk_size))
+    if engine == "pyarrow":
+        yield from _read_csv_arrow(path, chunk_size)
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype=str, encoding="utf-8")
+
+
+class SourceIndex:
+    """Extrait auxiliaire nettoyé, rangé dans une table SQLite indexée sur `id_employee`.
+
+    `build` l'alimente bloc par bloc ; `lookup` ne relit ensuite que les
+    lignes des identifiants demandés, dans l'ordre du fichier pour un même
+    identifiant (mêmes lignes et même ordre qu'une jointure en mémoire).
+    """
+
+    def __init__(self, conn, table: str):
+        self.conn = conn
+        self.table = table
+        self.rows = 0
+        self._columns: Optional[list] = None
+
+    def build(self, chunks: Iterable[pd.DataFrame], cleaner: Callable[[pd.DataFrame], pd.DataFrame]) -> int:
+        with self.conn.begin():
+            for chunk in chunks:
+                cleaner(chunk)
+                if "id_employee" not in chunk.columns:
+                    raise ValueError(f"Extrait {self.table}: impossible de dériver id_employee")
+                chunk.to_sql(self.table, self.conn, if_exists="append", index=False)
+                self.rows += len(chunk)
+                if self._columns is None:
+                    self._columns = list(chunk.columns)
+            if self._columns is None:
+                raise ValueError(f"Extrait {self.table} vide")
+            self.conn.exec_driver_sql(f'CREATE INDEX "ix_{self.table}_id" ON "{self.table}" (id_employee)')
+        return self.rows
+
+    def _query(self, where: str, **params) -> pd.DataFrame:
+        stmt = text(f'SELECT * FROM "{self.table}" WHERE {where} ORDER BY id_employee, rowid')
+        if "ids" in params:
+            stmt = stmt.bindparams(bindparam("ids", expanding=True))
+        return pd.read_sql(stmt, self.conn, params=params)
+
+    def lookup(self, ids: pd.Series) -> pd.DataFrame:
+        """Lignes de l'extrait dont `id_employee` figure dans `ids`."""
+        keys = pd.unique(pd.to_numeric(ids, errors="coerce").dropna().astype("int64"))
+        if len(keys) == 0:
+            df = pd.DataFrame(columns=self._columns)
+        elif int(keys.max()) - int(keys.min()) < _RANGE_SPAN_FACTOR * len(keys):
+            # bloc trié (cas nominal): une seule recherche par plage sur l'index
+            df = self._query("id_employee BETWEEN :lo AND :hi", lo=int(keys.min()), hi=int(keys.max()))
+        else:
+            df = pd.concat(
+                [
+                    self._query("id_employee IN :ids", ids=[int(k) for k in keys[i:i + _LOOKUP_BATCH]])
+                    for i in range(0, len(keys), _LOOKUP_BATCH)
+                ],
+                ignore_index=True,
+            )
+        df = df[df["id_employee"].isin(keys)].copy()
+        df["id_employee"] = df["id_employee"].astype("int64")
+        return df
+
+
+class StreamingETL:
+    """Blocs `employee_features` produits à partir des trois extraits CSV, sans les charger en entier.
+
+    L'itération construit les index des évaluations et du sondage dans un
+    répertoire temporaire (supprimé à la fin), puis produit un DataFrame par
+    bloc du SIRH. `rows` donne le nombre de lignes lues par extrait (clé: nom
+    du fichier) et `sorted` indique si le SIRH était trié par `id_employee`
+    (sinon les jointures se font par listes d'identifiants, plus lentes).
+    """
+
+    def __init__(
+        self,
+        sirh_path: str,
+        eval_path: str,
+        sondage_path: str,
+        chunk_size: int = 50000,
+        csv_engine: str = "pandas",
+    ):
+        if csv_engine not in CSV_ENGINES:
+            raise ValueError(f"Moteur CSV inconnu: {csv_engine!r} (attendu: {', '.join(CSV_ENGINES)})")
+        self.sirh_path = str(sirh_path)
+        self.eval_path = str(eval_path)
+        self.sondage_path = str(sondage_path)
+        self.chunk_size = max(1, int(chunk_size))
+        self.csv_engine = csv_engine
+        self.rows: Dict[str, int] = {}
+        self.chunks = 0
+        self.sorted = True
+
+    def _chunks(self, path: str) -> Iterator[pd.DataFrame]:
+        return read_csv_chunks(path, self.chunk_size, self.csv_engine)
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        with tempfile.TemporaryDirectory(prefix="etl-index-") as tmp:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'index.db')}")
+            try:
+                with engine.connect() as conn:
+                    # base jetable: ni journal ni fsync
+                    conn.exec_driver_sql("PRAGMA journal_mode=OFF")
+                    conn.exec_driver_sql("PRAGMA synchronous=OFF")
+                    conn.commit()
+                    indexes = []
+                    for table, path, cleaner in (("eval", self.eval_path, clean_eval), ("sondage", self.sondage_path, clean_sondage)):
+                        index = SourceIndex(conn, table)
+                        self.rows[os.path.basename(path)] = index.build(self._chunks(path), cleaner)
+                        indexes.append(index)
+                    _logger.info("[ETL] Index construits: %s", self.rows)
+
+                    sirh_name = os.path.basename(self.sirh_path)
+                    self.rows[sirh_name] = 0
+                    last_id = None
+                    for sirh in self._chunks(self.sirh_path):
+                        clean_sirh(sirh)
+                        ids = sirh["id_employee"].dropna()
+                        if len(ids):
+                            if not ids.is_monotonic_increasing or (last_id is not None and ids.iloc[0] < last_id):
+                                self.sorted = False
+                            last_id = ids.iloc[-1]
+                        df = merge_sources(sirh, *(index.lookup(sirh["id_employee"]) for index in indexes))
+                        add_log_features(df)
+                        self.rows[sirh_name] += len(sirh)
+                        self.chunks += 1
+                        yield to_employee_features(df)
+            finally:
+                engine.dispose()
+        if not self.sorted:
+            _logger.warning("[ETL] %s n'est pas trié par id_employee: jointures par listes d'identifiants", self.sirh_path)
@@ -6,7 +6,17 @@ from sqlalchemy.engine.url import make_url
 from app.db.base import Base
 from app.db import models  # ensure models are imported for metadata
 from app.db.session import engine
+from app.db.schema import add_missing_columns
 from app.ml.serve import model_service
+from app.ml.batching import micro_batcher
+from app.ml.executor import inference_executor
+from app.ml.feature_store import feature_store
+from app.ml.reload import model_reloader
+from app.ml.jobs import job_runner
+from app.ml.population import rescore_employees
+from app.db.log_writer import log_writer
+from app.db.async_session import check_async_driver, dispose_async_engine
+from app.ml.scoring import rebuild_employee_scores, scores_are_current
 from app.core.errors import http_exception_handler
 import os
 import sys
@@ -18,10 +28,27 @@ from app.ml.model_loader import get_model
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    # --- Startup ---
+# Vrai quand l'état partagé (base, modèle, scores, feature store) a déjà été préparé dans ce
+# processus, typiquement par le processus maître de app/prefork.py avant le fork des workers.
+_shared_state_ready = False
+
+
+def prepare_shared_state(before_fork: bool = False) -> None:
+    """Prépare tout ce qui peut être chargé une seule fois et partagé entre workers.
+
+    Initialisation de la base, chargement du modèle, reconstruction de
+    `employee_scores` et chargement du feature store (matrice prétraitée
+    comprise). Appelée par le lifespan, ou une seule fois par le maître du
+    mode multi-workers avant `fork()` : les workers héritent alors des pages
+    mémoire en copy-on-write au lieu de recharger chacun leur copie.
+
+    Args:
+        before_fork: Si vrai, le lifespan des workers issus du fork ne refait pas ce travail.
+    """
+    global _shared_state_ready
     # Create data directory for SQLite if needed, then create tables
+    features_reloaded = False
+    etl_changes = []
     try:
         # Ensure data directory exists (for SQLite database)
         os.makedirs("./data", exist_ok=True)
@@ -38,6 +65,7 @@ async def lifespan(app: FastAPI):
         if backend == "sqlite":
             logger.info("Setting up SQLite database...")
             Base.metadata.create_all(bind=engine)
+            add_missing_columns(engine)
             logger.info("SQLite tables created")
             
             # Try to initialize database with data
@@ -45,8 +73,9 @@ async def lifespan(app: FastAPI):
                 logger.info("Attempting to import and call lancesqlite_Initialisation()...")
                 from scripts.create_db import lancesqlite_Initialisation
                 logger.info("Import successful, calling function...")
-                lancesqlite_Initialisation()
-                logger.info("Database initialized with employee data")
+                # rechargement seulement si les extraits ou le schéma ont changé (manifeste etl_manifest)
+                features_reloaded = lancesqlite_Initialisation(on_changes=etl_changes.append)
+                logger.info("Database initialized with employee data (reloaded=%s)", features_reloaded)
             except ImportError as e:
                 logger.error(f"Failed to import lancesqlite_Initialisation: {e}")
             except Exception as e:
@@ -55,11 +84,79 @@ async def lifespan(app: FastAPI):
         logger.error(f"Startup error: {e}", exc_info=True)
     
     try:
-        model_service.load()
+        # get_model() a déjà chargé model_service via le registre: pas de seconde désérialisation
+        if model_service.model is None:
+            model_service.load()
     except FileNotFoundError:
         logger.warning("Model file not found during startup; will load on first prediction.")
+
+    # Scores matérialisés lus par /predict/by-id: reconstruits si la table ne correspond pas au modèle chargé
+    if model_service.version is not None:
+        try:
+            if etl_changes and not etl_changes[0].full:
+                # ingestion delta: seuls les employés touchés sont re-scorés
+                rescore_employees(engine, etl_changes[0].changed_ids(), model_service)
+                features_reloaded = False
+            if features_reloaded or not scores_are_current(engine, model_service.version):
+                rebuild_employee_scores(engine, model_service)
+        except Exception as e:
+            logger.warning(f"employee_scores rebuild skipped: {e}")
+
+    if get_settings().FEATURE_STORE_ENABLED:
+        try:
+            feature_store.load(engine)
+            feature_store.warm()
+        except Exception as e:
+            logger.warning(f"Feature store disabled: {e}")
+
+    _shared_state_ready = before_fork
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # --- Startup ---
+    if get_settings().DB_ASYNC:
+        # pilote asynchrone absent (ex. asyncpg pour PostgreSQL): refus immédiat plutôt qu'à la première requête
+        check_async_driver(get_settings().DATABASE_URL)
+    if not _shared_state_ready:
+        prepare_shared_state()
+
+    # Threads et pools: propres à chaque processus, jamais hérités d'un fork
+    if model_service.version is not None:
+        try:
+            inference_executor.start()
+        except Exception as e:
+            logger.warning(f"Inference executor start failed: {e}")
+
+    if get_settings().PREDICTION_LOG_ASYNC:
+        log_writer.start()
+
+    if feature_store.loaded:
+        feature_store.start_auto_refresh()
+
+    # rechargement à chaud: surveillance de model.pkl si MODEL_WATCH_SECONDS > 0
+    model_reloader.start(engine)
+
+    # jobs de scoring asynchrones: reprend aussi les jobs interrompus par un arrêt précédent
+    job_runner.start(engine)
+
+    if get_settings().MICROBATCH_ENABLED:
+        micro_batcher.start()
+        logger.info(
+            "Micro-batching enabled (max_size=%s, max_wait_us=%s)",
+            micro_batcher.max_batch_size, micro_batcher.max_wait_us,
+        )
     
     yield
+    # les jobs en cours repassent "pending" à leur dernier bloc commité
+    job_runner.stop()
+    model_reloader.stop()
+    micro_batcher.stop()
+    inference_executor.stop()
+    feature_store.stop()
+    # écrit les logs encore en file avant de rendre la main
+    log_writer.stop()
+    await dispose_async_engine()
     try:
         model_service.close()
     except Exception:
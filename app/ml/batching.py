@@ -0,0 +1,179 @@
+# app/ml/batching.py
+from __future__ import annotations
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.ml.executor import inference_executor
+from app.ml.serve import SEUIL_FIXE, ModelService
+
+_logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """Regroupe les prédictions unitaires concurrentes en un seul appel vectorisé.
+
+    Chaque appelant dépose son payload dans une file et attend un `Future`.
+    Un thread de fond vide la file par lots d'au plus `max_batch_size` lignes,
+    en attendant au plus `max_wait_us` microsecondes les retardataires, puis
+    appelle une seule fois `ModelService.predict_proba_batch`.
+
+    L'attente est adaptative : si le lot précédent ne contenait qu'une ligne
+    (pas de concurrence observée), une requête isolée part immédiatement au
+    lieu de payer `max_wait_us` de latence.
+
+    `submit` et `stop` partagent un verrou : un payload est soit déposé avant
+    le marqueur d'arrêt (donc traité par le dispatcher, qui draine la file),
+    soit calculé directement dans le thread appelant, jamais laissé en file.
+    """
+
+    def __init__(
+        self,
+        service: ModelService,
+        max_batch_size: int = 64,
+        max_wait_us: int = 2000,
+    ):
+        self.service = service
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_us = max(0, int(max_wait_us))
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        # rend atomiques le test "dispatcher actif" et le dépôt en file (voir submit/stop)
+        self._lock = threading.Lock()
+        self._last_batch_size = 0
+        self.n_batches = 0
+        self.n_rows = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> "MicroBatcher":
+        with self._lock:
+            if not self.running:
+                self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            self._queue.put(_STOP)
+        # hors verrou: les appelants concurrents calculent déjà en direct pendant le drainage
+        thread.join(timeout)
+
+    def submit(self, payload: Dict[str, Any]) -> "Future[float]":
+        fut: "Future[float]" = Future()
+        with self._lock:
+            queued = self.running
+            if queued:
+                self._queue.put((payload, fut))
+        if not queued:
+            # Dispatcher arrêté: calcul direct dans le thread appelant
+            try:
+                fut.set_result(float(self.service.predict_proba(payload)))
+            except Exception as e:
+                fut.set_exception(e)
+        return fut
+
+    def predict_proba(self, payload: Dict[str, Any]) -> float:
+        return self.submit(payload).result()
+
+    def predict_label(self, payload: Dict[str, Any]) -> int:
+        return int(self.predict_proba(payload) >= SEUIL_FIXE)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_us": self.max_wait_us,
+            "queue_depth": self._queue.qsize(),
+            "batches": self.n_batches,
+            "rows": self.n_rows,
+            "avg_batch_size": (self.n_rows / self.n_batches) if self.n_batches else 0.0,
+        }
+
+    def _collect(self, first: Tuple[Dict[str, Any], Future]) -> Tuple[List[Any], bool]:
+        batch = [first]
+        stop = False
+        # 1) ce qui est déjà en file part sans attendre
+        while len(batch) < self.max_batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        # 2) attente bornée seulement si de la concurrence a été observée
+        if len(batch) == 1 and self._last_batch_size <= 1:
+            return batch, stop
+        deadline = time.perf_counter() + self.max_wait_us / 1e6
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, stop
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch, stop = self._collect(item)
+            self._score(batch)
+            if stop:
+                break
+        # Draine ce qui reste pour ne laisser aucun appelant bloqué
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftovers.append(item)
+        if leftovers:
+            self._score(leftovers)
+
+    def _score(self, batch: List[Tuple[Dict[str, Any], Future]]) -> None:
+        self._last_batch_size = len(batch)
+        self.n_batches += 1
+        self.n_rows += len(batch)
+        try:
+            probas = self.service.predict_proba_batch([p for p, _ in batch])
+        except Exception as e:
+            _logger.exception("Echec du lot micro-batch (%s lignes): %s", len(batch), e)
+            for _, fut in batch:
+                fut.set_exception(e)
+            return
+        for (_, fut), p in zip(batch, probas):
+            fut.set_result(float(p))
+
+
+def micro_batcher_from_settings(service: ModelService) -> MicroBatcher:
+    from app.core.config import get_settings
+
+    settings = get_settings()
+    return MicroBatcher(
+        service,
+        max_batch_size=settings.MICROBATCH_MAX_SIZE,
+        max_wait_us=settings.MICROBATCH_MAX_WAIT_US,
+    )
+
+
+micro_batcher = micro_batcher_from_settings(inference_executor)
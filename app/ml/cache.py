@@ -0,0 +1,131 @@
+# app/ml/cache.py
+from __future__ import annotations
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Coût mémoire approximatif d'une entrée hors clé (tuple, float, noeud de l'OrderedDict)
+_ENTRY_OVERHEAD_BYTES = 160
+
+
+def payload_key(payload: Dict[str, Any]) -> str:
+    """Hash canonique d'un payload normalisé (ordre des clés indifférent)."""
+    canon = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canon.encode("utf-8")).hexdigest()
+
+
+class PredictionCache:
+    """Cache LRU + TTL des probabilités, indexé par payload et version du modèle.
+
+    Borné à la fois en nombre d'entrées et en mémoire (estimation par
+    entrée). La version du modèle est vérifiée à chaque accès : dès que
+    `ModelService.load()` amène un modèle différent, tout le cache est vidé.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        max_bytes: int = 32 * 1024 * 1024,
+        ttl_seconds: float = 300.0,
+        enabled: bool = True,
+    ):
+        self.enabled = enabled
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self.ttl_seconds = float(ttl_seconds)
+        self._data: "OrderedDict[str, Tuple[float, float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_version(self, version: Optional[str]) -> None:
+        if version != self._version:
+            if self._data:
+                self.invalidations += 1
+            self._data.clear()
+            self._bytes = 0
+            self._version = version
+
+    def get(self, payload: Dict[str, Any], version: Optional[str]) -> Optional[float]:
+        if not self.enabled:
+            return None
+        key = payload_key(payload)
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(version)
+            entry = self._data.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    self._pop(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, payload: Dict[str, Any], version: Optional[str], value: float) -> None:
+        if not self.enabled:
+            return
+        key = payload_key(payload)
+        size = len(key) + _ENTRY_OVERHEAD_BYTES
+        with self._lock:
+            self._check_version(version)
+            if key in self._data:
+                self._pop(key)
+            self._data[key] = (time.monotonic() + self.ttl_seconds, float(value), size)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._pop(oldest)
+                self.evictions += 1
+
+    def _pop(self, key: str) -> None:
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / total) if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "model_version": self._version,
+        }
+
+
+def prediction_cache_from_settings() -> PredictionCache:
+    from app.core.config import get_settings
+
+    settings = get_settings()
+    return PredictionCache(
+        max_entries=settings.PREDICTION_CACHE_MAX_ENTRIES,
+        max_bytes=settings.PREDICTION_CACHE_MAX_BYTES,
+        ttl_seconds=settings.PREDICTION_CACHE_TTL_SECONDS,
+        enabled=settings.PREDICTION_CACHE_ENABLED,
+    )
+
+
+prediction_cache = prediction_cache_from_settings()
@@ -0,0 +1,203 @@
+# app/ml/compiled.py
+from __future__ import annotations
+import math
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder, StandardScaler
+
+# Écart maximal toléré entre le chemin compilé et le pipeline d'origine
+PARITY_ATOL = 1e-9
+
+_UNKNOWN_CATEGORY = "__INCONNU__"
+
+
+def _to_float(v: Any) -> float:
+    if v is None:
+        return math.nan
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _is_missing(v: Any) -> bool:
+    # Même règle que SimpleImputer(missing_values=np.nan) sur des objets:
+    # seul un NaN flottant est imputé, None reste une modalité (inconnue)
+    return isinstance(v, float) and v != v
+
+
+def _steps(transformer: Any) -> List[Any]:
+    if isinstance(transformer, Pipeline):
+        return [s for _, s in transformer.steps if s not in (None, "passthrough")]
+    return [transformer]
+
+
+class _NumericBlock:
+    """Colonnes numériques: imputation constante puis centrage/réduction."""
+
+    def __init__(self, cols: Sequence[str], steps: List[Any], out: slice):
+        self.cols = list(cols)
+        self.out = out
+        n = len(self.cols)
+        self.fill = np.full(n, np.nan)
+        self.mean = np.zeros(n)
+        self.scale = np.ones(n)
+        for step in steps:
+            if isinstance(step, SimpleImputer):
+                if step.add_indicator or not _is_missing(step.missing_values):
+                    raise ValueError("SimpleImputer numérique non supporté")
+                self.fill = np.asarray(step.statistics_, dtype=float)
+            elif isinstance(step, StandardScaler):
+                if step.mean_ is not None:
+                    self.mean = np.asarray(step.mean_, dtype=float)
+                if step.scale_ is not None:
+                    self.scale = np.asarray(step.scale_, dtype=float)
+            else:
+                raise ValueError(f"Étape numérique non supportée: {type(step).__name__}")
+
+    def fill_into(self, X: np.ndarray, payloads: List[Dict[str, Any]]) -> None:
+        block = np.array([[_to_float(p.get(c)) for c in self.cols] for p in payloads], dtype=float)
+        nan = np.isnan(block)
+        if nan.any():
+            block = np.where(nan, self.fill, block)
+        block -= self.mean
+        block /= self.scale
+        X[:, self.out] = block
+
+
+class _CategoricalBlock:
+    """Colonnes catégorielles: imputation par constante puis encodage ordinal ou one-hot."""
+
+    def __init__(self, cols: Sequence[str], steps: List[Any], out: slice):
+        self.cols = list(cols)
+        self.out = out
+        self.fill: List[Any] = [None] * len(self.cols)
+        encoder = steps[-1] if steps else None
+        for step in steps[:-1]:
+            if not isinstance(step, SimpleImputer) or step.add_indicator or not _is_missing(step.missing_values):
+                raise ValueError(f"Étape catégorielle non supportée: {type(step).__name__}")
+            self.fill = list(step.statistics_)
+        if isinstance(encoder, OneHotEncoder):
+            if encoder.handle_unknown != "ignore" or encoder.drop_idx_ is not None:
+                raise ValueError("OneHotEncoder: seul handle_unknown='ignore' sans drop est supporté")
+            if getattr(encoder, "_infrequent_enabled", False):
+                raise ValueError("OneHotEncoder: modalités rares non supportées")
+            self.onehot = True
+            self.maps: List[Dict[Any, int]] = []
+            offset = out.start
+            for cats in encoder.categories_:
+                self.maps.append({c: offset + i for i, c in enumerate(cats)})
+                offset += len(cats)
+            self.unknown = -1
+        elif isinstance(encoder, OrdinalEncoder):
+            if encoder.handle_unknown == "use_encoded_value":
+                self.unknown = float(encoder.unknown_value)
+            else:
+                raise ValueError("OrdinalEncoder: seul handle_unknown='use_encoded_value' est supporté")
+            if getattr(encoder, "_infrequent_enabled", False):
+                raise ValueError("OrdinalEncoder: modalités rares non supportées")
+            self.onehot = False
+            self.maps = [{c: float(i) for i, c in enumerate(cats)} for cats in encoder.categories_]
+        else:
+            raise ValueError(f"Encodeur non supporté: {type(encoder).__name__}")
+
+    def categories(self) -> List[List[Any]]:
+        return [list(m) for m in self.maps]
+
+    def fill_into(self, X: np.ndarray, payloads: List[Dict[str, Any]]) -> None:
+        for j, (col, mapping, fill) in enumerate(zip(self.cols, self.maps, self.fill)):
+            values = [p.get(col) for p in payloads]
+            values = [fill if _is_missing(v) else v for v in values]
+            if self.onehot:
+                idx = np.fromiter((mapping.get(v, -1) for v in values), dtype=np.intp, count=len(values))
+                rows = np.nonzero(idx >= 0)[0]
+                X[rows, idx[rows]] = 1.0
+            else:
+                X[:, self.out.start + j] = [mapping.get(v, self.unknown) for v in values]
+
+
+class CompiledPreprocessor:
+    """Version « compilée » du `ColumnTransformer` d'un pipeline entraîné.
+
+    Les paramètres appris (moyennes/écarts, constantes d'imputation, tables
+    modalité → colonne) sont lus une seule fois au chargement. Chaque lot de
+    payloads est ensuite écrit directement dans une matrice NumPy
+    préallouée, sans DataFrame ni dispatch générique scikit-learn.
+
+    Seules les briques utilisées par nos pipelines sont supportées
+    (`StandardScaler`, `SimpleImputer`, `OrdinalEncoder`, `OneHotEncoder`);
+    tout autre composant lève `ValueError` et le service garde le pipeline.
+    """
+
+    def __init__(self, pipeline: Pipeline):
+        if not isinstance(pipeline, Pipeline) or len(pipeline.steps) != 2:
+            raise ValueError("Pipeline (préprocesseur, estimateur) attendu")
+        prep = pipeline.steps[0][1]
+        self.estimator = pipeline.steps[-1][1]
+        if not isinstance(prep, ColumnTransformer):
+            raise ValueError("Le préprocesseur doit être un ColumnTransformer")
+        if getattr(prep, "sparse_output_", False):
+            raise ValueError("Sortie sparse non supportée")
+        if hasattr(self.estimator, "feature_names_in_"):
+            raise ValueError("Estimateur entraîné sur un DataFrame: non supporté")
+
+        self.blocks: List[Any] = []
+        self.n_features_out = 0
+        for name, trans, cols in prep.transformers_:
+            out = prep.output_indices_[name]
+            self.n_features_out = max(self.n_features_out, out.stop)
+            if trans == "drop" or out.stop == out.start:
+                continue
+            steps = [] if trans == "passthrough" else _steps(trans)
+            if steps and isinstance(steps[-1], (OneHotEncoder, OrdinalEncoder)):
+                self.blocks.append(_CategoricalBlock(cols, steps, out))
+            else:
+                self.blocks.append(_NumericBlock(cols, steps, out))
+
+    @property
+    def input_columns(self) -> List[str]:
+        return [c for b in self.blocks for c in b.cols]
+
+    def transform(self, payloads: List[Dict[str, Any]]) -> np.ndarray:
+        X = np.zeros((len(payloads), self.n_features_out), dtype=float)
+        for block in self.blocks:
+            block.fill_into(X, payloads)
+        return X
+
+    def predict_proba(self, payloads: List[Dict[str, Any]]) -> np.ndarray:
+        return self.estimator.predict_proba(self.transform(payloads))
+
+    def sample_payloads(self, n: int = 16) -> List[Dict[str, Any]]:
+        """Payloads synthétiques couvrant les modalités connues, inconnues et absentes."""
+        rows: List[Dict[str, Any]] = []
+        for i in range(n):
+            row: Dict[str, Any] = {}
+            for block in self.blocks:
+                if isinstance(block, _NumericBlock):
+                    for j, c in enumerate(block.cols):
+                        row[c] = float(block.mean[j] + block.scale[j] * ((i + j) % 5 - 2) / 2)
+                else:
+                    for j, (c, cats) in enumerate(zip(block.cols, block.categories())):
+                        k = (i + j) % (len(cats) + 2)
+                        row[c] = cats[k] if k < len(cats) else (None if k == len(cats) else _UNKNOWN_CATEGORY)
+            rows.append(row)
+        return rows
+
+    def parity_error(self, pipeline: Pipeline, payloads: List[Dict[str, Any]] | None = None) -> float:
+        """Écart absolu maximal entre les probabilités compilées et celles du pipeline."""
+        if payloads is None:
+            payloads = self.sample_payloads()
+        expected = pipeline.predict_proba(pd.DataFrame(payloads))
+        got = self.predict_proba(payloads)
+        return float(np.max(np.abs(expected - got)))
+
+
+def compile_pipeline(pipeline: Pipeline) -> Tuple[CompiledPreprocessor, float]:
+    """Compile le pipeline et mesure l'écart de parité sur des payloads synthétiques."""
+    compiled = CompiledPreprocessor(pipeline)
+    return compiled, compiled.parity_error(pipeline)
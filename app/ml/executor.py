@@ -0,0 +1,266 @@
+# app/ml/executor.py
+from __future__ import annotations
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.ml.serve import SEUIL_FIXE, ActiveModel, ModelService, model_service
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:  # pragma: no cover
+    threadpool_limits = None
+
+_logger = logging.getLogger(__name__)
+
+EXECUTOR_MODES = ("inline", "thread", "process")
+
+
+class InferenceExecutor:
+    """Exécute l'inférence de `ModelService` (mode "inline": dans le thread appelant).
+
+    Les sous-classes répartissent les lots sur un pool de threads ou de
+    processus ; toutes exposent la même interface que `ModelService`
+    (`predict_proba`, `predict_proba_batch`, `predict_label_batch`,
+    `predict_proba_encoded`), ce qui permet de les substituer au service.
+    """
+
+    mode = "inline"
+
+    def __init__(self, service: ModelService):
+        self.service = service
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.n_tasks = 0
+
+    @property
+    def version(self) -> Optional[str]:
+        return self.service.version
+
+    def start(self) -> "InferenceExecutor":
+        return self
+
+    def stop(self) -> None:
+        return None
+
+    def _track(self, fn: Callable[[], np.ndarray]) -> np.ndarray:
+        with self._lock:
+            self._pending += 1
+            self.n_tasks += 1
+        try:
+            return fn()
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def predict_proba_batch(self, payloads: List[Dict[str, Any]]) -> np.ndarray:
+        if not payloads:
+            return np.empty(0, dtype=float)
+        return self._track(lambda: self.service.predict_proba_batch(payloads))
+
+    def predict_proba_encoded(self, X, active: Optional[ActiveModel] = None) -> np.ndarray:
+        return self._track(lambda: self.service.predict_proba_encoded(X, active))
+
+    def predict_proba(self, payload: Dict[str, Any]) -> float:
+        return float(self._track(lambda: self.service.predict_proba(payload)))
+
+    def predict_label_batch(self, payloads: List[Dict[str, Any]]) -> np.ndarray:
+        return (np.asarray(self.predict_proba_batch(payloads), dtype=float) >= SEUIL_FIXE).astype(int)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "pending": self._pending, "tasks": self.n_tasks}
+
+
+class ThreadPoolInferenceExecutor(InferenceExecutor):
+    """Pool de threads ; chaque tâche limite les threads BLAS/OpenMP via `threadpoolctl`.
+
+    Sans cette limite, N tâches concurrentes ouvriraient chacune autant de
+    threads natifs que de cœurs et se disputeraient la machine.
+    """
+
+    mode = "thread"
+
+    def __init__(self, service: ModelService, workers: int, threads_per_worker: int = 1):
+        super().__init__(service)
+        self.workers = max(1, int(workers))
+        self.threads_per_worker = max(1, int(threads_per_worker))
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def start(self) -> "ThreadPoolInferenceExecutor":
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        return self
+
+    def stop(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def _limited(self, fn: Callable[[], np.ndarray]) -> np.ndarray:
+        if threadpool_limits is None:
+            return fn()
+        with threadpool_limits(limits=self.threads_per_worker):
+            return fn()
+
+    def _track(self, fn: Callable[[], np.ndarray]) -> np.ndarray:
+        self.start()
+        return super()._track(lambda: self._pool.submit(self._limited, fn).result())
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "workers": self.workers, "threads_per_worker": self.threads_per_worker}
+
+
+# --- Processus de travail: un ModelService par processus, chargé une fois ---
+
+_WORKER_SERVICE: Optional[ModelService] = None
+
+
+def _worker_init(model_path: str, compiled: bool, engine: str, mmap: bool, threads: int) -> None:
+    global _WORKER_SERVICE
+    if threadpool_limits is not None:
+        threadpool_limits(limits=threads)
+    _WORKER_SERVICE = ModelService(model_path, compiled=compiled, engine=engine, mmap=mmap).load()
+
+
+def _worker_proba_encoded(X) -> np.ndarray:
+    return _WORKER_SERVICE.predict_proba_encoded(X)
+
+
+class ProcessPoolInferenceExecutor(InferenceExecutor):
+    """Pool de processus chargeant chacun `model.pkl` une fois.
+
+    Le processus API applique le préprocesseur (`ModelService.transform`,
+    idéalement en mode compilé) et n'envoie que la matrice NumPy ; les
+    processus évaluent l'estimateur final hors du GIL de l'API. Un pool cassé
+    (processus tué) est recréé et la tâche rejouée une fois ; un changement
+    de version du modèle recrée aussi le pool, l'ancien terminant les tâches
+    déjà soumises.
+    """
+
+    mode = "process"
+
+    def __init__(self, service: ModelService, workers: int, threads_per_worker: int = 1):
+        super().__init__(service)
+        self.workers = max(1, int(workers))
+        self.threads_per_worker = max(1, int(threads_per_worker))
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_version: Optional[str] = None
+        self._pool_lock = threading.Lock()
+        self.n_restarts = 0
+
+    def start(self) -> "ProcessPoolInferenceExecutor":
+        with self._pool_lock:
+            self._ensure_pool(self.service.active())
+        return self
+
+    def _ensure_pool(self, active: ActiveModel) -> ProcessPoolExecutor:
+        if self._pool is not None and self._pool_version == active.version:
+            return self._pool
+        if self._pool is not None:
+            # pas d'annulation: les tâches en cours finissent sur l'ancien modèle
+            self._pool.shutdown(wait=False)
+        # "spawn": pas de fork d'un processus qui porte déjà des threads (uvicorn, batcher, writer)
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_worker_init,
+            initargs=(
+                active.path,
+                self.service.compiled,
+                self.service.engine,
+                self.service.mmap,
+                self.threads_per_worker,
+            ),
+        )
+        self._pool_version = active.version
+        return self._pool
+
+    def _restart(self, broken: ProcessPoolExecutor, active: ActiveModel) -> None:
+        with self._pool_lock:
+            if self._pool is broken:
+                _logger.warning("Pool d'inférence cassé: redémarrage des processus")
+                self._pool = None
+                self.n_restarts += 1
+                self._ensure_pool(active)
+
+    def stop(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+    def _submit(self, X, active: ActiveModel) -> np.ndarray:
+        for attempt in (0, 1):
+            with self._pool_lock:
+                if active is not self.service.active():
+                    # modèle remplacé depuis le prétraitement: fin de la requête sur l'ancien, localement
+                    return self.service.predict_proba_encoded(X, active)
+                pool = self._ensure_pool(active)
+            try:
+                fut: Future = pool.submit(_worker_proba_encoded, X)
+                return fut.result()
+            except BrokenProcessPool:
+                if attempt:
+                    raise
+                self._restart(pool, active)
+        raise RuntimeError("unreachable")
+
+    def predict_proba_batch(self, payloads: List[Dict[str, Any]]) -> np.ndarray:
+        if not payloads:
+            return np.empty(0, dtype=float)
+        active = self.service.active()
+        X = self.service.transform(payloads, active)
+        return self._track(lambda: self._submit(X, active))
+
+    def predict_proba_encoded(self, X, active: Optional[ActiveModel] = None) -> np.ndarray:
+        active = active or self.service.active()
+        return self._track(lambda: self._submit(X, active))
+
+    def predict_proba(self, payload: Dict[str, Any]) -> float:
+        return float(self.predict_proba_batch([payload])[0])
+
+    def worker_pids(self) -> List[int]:
+        pool = self._pool
+        return sorted(p.pid for p in (pool._processes or {}).values()) if pool is not None else []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "workers": self.workers,
+            "threads_per_worker": self.threads_per_worker,
+            "restarts": self.n_restarts,
+            "model_version": self._pool_version,
+        }
+
+
+def make_executor(service: ModelService, mode: str = "inline", workers: int = 0, threads_per_worker: int = 1) -> InferenceExecutor:
+    """Construit l'exécuteur demandé (`workers <= 0`: un par cœur)."""
+    if mode not in EXECUTOR_MODES:
+        raise ValueError(f"INFERENCE_EXECUTOR inconnu: {mode!r} (attendu: {', '.join(EXECUTOR_MODES)})")
+    workers = workers if workers > 0 else (os.cpu_count() or 1)
+    if mode == "thread":
+        return ThreadPoolInferenceExecutor(service, workers, threads_per_worker)
+    if mode == "process":
+        return ProcessPoolInferenceExecutor(service, workers, threads_per_worker)
+    return InferenceExecutor(service)
+
+
+def inference_executor_from_settings(service: ModelService) -> InferenceExecutor:
+    from app.core.config import get_settings
+
+    settings = get_settings()
+    return make_executor(
+        service,
+        mode=settings.INFERENCE_EXECUTOR,
+        workers=settings.INFERENCE_WORKERS,
+        threads_per_worker=settings.INFERENCE_THREADS_PER_WORKER,
+    )
+
+
+inference_executor = inference_executor_from_settings(model_service)
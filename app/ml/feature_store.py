@@ -0,0 +1,227 @@
+# app/ml/feature_store.py
+from __future__ import annotations
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+from app.api.schemas import ALL_FEATURES, COL_NUM
+from app.db.models import EmployeeFeatures, EtlManifest
+from app.etl.delta import MANIFEST_FEATURES_KEY
+from app.ml.scoring import normalize_frame
+from app.ml.serve import ActiveModel, ModelService, model_service
+
+_logger = logging.getLogger(__name__)
+
+COL_CAT = [c for c in ALL_FEATURES if c not in COL_NUM]
+
+
+@dataclass
+class _Snapshot:
+    # Instantané immuable: remplacé d'un bloc à chaque rechargement
+    ids: np.ndarray
+    numeric: Dict[str, np.ndarray]
+    categorical: Dict[str, pd.Categorical]
+    signature: Optional[Tuple[Any, ...]]
+    loaded_at: float
+    encoded: Optional[np.ndarray] = None
+    encoded_version: Optional[str] = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+def table_signature(conn) -> Optional[Tuple[Any, ...]]:
+    """Marqueur de version de `employee_features` : son entrée `etl_manifest`.
+
+    Une lecture par clé primaire. Chaque écrivain de la table (ETL ou
+    `mark_features_written`, `app/etl/delta.py`) renouvelle `loaded_at` dans
+    la transaction de l'écriture : le marqueur change exactement quand le
+    contenu change, sans relire la table. `None` si aucune écriture n'a été
+    enregistrée.
+    """
+    row = conn.execute(
+        select(EtlManifest.digest, EtlManifest.rows, EtlManifest.loaded_at).where(
+            EtlManifest.name == MANIFEST_FEATURES_KEY
+        )
+    ).first()
+    return tuple(row) if row is not None else None
+
+
+class FeatureStore:
+    """Copie en mémoire, par colonnes, de la table `employee_features`.
+
+    Les features normalisées sont rangées en tableaux NumPy (numériques) et
+    `pd.Categorical` (catégorielles), triés par `id_employee`: une recherche
+    est un `searchsorted`, sans aller-retour SQL ni objet ORM. La matrice
+    déjà prétraitée par le modèle est conservée à côté, ce qui permet de
+    scorer un identifiant sans repasser par le préprocesseur.
+
+    Un thread de fond compare périodiquement le marqueur de version de la
+    table (`table_signature`) et recharge l'instantané s'il a changé.
+    """
+
+    def __init__(self, service: Optional[ModelService] = None, refresh_seconds: float = 60.0):
+        self.service = service or model_service
+        self.refresh_seconds = float(refresh_seconds)
+        self._snapshot: Optional[_Snapshot] = None
+        self._bind = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.n_reloads = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    def load(self, bind) -> "FeatureStore":
+        t0 = time.perf_counter()
+        self._bind = bind
+        cols = [EmployeeFeatures.id_employee] + [getattr(EmployeeFeatures, c) for c in ALL_FEATURES]
+        with bind.connect() as conn:
+            signature = table_signature(conn)
+            df = pd.read_sql(select(*cols).order_by(EmployeeFeatures.id_employee), conn)
+        df = normalize_frame(df)
+        numeric = {c: pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=float) for c in COL_NUM}
+        categorical = {c: pd.Categorical(df[c].astype(object)) for c in COL_CAT}
+        self._snapshot = _Snapshot(
+            ids=df["id_employee"].to_numpy(dtype=np.int64),
+            numeric=numeric,
+            categorical=categorical,
+            signature=signature,
+            loaded_at=time.time(),
+        )
+        self.n_reloads += 1
+        _logger.info("Feature store chargé: %s lignes en %.2fs", len(df), time.perf_counter() - t0)
+        return self
+
+    def refresh_if_stale(self) -> bool:
+        """Recharge l'instantané si la table a changé depuis le dernier chargement."""
+        if self._bind is None:
+            return False
+        with self._bind.connect() as conn:
+            signature = table_signature(conn)
+        snap = self._snapshot
+        if snap is not None and signature == snap.signature:
+            return False
+        self.load(self._bind)
+        return True
+
+    def start_auto_refresh(self) -> None:
+        if self._thread is not None or self.refresh_seconds <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name="feature-store-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.wait(self.refresh_seconds):
+            try:
+                self.refresh_if_stale()
+            except Exception as e:
+                _logger.warning("Rafraîchissement du feature store impossible: %s", e)
+
+    def lookup(self, ids: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Positions des identifiants dans l'instantané et masque des identifiants trouvés."""
+        snap = self._snapshot
+        wanted = np.asarray(ids, dtype=np.int64)
+        if snap is None or snap.ids.size == 0:
+            return np.zeros(wanted.size, dtype=np.intp), np.zeros(wanted.size, dtype=bool)
+        pos = np.searchsorted(snap.ids, wanted)
+        pos = np.minimum(pos, snap.ids.size - 1)
+        return pos, snap.ids[pos] == wanted
+
+    def payloads(self, positions: Sequence[int]) -> List[Dict[str, Any]]:
+        """Features normalisées (mêmes clés que `ALL_FEATURES`) aux positions données."""
+        snap = self._snapshot
+        if snap is None:
+            return []
+        pos = np.asarray(positions, dtype=np.intp)
+        cols: Dict[str, List[Any]] = {}
+        for c, arr in snap.numeric.items():
+            vals = arr[pos]
+            cols[c] = [None if v != v else float(v) for v in vals]
+        for c, cat in snap.categorical.items():
+            codes = cat.codes[pos]
+            cats = cat.categories
+            cols[c] = [cats[k] if k >= 0 else None for k in codes]
+        return [{c: cols[c][i] for c in ALL_FEATURES} for i in range(pos.size)]
+
+    def get(self, employee_id: int) -> Optional[Dict[str, Any]]:
+        pos, found = self.lookup([employee_id])
+        return self.payloads(pos)[0] if found[0] else None
+
+    def _encoded(self, snap: _Snapshot, active: ActiveModel) -> np.ndarray:
+        # Matrice prétraitée, recalculée une fois par version de modèle
+        encoded = snap.encoded
+        if encoded is not None and snap.encoded_version == active.version:
+            return encoded
+        with snap.lock:
+            if snap.encoded is None or snap.encoded_version != active.version:
+                X = self.service.transform(self.payloads(np.arange(snap.ids.size)), active)
+                snap.encoded = np.asarray(X, dtype=float)
+                snap.encoded_version = active.version
+            return snap.encoded
+
+    def warm(self) -> None:
+        """Calcule la matrice prétraitée maintenant (par ex. avant un fork) plutôt qu'à la première requête."""
+        snap = self._snapshot
+        if snap is not None and snap.ids.size:
+            try:
+                self._encoded(snap, self.service.active())
+            except (TypeError, ValueError) as e:
+                _logger.debug("Matrice prétraitée indisponible: %s", e)
+
+    def predict_proba(self, positions: Sequence[int]) -> np.ndarray:
+        """Probabilités de la classe positive aux positions données, sans repasser par le préprocesseur."""
+        snap = self._snapshot
+        if snap is None:
+            raise RuntimeError("Feature store non chargé")
+        pos = np.asarray(positions, dtype=np.intp)
+        if pos.size == 0:
+            return np.empty(0, dtype=float)
+        # même modèle pour le prétraitement et l'estimateur, même si un rechargement survient
+        active = self.service.active()
+        try:
+            encoded = self._encoded(snap, active)
+        except (TypeError, ValueError) as e:
+            # préprocesseur non numérique (estimateur nu...): chemin complet
+            _logger.debug("Matrice prétraitée indisponible: %s", e)
+            return np.asarray(self.service.predict_proba_batch(self.payloads(pos), active), dtype=float)
+        return self.service.predict_proba_encoded(encoded[pos], active)
+
+    def stats(self) -> Dict[str, Any]:
+        snap = self._snapshot
+        if snap is None:
+            return {"loaded": False}
+        nbytes = snap.ids.nbytes + sum(a.nbytes for a in snap.numeric.values())
+        nbytes += sum(c.codes.nbytes for c in snap.categorical.values())
+        return {
+            "loaded": True,
+            "rows": int(snap.ids.size),
+            "loaded_at": snap.loaded_at,
+            "reloads": self.n_reloads,
+            "refresh_seconds": self.refresh_seconds,
+            "bytes": int(nbytes),
+            "encoded": snap.encoded is not None,
+            "encoded_bytes": int(snap.encoded.nbytes) if snap.encoded is not None else 0,
+            "encoded_model_version": snap.encoded_version,
+        }
+
+
+def feature_store_from_settings() -> FeatureStore:
+    from app.core.config import get_settings
+
+    return FeatureStore(refresh_seconds=get_settings().FEATURE_STORE_REFRESH_SECONDS)
+
+
+feature_store = feature_store_from_settings()
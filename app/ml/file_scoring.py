@@ -0,0 +1,229 @@
+# app/ml/file_scoring.py
+from __future__ import annotations
+import csv
+import logging
+import os
+import time
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.api.schemas import ALL_FEATURES
+from app.etl.cleaning import (
+    FEATURE_NUM_COLS,
+    add_log_features,
+    clean_eval,
+    clean_flat,
+    clean_sondage,
+    to_employee_features,
+)
+from app.ml.executor import InferenceExecutor, inference_executor
+from app.ml.scoring import labels_from_proba, normalize_frame
+from app.ml.serve import ModelService, model_service
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = None
+    pq = None
+
+_logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "parquet")
+MEDIA_TYPES = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+SCORE_COLUMNS = ["id_employee", "proba", "pred_quitte_entreprise", "model_version"]
+
+
+def format_from_name(name: str) -> Optional[str]:
+    """Format déduit de l'extension (`.csv`, `.parquet`/`.pq`), sinon None."""
+    ext = os.path.splitext(name)[1].lower()
+    return {".csv": "csv", ".parquet": "parquet", ".pq": "parquet"}.get(ext)
+
+
+def _require_parquet() -> None:
+    if pq is None:
+        raise RuntimeError("pyarrow est requis pour lire ou écrire du Parquet: pip install pyarrow")
+
+
+def read_chunks(path: str, fmt: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Lit le fichier par blocs de `chunk_size` lignes (jamais en entier en mémoire)."""
+    if fmt == "parquet":
+        _require_parquet()
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        # lu en texte: le nettoyage convertit lui-même les numériques (ex. "11 %", "000001")
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype=str, encoding="utf-8")
+
+
+class _ScoreWriter:
+    """Écrit les blocs scorés au fur et à mesure (CSV en ajout, Parquet par row groups)."""
+
+    def __init__(self, path: str, fmt: str):
+        self.path = path
+        self.fmt = fmt
+        self._pq_writer = None
+        self._header = True
+        if fmt == "parquet":
+            _require_parquet()
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self.fmt == "parquet":
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._pq_writer is None:
+                self._pq_writer = pq.ParquetWriter(self.path, table.schema)
+            self._pq_writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode="w" if self._header else "a", header=self._header, index=False,
+                      quoting=csv.QUOTE_MINIMAL)
+            self._header = False
+
+    def close(self) -> None:
+        if self.fmt == "parquet":
+            if self._pq_writer is None:
+                # fichier vide mais lisible, avec le schéma attendu
+                empty = pd.DataFrame({c: pd.Series(dtype=t) for c, t in
+                                      zip(SCORE_COLUMNS, ["int64", "float64", "object", "object"])})
+                pq.write_table(pa.Table.from_pandas(empty, preserve_index=False), self.path)
+            else:
+                self._pq_writer.close()
+        elif self._header:
+            pd.DataFrame(columns=SCORE_COLUMNS).to_csv(self.path, index=False)
+
+
+def _load_side(path: str, cleaner) -> pd.DataFrame:
+    fmt = format_from_name(path) or "csv"
+    df = pd.concat(read_chunks(path, fmt, 100_000), ignore_index=True)
+    df = cleaner(df)
+    return df.drop_duplicates("id_employee", keep="last")
+
+
+class FileScorer:
+    """Scoring d'un fichier (CSV ou Parquet) par blocs, avec inférence vectorisée.
+
+    Chaque bloc passe par le nettoyage de l'ETL (`app/etl/cleaning.py`), la
+    normalisation des payloads (`normalize_frame`) puis un seul appel au
+    préprocesseur et à l'estimateur ; le fichier de sortie est écrit bloc par
+    bloc. La mémoire dépend de `chunk_size`, pas de la taille du fichier. Le
+    modèle est figé au début : tout le fichier porte la même `model_version`,
+    même si un rechargement à chaud survient pendant le traitement.
+
+    Des extraits d'évaluation et de sondage séparés peuvent être joints à
+    chaque bloc (`eval_path`, `sondage_path`) ; ils sont alors chargés en
+    mémoire une fois, seul le fichier principal étant lu par blocs.
+    """
+
+    def __init__(
+        self,
+        service: Optional[ModelService] = None,
+        executor: Optional[InferenceExecutor] = None,
+        chunk_size: int = 50_000,
+        eval_path: Optional[str] = None,
+        sondage_path: Optional[str] = None,
+    ):
+        self.service = service or model_service
+        self.executor = executor or (inference_executor if self.service is model_service else InferenceExecutor(self.service))
+        self.chunk_size = max(1, int(chunk_size))
+        self._sides = []
+        if eval_path:
+            self._sides.append(_load_side(eval_path, clean_eval))
+        if sondage_path:
+            self._sides.append(_load_side(sondage_path, clean_sondage))
+
+    def score_chunk(self, chunk: pd.DataFrame, active) -> pd.DataFrame:
+        """Nettoie un bloc brut du fichier puis le score (voir `score_features`).
+
+        Raises:
+            ValueError: Si le bloc ne porte ni `id_employee` ni colonne dont le
+                déduire (`eval_number`, `code_sondage`).
+        """
+        df = clean_flat(chunk)
+        if "id_employee" not in df.columns:
+            # entrée valide mais inexploitable: 422 pour /predict/file, échec propre pour /jobs/file
+            raise ValueError("Colonne id_employee absente (ni eval_number ni code_sondage pour la déduire)")
+        for side in self._sides:
+            cols = ["id_employee"] + [c for c in side.columns if c not in df.columns]
+            df = df.merge(side[cols], on="id_employee", how="left")
+        return self.score_features(to_employee_features(add_log_features(df)), active)
+
+    def encode(self, df: pd.DataFrame, active):
+        """Matrice prétraitée par `active` pour des lignes au format `employee_features`."""
+        for c in ALL_FEATURES:
+            if c not in df.columns:
+                # colonne absente de l'extrait: même valeur par défaut que dans employee_features
+                df[c] = 0.0 if c in FEATURE_NUM_COLS else ""
+        X = normalize_frame(df[ALL_FEATURES])
+        # chemin compilé: dictionnaires; sinon le DataFrame va tel quel au ColumnTransformer
+        inputs = X.to_dict("records") if active.compiled is not None else X
+        return self.service.transform(inputs, active)
+
+    def score_features(self, df: pd.DataFrame, active) -> pd.DataFrame:
+        """Score des lignes au format `employee_features` avec le modèle figé `active`.
+
+        Returns:
+            DataFrame `id_employee, proba, pred_quitte_entreprise, model_version`.
+        """
+        if df.empty:
+            return pd.DataFrame(columns=SCORE_COLUMNS)
+        proba = np.asarray(self.executor.predict_proba_encoded(self.encode(df, active), active), dtype=float)
+        return pd.DataFrame(
+            {
+                "id_employee": df["id_employee"].to_numpy(),
+                "proba": proba,
+                "pred_quitte_entreprise": labels_from_proba(proba),
+                "model_version": active.version,
+            }
+        )
+
+    def score_file(
+        self,
+        src: str,
+        dst: str,
+        fmt: Optional[str] = None,
+        out_fmt: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Score `src` et écrit `dst` (une ligne par employé: id, proba, label, version).
+
+        Args:
+            src: Fichier d'entrée.
+            dst: Fichier de sortie.
+            fmt: `csv` ou `parquet` (défaut: extension de `src`, sinon `csv`).
+            out_fmt: Format de sortie (défaut: extension de `dst`, sinon `fmt`).
+
+        Returns:
+            Statistiques: lignes lues, scorées, écartées (sans `id_employee`),
+            nombre de blocs, durée et version du modèle.
+        """
+        fmt = fmt or format_from_name(src) or "csv"
+        out_fmt = out_fmt or format_from_name(dst) or fmt
+        for f in (fmt, out_fmt):
+            if f not in FORMATS:
+                raise ValueError(f"Format inconnu: {f!r} (attendu: {', '.join(FORMATS)})")
+        t0 = time.perf_counter()
+        active = self.service.active()
+        stats = {"rows_in": 0, "rows_scored": 0, "rows_skipped": 0, "chunks": 0}
+        writer = _ScoreWriter(dst, out_fmt)
+        try:
+            for chunk in read_chunks(src, fmt, self.chunk_size):
+                scored = self.score_chunk(chunk, active)
+                writer.write(scored)
+                stats["chunks"] += 1
+                stats["rows_in"] += len(chunk)
+                stats["rows_scored"] += len(scored)
+        finally:
+            writer.close()
+        stats["rows_skipped"] = stats["rows_in"] - stats["rows_scored"]
+        stats["seconds"] = round(time.perf_counter() - t0, 3)
+        stats["model_version"] = active.version
+        _logger.info(
+            "Fichier scoré: %s lignes en %s blocs, %.2fs (model_version=%s)",
+            stats["rows_scored"], stats["chunks"], stats["seconds"], active.version,
+        )
+        return stats
+
+
+def score_file(src: str, dst: str, chunk_size: int = 50_000, **kwargs) -> Dict[str, Any]:
+    """Raccourci: `FileScorer(chunk_size=...).score_file(src, dst, ...)` avec le modèle servi."""
+    return FileScorer(chunk_size=chunk_size).score_file(src, dst, **kwargs)
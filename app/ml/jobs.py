@@ -0,0 +1,497 @@
+# app/ml/jobs.py
+from __future__ import annotations
+import bisect
+import logging
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import pandas as pd
+from sqlalchemy import func, insert, select, update
+
+from app.db.models import EmployeeFeatures, ScoringJob, ScoringJobResult
+from app.etl.cleaning import FEATURE_TABLE_COLS
+from app.ml.executor import InferenceExecutor, inference_executor
+from app.ml.file_scoring import FORMATS, FileScorer, pq, read_chunks
+from app.ml.scoring import read_features
+from app.ml.serve import ActiveModel, ModelService, model_service
+
+_logger = logging.getLogger(__name__)
+
+JOB_SOURCES = ("ids", "filter", "file")
+FINAL_STATUSES = ("succeeded", "failed")
+
+# opérateurs de bornes acceptés dans un filtre: {"age": {"gte": 30, "lt": 50}}
+_FILTER_OPS = {"gt": "__gt__", "gte": "__ge__", "lt": "__lt__", "lte": "__le__"}
+
+# identités des runners actifs dans ce processus (leurs jobs "running" ne sont pas orphelins)
+_LIVE_OWNERS: Set[str] = set()
+
+
+def filter_clauses(spec: Dict[str, Any]) -> List[Any]:
+    """Conditions SQLAlchemy sur `employee_features` à partir d'un filtre JSON.
+
+    `{"departement": "COMMERCIAL", "poste": ["MANAGER", "CONSULTANT"], "age": {"gte": 30}}` :
+    égalité, appartenance à une liste ou bornes (`gt`, `gte`, `lt`, `lte`),
+    combinées par ET.
+
+    Raises:
+        ValueError: Colonne ou opérateur inconnu.
+    """
+    clauses = []
+    for col, cond in (spec or {}).items():
+        if col not in FEATURE_TABLE_COLS:
+            raise ValueError(f"Colonne de filtre inconnue: {col!r}")
+        column = getattr(EmployeeFeatures, col)
+        if isinstance(cond, dict):
+            unknown = set(cond) - set(_FILTER_OPS)
+            if not cond or unknown:
+                raise ValueError(f"Opérateur de filtre inconnu pour {col!r}: {sorted(unknown)} (attendu: {', '.join(_FILTER_OPS)})")
+            clauses.extend(getattr(column, _FILTER_OPS[op])(v) for op, v in cond.items())
+        elif isinstance(cond, list):
+            clauses.append(column.in_(cond))
+        else:
+            clauses.append(column == cond)
+    return clauses
+
+
+def _make_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class JobRunner:
+    """Jobs de scoring asynchrones: file d'attente en base, threads de travail, reprise après arrêt.
+
+    Un job porte sur une liste d'identifiants, un filtre sur
+    `employee_features` ou un fichier CSV/Parquet déposé dans `jobs_dir`. Il
+    est traité par blocs de `chunk_size` lignes ; chaque bloc écrit ses
+    résultats et avance le curseur du job (dernier `id_employee` traité, ou
+    nombre de blocs du fichier) dans la même transaction. Un job interrompu
+    reprend donc au dernier bloc commité, sans doublon.
+
+    Les threads réservent un job par un UPDATE conditionnel (plusieurs
+    processus peuvent partager la base). Un job "running" dont le
+    propriétaire a disparu (processus arrêté, ou battement de cœur plus vieux
+    que `stale_seconds`) est repris par le premier runner disponible. Le
+    battement de cœur est rafraîchi pendant le traitement, même au milieu
+    d'un bloc long. Chaque réservation incrémente `attempts`, qui sert de
+    jeton : les écritures d'une réservation perdue (autre processus ou
+    autre thread du même runner) sont refusées.
+    """
+
+    def __init__(
+        self,
+        bind=None,
+        service: Optional[ModelService] = None,
+        executor: Optional[InferenceExecutor] = None,
+        workers: int = 1,
+        chunk_size: int = 1000,
+        poll_seconds: float = 1.0,
+        stale_seconds: float = 60.0,
+        jobs_dir: str = "./data/jobs",
+    ):
+        self.bind = bind
+        self.service = service or model_service
+        self.executor = executor or (inference_executor if self.service is model_service else InferenceExecutor(self.service))
+        self.workers = max(0, int(workers))
+        self.chunk_size = max(1, int(chunk_size))
+        self.poll_seconds = float(poll_seconds)
+        self.stale_seconds = float(stale_seconds)
+        self.jobs_dir = jobs_dir
+        self.owner = _make_owner()
+        _LIVE_OWNERS.add(self.owner)
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._current: Set[str] = set()
+        self._lock = threading.Lock()
+        self.n_succeeded = 0
+        self.n_failed = 0
+        self.n_chunks = 0
+        self.n_resumed = 0
+
+    # --- Soumission ---
+
+    def submit_ids(self, ids: List[int]) -> Dict[str, Any]:
+        """Job sur une liste d'identifiants (dédoublonnés, traités par ordre croissant)."""
+        ids = sorted({int(i) for i in ids})
+        if not ids:
+            raise ValueError("La liste 'ids' est vide")
+        return self._create("ids", {"ids": ids}, total=len(ids))
+
+    def submit_filter(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        """Job sur les lignes de `employee_features` qui vérifient `spec` (voir `filter_clauses`)."""
+        clauses = filter_clauses(spec)
+        with self.bind.connect() as conn:
+            total = conn.execute(select(func.count()).select_from(EmployeeFeatures).where(*clauses)).scalar_one()
+        return self._create("filter", {"filter": spec or {}}, total=int(total))
+
+    def submit_file(self, path: str, fmt: str) -> Dict[str, Any]:
+        """Job sur un fichier CSV/Parquet ; le fichier est déplacé dans `jobs_dir` jusqu'à la fin du job."""
+        if fmt not in FORMATS:
+            raise ValueError(f"Format inconnu: {fmt!r} (attendu: {', '.join(FORMATS)})")
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        dst = os.path.join(self.jobs_dir, f"{job_id}.{fmt}")
+        shutil.move(path, dst)
+        total = pq.ParquetFile(dst).metadata.num_rows if fmt == "parquet" and pq is not None else None
+        return self._create("file", {"path": os.path.abspath(dst), "format": fmt}, total=total, job_id=job_id)
+
+    def _create(self, source: str, params: Dict[str, Any], total: Optional[int], job_id: Optional[str] = None) -> Dict[str, Any]:
+        job_id = job_id or uuid.uuid4().hex
+        # taille de bloc figée à la soumission: le curseur d'un fichier compte des blocs
+        params = {**params, "chunk_size": self.chunk_size}
+        with self.bind.begin() as conn:
+            conn.execute(
+                insert(ScoringJob).values(
+                    id=job_id, created_at=datetime.utcnow(), source=source, params=params, status="pending",
+                    total=total, rows_scored=0, rows_skipped=0, chunks_done=0, attempts=0,
+                )
+            )
+        self._wake.set()
+        return self.status(job_id)
+
+    # --- Consultation ---
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """État d'un job: avancement, débit, estimation du temps restant ; None si inconnu."""
+        with self.bind.connect() as conn:
+            job = conn.execute(select(ScoringJob.__table__).where(ScoringJob.id == job_id)).mappings().first()
+        if job is None:
+            return None
+        processed = job["rows_scored"] + job["rows_skipped"]
+        total = job["total"]
+        rate = job["rows_per_second"]
+        eta = None
+        if job["status"] == "running" and total is not None and rate:
+            eta = round(max(0, total - processed) / rate, 1)
+        return {
+            "job_id": job["id"],
+            "source": job["source"],
+            "status": job["status"],
+            "total": total,
+            "processed": processed,
+            "rows_scored": job["rows_scored"],
+            "rows_skipped": job["rows_skipped"],
+            "progress": round(processed / total, 4) if total else (1.0 if job["status"] == "succeeded" else None),
+            "chunks_done": job["chunks_done"],
+            "rows_per_second": rate,
+            "eta_seconds": eta,
+            "model_version": job["model_version"],
+            "attempts": job["attempts"],
+            "created_at": job["created_at"],
+            "started_at": job["started_at"],
+            "finished_at": job["finished_at"],
+            "error": job["error"],
+        }
+
+    def results(self, job_id: str, after: int = -1, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Résultats d'un job dont le numéro (`seq`) est strictement supérieur à `after`."""
+        cols = [c for c in ScoringJobResult.__table__.c if c.name != "job_id"]
+        with self.bind.connect() as conn:
+            rows = conn.execute(
+                select(*cols)
+                .where(ScoringJobResult.job_id == job_id, ScoringJobResult.seq > after)
+                .order_by(ScoringJobResult.seq)
+                .limit(limit)
+            ).mappings().all()
+        return [dict(r) for r in rows]
+
+    # --- Exécution ---
+
+    def _owner_alive(self, owner: Optional[str]) -> bool:
+        # vrai si le propriétaire peut encore travailler; faux seulement si on le sait arrêté
+        if owner is None:
+            return False
+        if owner in _LIVE_OWNERS:
+            return True
+        try:
+            host, pid, _ = owner.rsplit(":", 2)
+            pid = int(pid)
+        except ValueError:
+            return True
+        if host != socket.gethostname():
+            return True
+        if pid == os.getpid():
+            # ancienne incarnation de ce processus (même pid après redémarrage d'un conteneur)
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            return True
+        return True
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        stale = datetime.utcnow() - timedelta(seconds=self.stale_seconds)
+        with self.bind.connect() as conn:
+            candidates = conn.execute(
+                select(ScoringJob.id, ScoringJob.status, ScoringJob.owner, ScoringJob.attempts, ScoringJob.heartbeat_at)
+                .where(ScoringJob.status.in_(("pending", "running")))
+                .order_by(ScoringJob.created_at)
+            ).mappings().all()
+        for job in candidates:
+            if job["status"] == "running":
+                fresh = job["heartbeat_at"] is not None and job["heartbeat_at"].replace(tzinfo=None) >= stale
+                if fresh and self._owner_alive(job["owner"]):
+                    continue
+            now = datetime.utcnow()
+            with self.bind.begin() as conn:
+                # réservation optimiste: échoue si un autre runner a pris le job entre-temps
+                res = conn.execute(
+                    update(ScoringJob)
+                    .where(ScoringJob.id == job["id"], ScoringJob.status == job["status"], ScoringJob.attempts == job["attempts"])
+                    .values(status="running", owner=self.owner, attempts=ScoringJob.attempts + 1, heartbeat_at=now, error=None)
+                )
+                if res.rowcount != 1:
+                    continue
+                conn.execute(
+                    update(ScoringJob).where(ScoringJob.id == job["id"], ScoringJob.started_at.is_(None)).values(started_at=now)
+                )
+                claimed = conn.execute(select(ScoringJob.__table__).where(ScoringJob.id == job["id"])).mappings().one()
+            if job["status"] == "running":
+                self.n_resumed += 1
+                _logger.info("Job %s repris au bloc %s (propriétaire précédent: %s)", job["id"], claimed["chunks_done"], job["owner"])
+            return dict(claimed)
+        return None
+
+    def _owns(self, job: Dict[str, Any]) -> List[Any]:
+        # réservation toujours détenue: même propriétaire et même jeton (attempts) qu'au moment du claim
+        return [ScoringJob.id == job["id"], ScoringJob.owner == self.owner, ScoringJob.attempts == job["attempts"]]
+
+    def _keep_alive(self, job: Dict[str, Any]) -> Callable[[], None]:
+        # rafraîchit heartbeat_at pendant le traitement (un bloc peut durer plus que stale_seconds); renvoie l'arrêt
+        done = threading.Event()
+        interval = max(self.stale_seconds / 3, 0.05)
+
+        def beat():
+            while not done.wait(interval):
+                try:
+                    with self.bind.begin() as conn:
+                        conn.execute(
+                            update(ScoringJob)
+                            .where(*self._owns(job), ScoringJob.status == "running")
+                            .values(heartbeat_at=datetime.utcnow())
+                        )
+                except Exception as e:
+                    _logger.warning("Job %s: battement de cœur non écrit: %s", job["id"], e)
+
+        thread = threading.Thread(target=beat, name=f"scoring-job-heartbeat-{job['id'][:8]}", daemon=True)
+        thread.start()
+
+        def stop():
+            done.set()
+            thread.join()
+
+        return stop
+
+    def _chunks(self, job: Dict[str, Any], scorer: FileScorer, active: ActiveModel) -> Iterator[Tuple[pd.DataFrame, int, int]]:
+        # (résultats, lignes écartées, curseur après le bloc), en partant du curseur commité
+        params = job["params"]
+        size = int(params.get("chunk_size") or self.chunk_size)
+        cursor = job["cursor"]
+        if job["source"] == "ids":
+            ids = params["ids"]
+            start = 0 if cursor is None else bisect.bisect_right(ids, cursor)
+            for i in range(start, len(ids), size):
+                part = ids[i:i + size]
+                with self.bind.connect() as conn:
+                    df = read_features(conn, EmployeeFeatures.id_employee.in_(part))
+                yield scorer.score_features(df, active), len(part) - len(df), part[-1]
+        elif job["source"] == "filter":
+            clauses = filter_clauses(params.get("filter"))
+            while True:
+                # pagination par clé (id_employee > curseur), pas d'OFFSET
+                keyset = [] if cursor is None else [EmployeeFeatures.id_employee > cursor]
+                with self.bind.connect() as conn:
+                    df = read_features(conn, *clauses, *keyset, limit=size)
+                if df.empty:
+                    return
+                cursor = int(df["id_employee"].iloc[-1])
+                yield scorer.score_features(df, active), 0, cursor
+        else:
+            done = cursor or 0
+            for i, chunk in enumerate(read_chunks(params["path"], params["format"], size)):
+                if i < done:
+                    continue
+                scored = scorer.score_chunk(chunk, active)
+                yield scored, len(chunk) - len(scored), i + 1
+
+    def _commit_chunk(self, job: Dict[str, Any], scored: pd.DataFrame, skipped: int, cursor: int, rate: Optional[float], version: str) -> bool:
+        seq0 = job["rows_scored"]
+        rows = [
+            {
+                "job_id": job["id"],
+                "seq": seq0 + k,
+                "id_employee": int(i),
+                "proba": float(p),
+                "pred_quitte_entreprise": str(lbl),
+                "model_version": version,
+            }
+            for k, (i, p, lbl) in enumerate(zip(scored["id_employee"], scored["proba"], scored["pred_quitte_entreprise"]))
+        ]
+        with self.bind.begin() as conn:
+            res = conn.execute(
+                update(ScoringJob)
+                .where(*self._owns(job), ScoringJob.status == "running")
+                .values(
+                    rows_scored=ScoringJob.rows_scored + len(rows),
+                    rows_skipped=ScoringJob.rows_skipped + skipped,
+                    chunks_done=ScoringJob.chunks_done + 1,
+                    cursor=cursor,
+                    rows_per_second=rate,
+                    model_version=version,
+                    heartbeat_at=datetime.utcnow(),
+                )
+            )
+            if res.rowcount != 1:
+                # job repris par un autre runner: ce bloc n'est pas écrit
+                return False
+            if rows:
+                conn.execute(insert(ScoringJobResult), rows)
+        job["rows_scored"] += len(rows)
+        job["rows_skipped"] += skipped
+        job["chunks_done"] += 1
+        job["cursor"] = cursor
+        self.n_chunks += 1
+        return True
+
+    def _finish(self, job: Dict[str, Any], status: str, error: Optional[str] = None) -> None:
+        with self.bind.begin() as conn:
+            conn.execute(
+                update(ScoringJob)
+                .where(*self._owns(job))
+                .values(status=status, error=error, finished_at=datetime.utcnow(), owner=None)
+            )
+        if job["source"] == "file":
+            try:
+                os.remove(job["params"]["path"])
+            except OSError:
+                pass
+
+    def run_job(self, job: Dict[str, Any]) -> str:
+        """Traite un job réservé jusqu'au bout, à l'arrêt du runner ou à la perte de la réservation.
+
+        Returns:
+            Statut final ("succeeded", "failed"), ou "interrupted".
+        """
+        with self._lock:
+            self._current.add(job["id"])
+        t0 = time.perf_counter()
+        processed = 0
+        stop_heartbeat = self._keep_alive(job)
+        try:
+            active = self.service.active()
+            scorer = FileScorer(self.service, self.executor, chunk_size=self.chunk_size)
+            for scored, skipped, cursor in self._chunks(job, scorer, active):
+                processed += len(scored) + skipped
+                rate = round(processed / max(time.perf_counter() - t0, 1e-9), 1)
+                if not self._commit_chunk(job, scored, skipped, cursor, rate, active.version):
+                    _logger.warning("Job %s repris par un autre runner: abandon", job["id"])
+                    return "interrupted"
+                if self._stop.is_set():
+                    return "interrupted"
+            self._finish(job, "succeeded")
+            self.n_succeeded += 1
+            _logger.info(
+                "Job %s terminé: %s lignes scorées, %s écartées, %.2fs",
+                job["id"], job["rows_scored"], job["rows_skipped"], time.perf_counter() - t0,
+            )
+            return "succeeded"
+        except Exception as e:
+            _logger.exception("Job %s en échec", job["id"])
+            self._finish(job, "failed", f"{type(e).__name__}: {e}")
+            self.n_failed += 1
+            return "failed"
+        finally:
+            stop_heartbeat()
+            with self._lock:
+                self._current.discard(job["id"])
+
+    def run_once(self) -> bool:
+        """Réserve et traite un job en attente (ou orphelin) ; faux s'il n'y en a aucun."""
+        job = self._claim()
+        if job is None:
+            return False
+        self.run_job(job)
+        return True
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                ran = self.run_once()
+            except Exception:
+                _logger.exception("Runner de jobs: erreur de réservation")
+                ran = False
+            if not ran:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+
+    def start(self, bind=None) -> None:
+        if bind is not None:
+            self.bind = bind
+        if self._threads or self.workers <= 0 or self.bind is None:
+            return
+        # identité propre au processus courant (le runner a pu être créé avant un fork)
+        _LIVE_OWNERS.discard(self.owner)
+        self.owner = _make_owner()
+        _LIVE_OWNERS.add(self.owner)
+        self._stop.clear()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._loop, name=f"scoring-job-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Arrête les threads ; les jobs en cours repassent "pending" et reprendront à leur curseur."""
+        if not self._threads:
+            return
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+        try:
+            with self.bind.begin() as conn:
+                conn.execute(
+                    update(ScoringJob)
+                    .where(ScoringJob.owner == self.owner, ScoringJob.status == "running")
+                    .values(status="pending", owner=None)
+                )
+        except Exception as e:
+            _logger.warning("Jobs en cours non libérés à l'arrêt: %s", e)
+        _LIVE_OWNERS.discard(self.owner)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._threads),
+            "running": sorted(self._current),
+            "succeeded": self.n_succeeded,
+            "failed": self.n_failed,
+            "resumed": self.n_resumed,
+            "chunks": self.n_chunks,
+        }
+
+
+def job_runner_from_settings() -> JobRunner:
+    from app.core.config import get_settings
+    from app.db.session import engine
+
+    settings = get_settings()
+    return JobRunner(
+        bind=engine,
+        workers=settings.JOBS_WORKERS,
+        chunk_size=settings.JOBS_CHUNK_SIZE,
+        poll_seconds=settings.JOBS_POLL_SECONDS,
+        stale_seconds=settings.JOBS_STALE_SECONDS,
+        jobs_dir=settings.JOBS_DIR,
+    )
+
+
+job_runner = job_runner_from_settings()
@@ -1,14 +1,15 @@
 # app/ml/model_loader.py
 import os
 import logging
-import joblib
 
-# Prefer explicit MODEL_LOCAL, else fall back to MODEL_PATH for consistency with ModelService
-MODEL_LOCAL = os.getenv("MODEL_LOCAL") or os.getenv("MODEL_PATH") or "app/ml/model.pkl"
+from app.ml.serve import MODEL_PATH, model_service
+
+# Même fichier que ModelService (MODEL_PATH, ou l'alias MODEL_LOCAL): le modèle préchargé
+# est forcément celui qui sert les prédictions
+MODEL_LOCAL = MODEL_PATH
 MODEL_REPO_ID = os.getenv("MODEL_REPO_ID", "sma-nas/Futurysis")
 MODEL_FILENAME = os.getenv("MODEL_FILENAME", "model.pkl")
 
-_model = None
 _logger = logging.getLogger(__name__)
 
 def _download_from_hub(local_dir: str):
@@ -34,18 +35,23 @@ def _download_from_hub(local_dir: str):
 
 
 def get_model():
-    global _model
-    if _model is None:
-        if not os.path.exists(MODEL_LOCAL):
-            os.makedirs(os.path.dirname(MODEL_LOCAL), exist_ok=True)
-            try:
-                _download_from_hub(os.path.dirname(MODEL_LOCAL))
-            except ImportError:
-                # Graceful degrade: log and skip download. Let caller lazily load later.
-                _logger.warning(
-                    "huggingface_hub not installed; skipping Hub download. "
-                    "Set MODEL_LOCAL/MODEL_PATH to an existing file or install huggingface_hub."
-                )
-                return None
-        _model = joblib.load(MODEL_LOCAL)
-    return _model
+    """Télécharge le modèle si besoin et renvoie l'instance chargée par `model_service`.
+
+    Aucune désérialisation propre à ce module : le chargement passe par le
+    registre (`app/ml/registry.py`), partagé avec `ModelService`.
+    """
+    path = model_service.model_path
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            _download_from_hub(os.path.dirname(path))
+        except ImportError:
+            # Graceful degrade: log and skip download. Let caller lazily load later.
+            _logger.warning(
+                "huggingface_hub not installed; skipping Hub download. "
+                "Set MODEL_LOCAL/MODEL_PATH to an existing file or install huggingface_hub."
+            )
+            return None
+    if model_service.model is None:
+        model_service.load()
+    return model_service.model
@@ -0,0 +1,248 @@
+# app/ml/population.py
+from __future__ import annotations
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, insert, select
+
+from app.db.models import EmployeeFeatures, EmployeeScore
+from app.ml.executor import InferenceExecutor
+from app.ml.file_scoring import FileScorer
+from app.ml.scoring import features_hash, labels_from_proba, read_features, score_frame
+from app.ml.serve import ActiveModel, ModelService, model_service
+
+_logger = logging.getLogger(__name__)
+
+# colonnes réécrites quand un score existe déjà pour l'employé
+_SCORE_UPSERT_COLS = ("proba", "pred_quitte_entreprise", "model_version", "scored_at", "features_hash")
+
+
+def iter_feature_pages(bind, chunk_size: int, after: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """Parcourt `employee_features` par pages de `chunk_size` lignes (pagination par clé).
+
+    Chaque page est une requête courte sur sa propre connexion : aucune
+    transaction ni curseur serveur ne reste ouvert pendant le scoring.
+    """
+    while True:
+        keyset = [] if after is None else [EmployeeFeatures.id_employee > after]
+        with bind.connect() as conn:
+            df = read_features(conn, *keyset, limit=chunk_size)
+        if df.empty:
+            return
+        after = int(df["id_employee"].iloc[-1])
+        yield df
+
+
+def _scores_upsert(conn):
+    # INSERT ... ON CONFLICT (id_employee) DO UPDATE selon le dialecte; None si non supporté
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    stmt = dialect_insert(EmployeeScore)
+    return stmt.on_conflict_do_update(
+        index_elements=[EmployeeScore.id_employee],
+        set_={c: stmt.excluded[c] for c in _SCORE_UPSERT_COLS},
+    )
+
+
+def upsert_employee_scores(conn, rows: List[Dict[str, Any]]) -> None:
+    """Écrit un lot de scores en une instruction (executemany), en remplaçant les scores existants."""
+    if not rows:
+        return
+    stmt = _scores_upsert(conn)
+    if stmt is None:
+        conn.execute(delete(EmployeeScore).where(EmployeeScore.id_employee.in_([r["id_employee"] for r in rows])))
+        stmt = insert(EmployeeScore)
+    conn.execute(stmt, rows)
+
+
+def rescore_employees(bind, ids: Sequence[int], service: Optional[ModelService] = None, batch_size: int = 1000) -> Dict[str, int]:
+    """Met à jour `employee_scores` pour les seuls identifiants `ids` (après une ingestion delta).
+
+    Les employés encore présents dans `employee_features` sont re-scorés et
+    leurs scores remplacés par upsert ; ceux qui n'y sont plus perdent leur
+    score. Une transaction courte par lot de `batch_size` identifiants.
+
+    Returns:
+        Nombre de scores recalculés et supprimés.
+    """
+    service = service or model_service
+    active = service.active()
+    ids = sorted({int(i) for i in ids})
+    stats = {"rescored": 0, "deleted": 0}
+    scored_at = datetime.now(timezone.utc)
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        with bind.connect() as conn:
+            df = read_features(conn, EmployeeFeatures.id_employee.in_(batch))
+        rows = []
+        if not df.empty:
+            proba = np.asarray(score_frame(df, service), dtype=float)
+            rows = [
+                {
+                    "id_employee": int(i),
+                    "proba": float(p),
+                    "pred_quitte_entreprise": str(lbl),
+                    "model_version": active.version,
+                    "scored_at": scored_at,
+                    "features_hash": h,
+                }
+                for i, p, lbl, h in zip(df["id_employee"], proba, labels_from_proba(proba), features_hash(df))
+            ]
+        gone = sorted(set(batch) - {r["id_employee"] for r in rows})
+        with bind.begin() as conn:
+            upsert_employee_scores(conn, rows)
+            if gone:
+                stats["deleted"] += conn.execute(delete(EmployeeScore).where(EmployeeScore.id_employee.in_(gone))).rowcount
+        stats["rescored"] += len(rows)
+    _logger.info("Scores mis à jour pour %s employés (%s supprimés)", stats["rescored"], stats["deleted"])
+    return stats
+
+
+class PopulationScorer:
+    """Re-scoring complet de `employee_features` vers `employee_scores`, par blocs.
+
+    Les features sont lues par pages (pagination par clé sur `id_employee`),
+    prétraitées en une fois par bloc puis évaluées par l'exécuteur ; avec
+    `parallelism > 1` la matrice d'un bloc est découpée en autant de parts
+    soumises simultanément (utile avec un pool de processus). Chaque bloc est
+    écrit par un upsert dans sa propre transaction courte : la table reste
+    lisible par l'API pendant tout le traitement, et les scores encore d'une
+    autre version sont simplement ignorés par `/predict/by-id`.
+
+    Chaque score porte l'empreinte des features qui l'ont produit
+    (`features_hash`). En mode incrémental, une ligne dont l'empreinte et la
+    version du modèle n'ont pas changé depuis son dernier score est sautée :
+    seules les lignes nouvelles ou modifiées, ou toutes après un changement
+    de modèle, sont recalculées.
+
+    À la fin, les scores d'employés disparus de `employee_features` sont
+    supprimés.
+    """
+
+    def __init__(
+        self,
+        bind,
+        service: Optional[ModelService] = None,
+        executor: Optional[InferenceExecutor] = None,
+        chunk_size: int = 5000,
+        parallelism: int = 1,
+        pause_seconds: float = 0.0,
+    ):
+        self.bind = bind
+        self.service = service or model_service
+        self.executor = executor or InferenceExecutor(self.service)
+        self.chunk_size = max(1, int(chunk_size))
+        self.parallelism = max(1, int(parallelism))
+        self.pause_seconds = max(0.0, float(pause_seconds))
+        self._scorer = FileScorer(self.service, self.executor, chunk_size=self.chunk_size)
+
+    def _predict(self, encoded, active: ActiveModel, pool: Optional[ThreadPoolExecutor]) -> np.ndarray:
+        if pool is None or encoded.shape[0] < 2 * self.parallelism:
+            return np.asarray(self.executor.predict_proba_encoded(encoded, active), dtype=float)
+        parts = np.array_split(np.arange(encoded.shape[0]), self.parallelism)
+        futures = [pool.submit(self.executor.predict_proba_encoded, encoded[idx], active) for idx in parts]
+        return np.concatenate([np.asarray(f.result(), dtype=float) for f in futures])
+
+    def _changed(self, df: pd.DataFrame, hashes: np.ndarray, version: str) -> np.ndarray:
+        # masque des lignes à recalculer: pas de score, empreinte ou version du modèle différente
+        ids = df["id_employee"]
+        with self.bind.connect() as conn:
+            prev = pd.read_sql(
+                select(EmployeeScore.id_employee, EmployeeScore.features_hash, EmployeeScore.model_version).where(
+                    EmployeeScore.id_employee.between(int(ids.iloc[0]), int(ids.iloc[-1]))
+                ),
+                conn,
+            )
+        prev = prev.set_index("id_employee").reindex(ids.to_numpy())
+        same = (prev["features_hash"].to_numpy() == hashes) & (prev["model_version"].to_numpy() == version)
+        return ~same
+
+    def run(
+        self,
+        prune: bool = True,
+        incremental: bool = False,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Any]:
+        """Score la population et met `employee_scores` à jour.
+
+        Args:
+            prune: Supprime les scores des employés absents de `employee_features`.
+            incremental: Ne recalcule que les lignes dont l'empreinte des
+                features ou la version du modèle a changé.
+            progress: Appelée après chaque bloc avec les statistiques courantes.
+
+        Returns:
+            Statistiques: lignes lues, recalculées et sautées, blocs, durée,
+            lignes/s, version du modèle, scores supprimés.
+        """
+        active = self.service.active()
+        run_at = datetime.now(timezone.utc)
+        t0 = time.perf_counter()
+        stats: Dict[str, Any] = {
+            "rows": 0, "rescored": 0, "skipped": 0, "chunks": 0,
+            "incremental": incremental, "model_version": active.version,
+        }
+        pool = ThreadPoolExecutor(self.parallelism, thread_name_prefix="population") if self.parallelism > 1 else None
+        try:
+            for df in iter_feature_pages(self.bind, self.chunk_size):
+                n = len(df)
+                hashes = features_hash(df)
+                if incremental:
+                    todo = self._changed(df, hashes, active.version)
+                    df, hashes = df[todo].reset_index(drop=True), hashes[todo]
+                if not df.empty:
+                    proba = self._predict(self._scorer.encode(df, active), active, pool)
+                    labels = labels_from_proba(proba)
+                    rows = [
+                        {
+                            "id_employee": int(i),
+                            "proba": float(p),
+                            "pred_quitte_entreprise": str(lbl),
+                            "model_version": active.version,
+                            "scored_at": run_at,
+                            "features_hash": h,
+                        }
+                        for i, p, lbl, h in zip(df["id_employee"], proba, labels, hashes)
+                    ]
+                    with self.bind.begin() as conn:
+                        upsert_employee_scores(conn, rows)
+                stats["rows"] += n
+                stats["rescored"] += len(df)
+                stats["skipped"] += n - len(df)
+                stats["chunks"] += 1
+                elapsed = time.perf_counter() - t0
+                stats["seconds"] = round(elapsed, 3)
+                stats["rows_per_second"] = round(stats["rows"] / max(elapsed, 1e-9), 1)
+                if progress is not None:
+                    progress(dict(stats))
+                if self.pause_seconds:
+                    # laisse la base et le CPU aux requêtes de l'API entre deux blocs
+                    time.sleep(self.pause_seconds)
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True)
+
+        stats["pruned"] = 0
+        if prune:
+            with self.bind.begin() as conn:
+                stats["pruned"] = conn.execute(
+                    delete(EmployeeScore).where(EmployeeScore.id_employee.not_in(select(EmployeeFeatures.id_employee)))
+                ).rowcount
+        elapsed = time.perf_counter() - t0
+        stats["seconds"] = round(elapsed, 3)
+        stats["rows_per_second"] = round(stats["rows"] / max(elapsed, 1e-9), 1)
+        _logger.info(
+            "Population scorée: %s lignes (%s recalculées, %s inchangées) en %s blocs, %.2fs, %.0f lignes/s (model_version=%s)",
+            stats["rows"], stats["rescored"], stats["skipped"], stats["chunks"], elapsed, stats["rows_per_second"], active.version,
+        )
+        return stats
@@ -0,0 +1,119 @@
+# app/ml/registry.py
+from __future__ import annotations
+import hashlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+import joblib
+
+from app.core.memory import process_memory
+
+_logger = logging.getLogger(__name__)
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 complet du contenu d'un fichier."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@dataclass
+class ModelArtifact:
+    digest: str
+    path: str
+    model: Any
+    mmap: bool
+    file_bytes: int
+    load_seconds: float
+    rss_delta_bytes: int
+    loaded_at: float
+
+    @property
+    def version(self) -> str:
+        return self.digest[:12]
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "path": self.path,
+            "mmap": self.mmap,
+            "file_bytes": self.file_bytes,
+            "load_seconds": round(self.load_seconds, 4),
+            "rss_delta_bytes": self.rss_delta_bytes,
+            "loaded_at": self.loaded_at,
+        }
+
+
+class ModelRegistry:
+    """Modèles désérialisés une seule fois par processus, indexés par hash de contenu.
+
+    Deux chemins vers le même contenu (ou deux `ModelService`) reçoivent la
+    même instance : un seul `joblib.load`, une seule copie en mémoire. Pour
+    chaque artefact sont conservés le temps de chargement, la taille du
+    fichier et la variation de RSS observée pendant le chargement.
+    """
+
+    def __init__(self):
+        self._artifacts: Dict[Tuple[str, bool], ModelArtifact] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.hits = 0
+
+    def get(self, path: str, mmap: bool = False) -> ModelArtifact:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Model file not found: {path}")
+        digest = file_digest(path)
+        key = (digest, bool(mmap))
+        with self._lock:
+            artifact = self._artifacts.get(key)
+            if artifact is not None:
+                self.hits += 1
+                return artifact
+            rss0 = process_memory().get("rss_bytes", 0)
+            t0 = time.perf_counter()
+            model = joblib.load(path, mmap_mode="r" if mmap else None)
+            artifact = ModelArtifact(
+                digest=digest,
+                path=os.path.abspath(path),
+                model=model,
+                mmap=bool(mmap),
+                file_bytes=os.path.getsize(path),
+                load_seconds=time.perf_counter() - t0,
+                rss_delta_bytes=max(0, process_memory().get("rss_bytes", 0) - rss0),
+                loaded_at=time.time(),
+            )
+            self._artifacts[key] = artifact
+            self.loads += 1
+        _logger.info(
+            "Modèle %s chargé depuis %s en %.3fs (%s octets)",
+            artifact.version, artifact.path, artifact.load_seconds, artifact.file_bytes,
+        )
+        return artifact
+
+    def release(self, version: str) -> int:
+        """Oublie les artefacts d'une version (ex. après remplacement du modèle)."""
+        with self._lock:
+            keys = [k for k, a in self._artifacts.items() if a.version == version]
+            for k in keys:
+                del self._artifacts[k]
+        return len(keys)
+
+    def artifacts(self) -> List[ModelArtifact]:
+        return list(self._artifacts.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loads": self.loads,
+            "hits": self.hits,
+            "artifacts": [a.describe() for a in self.artifacts()],
+        }
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,102 @@
+# app/ml/reload.py
+from __future__ import annotations
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from app.ml.serve import ModelService, ModelValidationError, model_service
+
+_logger = logging.getLogger(__name__)
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, taille) du fichier, ou None s'il est absent."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class ModelReloader:
+    """Rechargement à chaud de `ModelService`, sur demande ou par surveillance du fichier.
+
+    La surveillance compare périodiquement (mtime, taille) de `model_path` ;
+    un changement déclenche `ModelService.reload`, qui ne bascule qu'un
+    artefact préchauffé et validé. Après une bascule, `employee_scores` est
+    reconstruite si une base est connue (les scores de l'ancienne version
+    sont de toute façon ignorés par `/predict/by-id`).
+    """
+
+    def __init__(self, service: Optional[ModelService] = None, watch_seconds: float = 0.0):
+        self.service = service or model_service
+        self.watch_seconds = float(watch_seconds)
+        self._bind = None
+        self._signature: Optional[Tuple[int, int]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def reload(self, path: Optional[str] = None) -> Dict[str, Any]:
+        """Recharge le modèle (voir `ModelService.reload`) puis ses scores matérialisés."""
+        result = self.service.reload(path)
+        self._signature = file_signature(self.service.model_path)
+        if result["swapped"] and self._bind is not None:
+            # import local: app.ml.scoring dépend de app.api, qui expose l'endpoint d'administration
+            from app.ml.scoring import rebuild_employee_scores
+
+            try:
+                rebuild_employee_scores(self._bind, self.service)
+            except Exception as e:
+                _logger.warning("employee_scores non reconstruite après rechargement: %s", e)
+        return result
+
+    def check(self) -> Optional[Dict[str, Any]]:
+        """Recharge si le fichier du modèle a changé depuis la dernière vérification."""
+        signature = file_signature(self.service.model_path)
+        if signature is None or signature == self._signature:
+            return None
+        try:
+            return self.reload()
+        except ModelValidationError:
+            # fichier refusé: on attend la prochaine modification plutôt que de réessayer en boucle
+            self._signature = signature
+            return None
+
+    def start(self, bind=None) -> None:
+        self._bind = bind
+        self._signature = file_signature(self.service.model_path)
+        if self._thread is not None or self.watch_seconds <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch_loop, name="model-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def _watch_loop(self) -> None:
+        while not self._stop.wait(self.watch_seconds):
+            try:
+                self.check()
+            except Exception as e:
+                _logger.warning("Surveillance du modèle: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.service.stats(),
+            "watch_seconds": self.watch_seconds,
+            "watching": self._thread is not None,
+        }
+
+
+def model_reloader_from_settings(service: ModelService) -> ModelReloader:
+    from app.core.config import get_settings
+
+    return ModelReloader(service, watch_seconds=get_settings().MODEL_WATCH_SECONDS)
+
+
+model_reloader = model_reloader_from_settings(model_service)
@@ -0,0 +1,159 @@
+# app/ml/scoring.py
+from __future__ import annotations
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, func, insert, select
+
+from app.api.schemas import ALL_FEATURES, COL_NUM
+from app.db.models import EmployeeFeatures, EmployeeScore
+from app.etl.delta import hash_rows
+from app.ml.serve import SEUIL_FIXE, ModelService, model_service
+
+_logger = logging.getLogger(__name__)
+
+# Colonnes texte normalisées (strip + majuscules) avant scoring
+NORMALIZED_STR_COLS = [
+    "genre",
+    "statut_marital",
+    "departement",
+    "poste",
+    "heure_supplementaires",
+    "domaine_etude",
+    "frequence_deplacement",
+]
+OUI_VALUES = {"OUI", "YES", "Y", "1", "TRUE"}
+NON_VALUES = {"NON", "NO", "N", "0", "FALSE"}
+
+
+def normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Équivalent vectorisé de `_normalize_payload` pour un DataFrame de features.
+
+    Les chaînes sont mises en majuscules sans espaces, les variantes oui/non
+    de `heure_supplementaires` ramenées à OUI/NON, et les chaînes vides
+    remplacées par `None` (et non NaN, comme pour un payload unitaire).
+    """
+    out = df.copy()
+    for col in NORMALIZED_STR_COLS:
+        if col not in out.columns:
+            continue
+        s = out[col].astype(object)
+        is_str = s.map(lambda v: isinstance(v, str))
+        s = s.where(~is_str, s[is_str].str.strip().str.upper())
+        if col == "heure_supplementaires":
+            s = s.where(~s.isin(OUI_VALUES), "OUI")
+            s = s.where(~s.isin(NON_VALUES), "NON")
+        out[col] = s
+    for col in out.columns:
+        if out[col].dtype == object:
+            blank = out[col].map(lambda v: isinstance(v, str) and v.strip() == "")
+            if blank.any():
+                out[col] = out[col].where(~blank, None)
+    return out
+
+
+def labels_from_proba(proba: np.ndarray) -> np.ndarray:
+    return np.where(np.asarray(proba) >= SEUIL_FIXE, "OUI", "NON")
+
+
+def score_frame(df: pd.DataFrame, service: Optional[ModelService] = None) -> np.ndarray:
+    """Probabilités de la classe positive pour un DataFrame de features brutes."""
+    service = service or model_service
+    X = normalize_frame(df[ALL_FEATURES])
+    return service.predict_proba_batch(X.to_dict("records"))
+
+
+def features_hash(df: pd.DataFrame) -> np.ndarray:
+    """Empreinte stable (16 caractères hexadécimaux) des entrées du modèle, ligne par ligne.
+
+    Calculée sur les features normalisées (`normalize_frame`) : deux lignes
+    qui donnent le même payload au modèle ont la même empreinte, quels que
+    soient les espaces, la casse ou le type (entier/flottant) stockés en base.
+    """
+    X = normalize_frame(df[ALL_FEATURES])
+    canon = pd.DataFrame(index=X.index)
+    for c in ALL_FEATURES:
+        if c in COL_NUM:
+            # flottants: 5 et 5.0 identiques
+            canon[c] = pd.to_numeric(X[c], errors="coerce").astype("float64")
+        else:
+            # texte, manquant (None ou NaN) -> ""
+            canon[c] = X[c].astype(object).where(X[c].notna(), "").astype(str)
+    return hash_rows(canon)
+
+
+def read_features(conn, *clauses, limit: Optional[int] = None) -> pd.DataFrame:
+    """Lignes de `employee_features` (identifiant + features du modèle) triées par identifiant.
+
+    Combinée à `EmployeeFeatures.id_employee > dernier_id` et `limit`, donne
+    une pagination par clé: chaque page est une lecture d'index, sans OFFSET.
+    """
+    cols = [EmployeeFeatures.id_employee] + [getattr(EmployeeFeatures, c) for c in ALL_FEATURES]
+    stmt = select(*cols).where(*clauses).order_by(EmployeeFeatures.id_employee)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return pd.read_sql(stmt, conn)
+
+
+def rebuild_employee_scores(bind, service: Optional[ModelService] = None) -> int:
+    """Recalcule `employee_scores` pour toute la table `employee_features`.
+
+    Une lecture, un seul appel vectorisé au modèle, puis remplacement complet
+    de la table dans une transaction.
+
+    Args:
+        bind: Engine SQLAlchemy de la base applicative.
+        service: Service modèle (par défaut le singleton `model_service`).
+
+    Returns:
+        Nombre de lignes écrites.
+    """
+    service = service or model_service
+    t0 = time.perf_counter()
+    cols = [EmployeeFeatures.id_employee] + [getattr(EmployeeFeatures, c) for c in ALL_FEATURES]
+    with bind.connect() as conn:
+        df = pd.read_sql(select(*cols), conn)
+
+    rows: List[Dict[str, Any]] = []
+    if not df.empty:
+        proba = score_frame(df, service)
+        labels = labels_from_proba(proba)
+        hashes = features_hash(df)
+        now = datetime.now(timezone.utc)
+        rows = [
+            {
+                "id_employee": int(i),
+                "proba": float(p),
+                "pred_quitte_entreprise": str(lbl),
+                "model_version": service.version,
+                "scored_at": now,
+                "features_hash": h,
+            }
+            for i, p, lbl, h in zip(df["id_employee"], proba, labels, hashes)
+        ]
+
+    with bind.begin() as conn:
+        conn.execute(delete(EmployeeScore))
+        if rows:
+            conn.execute(insert(EmployeeScore), rows)
+    _logger.info(
+        "employee_scores reconstruite: %s lignes en %.2fs (model_version=%s)",
+        len(rows), time.perf_counter() - t0, service.version,
+    )
+    return len(rows)
+
+
+def scores_are_current(bind, version: Optional[str]) -> bool:
+    """Vrai si chaque employé a un score produit par le modèle `version`."""
+    if version is None:
+        return False
+    with bind.connect() as conn:
+        n_features = conn.execute(select(func.count()).select_from(EmployeeFeatures)).scalar_one()
+        n_current = conn.execute(
+            select(func.count()).select_from(EmployeeScore).where(EmployeeScore.model_version == version)
+        ).scalar_one()
+    return n_features == n_current
@@ -1,44 +1,310 @@
 from __future__ import annotations
-from typing import Dict, Any
-import os, joblib, numpy as np, pandas as pd
+from typing import Dict, Any, List
+import os, logging, threading, numpy as np, pandas as pd
+from dataclasses import dataclass, replace
 from sklearn.pipeline import Pipeline
+from app.core.config import get_settings
+from app.ml.registry import file_digest, model_registry
+from app.ml.compiled import PARITY_ATOL, CompiledPreprocessor, compile_pipeline
+from app.ml.tree_engine import FlatGradientBoosting
 
 POSITIVE = 1
 SEUIL_FIXE = 0.125930
-MODEL_PATH = os.getenv("MODEL_PATH", os.path.join(os.path.dirname(__file__), "model.pkl"))
+# Chemin unique du modèle servi; MODEL_LOCAL reste accepté comme alias historique
+MODEL_PATH = (
+    os.getenv("MODEL_PATH")
+    or os.getenv("MODEL_LOCAL")
+    or os.path.join(os.path.dirname(__file__), "model.pkl")
+)
+
+_logger = logging.getLogger(__name__)
+
+
+def file_version(path: str) -> str:
+    """Version courte d'un artefact: début du SHA-256 de son contenu."""
+    return file_digest(path)[:12]
+
+@dataclass(frozen=True)
+class ActiveModel:
+    """État servi par `ModelService`, remplacé d'un bloc lors d'un rechargement.
+
+    Chaque appel d'inférence lit cet objet une seule fois : une requête en
+    cours termine sur le modèle avec lequel elle a commencé, même si un
+    rechargement le remplace entre-temps.
+    """
+
+    model: Any = None
+    version: str | None = None
+    path: str | None = None
+    compiled: CompiledPreprocessor | None = None
+    flat: FlatGradientBoosting | None = None
+
+
+class ModelValidationError(ValueError):
+    """Artefact refusé au rechargement (classes, probabilités ou chargement invalides)."""
+
 
 class ModelService:
-    def __init__(self, model_path: str = MODEL_PATH):
+    def __init__(
+        self,
+        model_path: str = MODEL_PATH,
+        compiled: bool = False,
+        engine: str = "sklearn",
+        mmap: bool = False,
+    ):
         self.model_path = model_path
-        self.model: Pipeline | None = None
+        # joblib.load(mmap_mode="r"): les tableaux NumPy conservés tels quels sont lus en mémoire
+        # partagée (pages du fichier) au lieu d'être copiés dans chaque processus
+        self.mmap = mmap
+        # Mode compilé: préprocesseur NumPy précalculé au chargement (voir app/ml/compiled.py)
+        self.compiled = compiled
+        # Moteur d'arbres: "sklearn" (estimateur d'origine) ou "flat" (app/ml/tree_engine.py)
+        self.engine = engine
+        self._active = ActiveModel()
+        # sérialise les rechargements; la lecture de `_active` n'est jamais verrouillée
+        self._reload_lock = threading.Lock()
+        self.n_reloads = 0
+        self.n_reload_failures = 0
+        self.last_reload_error: str | None = None
+
+    # --- état courant (une seule référence, remplacée atomiquement) ---
+
+    def active(self) -> ActiveModel:
+        """Modèle servi à cet instant (à passer aux appels d'une même requête)."""
+        if self._active.model is None:
+            self.load()
+        return self._active
+
+    @property
+    def model(self):
+        return self._active.model
+
+    @model.setter
+    def model(self, value) -> None:
+        self._active = replace(self._active, model=value, compiled=None, flat=None)
+
+    @property
+    def version(self) -> str | None:
+        return self._active.version
+
+    @version.setter
+    def version(self, value: str | None) -> None:
+        self._active = replace(self._active, version=value)
+
+    @property
+    def compiled_active(self) -> bool:
+        return self._active.compiled is not None
+
+    @property
+    def flat_active(self) -> bool:
+        return self._active.flat is not None
 
     def load(self):
-        if not os.path.exists(self.model_path):
-            raise FileNotFoundError(f"Model file not found: {self.model_path}")
-        self.model = joblib.load(self.model_path)
+        # Instance partagée via le registre: un même contenu n'est désérialisé qu'une fois par processus
+        self._active = self._build(self.model_path)
         return self
 
-    def _final_estimator(self):        
-        if hasattr(self.model, "steps"):
-            return self.model.steps[-1][1]
-        return self.model
+    def _build(self, path: str) -> ActiveModel:
+        artifact = model_registry.get(path, mmap=self.mmap)
+        model = artifact.model
+        return ActiveModel(
+            model=model,
+            version=artifact.version,
+            path=path,
+            compiled=self._compile(model) if self.compiled else None,
+            flat=self._flatten(model) if self.engine == "flat" else None,
+        )
+
+    def _compile(self, model) -> CompiledPreprocessor | None:
+        # Active le chemin compilé seulement si ses probabilités sont identiques au pipeline
+        try:
+            compiled, err = compile_pipeline(model)
+        except ValueError as e:
+            _logger.warning("Mode compilé indisponible (%s); utilisation du pipeline.", e)
+            return None
+        if err > PARITY_ATOL:
+            _logger.warning(
+                "Mode compilé désactivé: écart de parité %.3g > %.3g", err, PARITY_ATOL
+            )
+            return None
+        _logger.info("Mode compilé actif (écart de parité %.3g)", err)
+        return compiled
+
+    def _flatten(self, model) -> FlatGradientBoosting | None:
+        # Même principe: le moteur aplati ne remplace l'estimateur qu'à parité
+        try:
+            flat = FlatGradientBoosting.from_model(model)
+            err = flat.parity_error(_final_estimator(model))
+        except ValueError as e:
+            _logger.warning("Moteur d'arbres aplati indisponible (%s); utilisation de scikit-learn.", e)
+            return None
+        if err > PARITY_ATOL:
+            _logger.warning(
+                "Moteur d'arbres aplati désactivé: écart de parité %.3g > %.3g", err, PARITY_ATOL
+            )
+            return None
+        _logger.info("Moteur d'arbres aplati actif (%s arbres, écart %.3g)", flat.n_trees, err)
+        return flat
+
+    # --- rechargement à chaud ---
+
+    def reload(self, path: str | None = None, warmup_rows: int = 8) -> Dict[str, Any]:
+        """Charge un nouvel artefact, le valide puis le substitue au modèle servi.
 
-    
+        Le nouvel artefact est chargé et préchauffé à côté du modèle actif,
+        qui continue de répondre. S'il est valide, une seule affectation le
+        rend actif ; les requêtes déjà commencées finissent sur l'ancien.
+
+        Args:
+            path: Fichier à charger (défaut: `model_path`, relu sur disque).
+            warmup_rows: Nombre de lignes synthétiques prédites avant la bascule.
+
+        Returns:
+            Dictionnaire `{"swapped", "previous_version", "version"}`.
+
+        Raises:
+            ModelValidationError: Si l'artefact est illisible ou invalide ;
+                le modèle actif reste alors en place.
+        """
+        path = path or self.model_path
+        with self._reload_lock:
+            previous = self._active
+            candidate = None
+            try:
+                candidate = self._build(path)
+                if candidate.version == previous.version:
+                    self.model_path = path
+                    return {"swapped": False, "previous_version": previous.version, "version": previous.version}
+                self._validate(candidate, warmup_rows)
+            except Exception as e:
+                # toute erreur de chargement (EOFError, UnpicklingError, ...) ou de préchauffage refuse l'artefact
+                self.n_reload_failures += 1
+                self.last_reload_error = f"{type(e).__name__}: {e}"
+                _logger.error("Rechargement du modèle refusé (%s): %s", path, e)
+                # le registre ne garde pas un artefact refusé
+                if candidate is not None and candidate.version != previous.version:
+                    model_registry.release(candidate.version)
+                if not isinstance(e, ModelValidationError):
+                    raise ModelValidationError(f"{type(e).__name__}: {e}") from e
+                raise
+            self.model_path = path
+            self._active = candidate
+            self.n_reloads += 1
+            self.last_reload_error = None
+        if previous.version is not None:
+            model_registry.release(previous.version)
+        _logger.info("Modèle basculé: %s -> %s", previous.version, candidate.version)
+        return {"swapped": True, "previous_version": previous.version, "version": candidate.version}
+
+    def _validate(self, candidate: ActiveModel, warmup_rows: int) -> None:
+        # classes: la classe positive doit exister pour lire sa colonne de probabilités
+        classes = getattr(_final_estimator(candidate.model), "classes_", None)
+        if classes is None or len(classes) != 2:
+            raise ModelValidationError(f"Classifieur binaire attendu, classes={classes!r}")
+        _positive_index(candidate.model)
+        # préchauffage + seuil: des probabilités finies dans [0, 1], comparables à SEUIL_FIXE
+        p = self.predict_proba_batch(_warmup_payloads(candidate, warmup_rows), candidate)
+        if p.size == 0 or not np.all(np.isfinite(p)) or p.min() < 0.0 or p.max() > 1.0:
+            raise ModelValidationError("Probabilités de préchauffage invalides")
+        _logger.info(
+            "Modèle %s préchauffé sur %s lignes (%.1f%% au-dessus du seuil %s)",
+            candidate.version, p.size, 100.0 * float(np.mean(p >= SEUIL_FIXE)), SEUIL_FIXE,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "reloads": self.n_reloads,
+            "reload_failures": self.n_reload_failures,
+            "last_reload_error": self.last_reload_error,
+        }
+
+    # --- inférence ---
+
+    def transform(self, payloads: List[Dict[str, Any]], active: ActiveModel | None = None):
+        """Applique le préprocesseur seul (matrice d'entrée de l'estimateur final)."""
+        a = active or self.active()
+        if a.compiled is not None:
+            return a.compiled.transform(payloads)
+        X = pd.DataFrame(payloads)
+        if hasattr(a.model, "steps") and len(a.model.steps) > 1:
+            return a.model[:-1].transform(X)
+        return X
+
+    def proba_from_features(self, X, active: ActiveModel | None = None) -> np.ndarray:
+        """Probabilités de l'estimateur final sur une matrice déjà prétraitée."""
+        a = active or self.active()
+        estimator = a.flat if a.flat is not None else _final_estimator(a.model)
+        return estimator.predict_proba(X)
+
+    def predict_proba_encoded(self, X, active: ActiveModel | None = None) -> np.ndarray:
+        """Probabilités de la classe positive sur une matrice déjà prétraitée (cf. `transform`)."""
+        a = active or self.active()
+        p = self.proba_from_features(X, a)
+        return np.asarray(p[:, _positive_index(a.model)], dtype=float)
+
+    def _final_estimator(self):
+        return _final_estimator(self.model)
+
+    def _positive_index(self) -> int:
+        return _positive_index(self.model)
 
     def predict_proba(self, payload: Dict[str, Any]) -> float:
-        if self.model is None:
-            self.load()
-        X = pd.DataFrame([payload])
-        p = self.model.predict_proba(X)           
-        estimator = self._final_estimator()             
-        classes = getattr(estimator, "classes_", None)  
-        idx = np.where(classes == POSITIVE)[0]
-        if idx.size == 0:
-            raise ValueError(f"Classe positive {POSITIVE!r} absente parmi {classes!r}.")
-        return float(p[0, int(idx[0])])
+        return float(self.predict_proba_batch([payload])[0])
 
     def predict_label(self, payload: Dict[str, Any]) -> int:        
         proba_pos = self.predict_proba(payload)
         return int(proba_pos >= SEUIL_FIXE)
 
-model_service = ModelService()
+    def predict_proba_batch(self, payloads: List[Dict[str, Any]], active: ActiveModel | None = None) -> np.ndarray:
+        """Probabilités de la classe positive pour plusieurs payloads.
+
+        Un seul DataFrame multi-lignes et un seul appel `predict_proba` pour
+        tout le lot, au lieu d'un appel par ligne.
+        """
+        if not payloads:
+            return np.empty(0, dtype=float)
+        a = active or self.active()
+        if a.compiled is None and a.flat is None:
+            p = a.model.predict_proba(pd.DataFrame(payloads))
+        else:
+            p = self.proba_from_features(self.transform(payloads, a), a)
+        return np.asarray(p[:, _positive_index(a.model)], dtype=float)
+
+    def predict_label_batch(self, payloads: List[Dict[str, Any]]) -> np.ndarray:
+        return (np.asarray(self.predict_proba_batch(payloads), dtype=float) >= SEUIL_FIXE).astype(int)
+
+
+def _final_estimator(model):
+    if hasattr(model, "steps"):
+        return model.steps[-1][1]
+    return model
+
+
+def _positive_index(model) -> int:
+    classes = getattr(_final_estimator(model), "classes_", None)
+    idx = np.where(classes == POSITIVE)[0]
+    if idx.size == 0:
+        raise ValueError(f"Classe positive {POSITIVE!r} absente parmi {classes!r}.")
+    return int(idx[0])
+
+
+def _warmup_payloads(active: ActiveModel, n: int) -> List[Dict[str, Any]]:
+    # lignes synthétiques couvrant les modalités connues (pipeline) ou valeurs nulles (estimateur nu)
+    n = max(1, int(n))
+    try:
+        compiled = active.compiled or CompiledPreprocessor(active.model)
+        return compiled.sample_payloads(n)
+    except (ValueError, TypeError, AttributeError):
+        pass
+    estimator = active.model
+    names = getattr(estimator, "feature_names_in_", None)
+    if names is None:
+        names = [f"x{i}" for i in range(int(getattr(_final_estimator(estimator), "n_features_in_", 1)))]
+    return [{str(c): 0.0 for c in names} for _ in range(n)]
+
+
+model_service = ModelService(
+    compiled=get_settings().MODEL_COMPILED,
+    engine=get_settings().MODEL_ENGINE,
+    mmap=get_settings().MODEL_MMAP,
+)
@@ -0,0 +1,134 @@
+# app/prefork.py
+"""Lancement multi-workers avec état partagé en copy-on-write.
+
+    python -m app.prefork --workers 4 --port 7860
+
+Le processus maître prépare une seule fois la base, le modèle, les scores et
+le feature store (`prepare_shared_state`), gèle le ramasse-miettes puis
+`fork()` les workers uvicorn sur une socket commune. Les workers héritent des
+pages déjà chargées au lieu de relire chacun `model.pkl` : seules les pages
+modifiées après le fork deviennent privées. Un worker qui meurt est relancé ;
+`kill -USR1 <maître>` journalise la mémoire (RSS/PSS) de chaque worker.
+"""
+from __future__ import annotations
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict
+
+from app.core.memory import process_memory
+
+_logger = logging.getLogger(__name__)
+
+
+def _bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(sock: socket.socket, log_level: str) -> None:
+    import uvicorn
+
+    from app.db.session import engine
+    from app.main import app
+
+    # Les connexions ouvertes par le maître ne doivent pas être réutilisées après le fork
+    engine.dispose(close=False)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    config = uvicorn.Config(app, lifespan="on", log_level=log_level, proxy_headers=True)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def log_worker_memory(pids) -> None:
+    for pid in pids:
+        mem = process_memory(pid)
+        _logger.info(
+            "worker %s: rss=%.1f Mo pss=%.1f Mo partagé=%.1f Mo",
+            pid,
+            mem.get("rss_bytes", 0) / 2**20,
+            mem.get("pss_bytes", 0) / 2**20,
+            (mem.get("shared_clean_bytes", 0) + mem.get("shared_dirty_bytes", 0)) / 2**20,
+        )
+
+
+def serve(workers: int, host: str = "0.0.0.0", port: int = 7860, log_level: str = "info") -> int:
+    """Prépare l'état partagé, fork `workers` processus uvicorn et les supervise."""
+    from app.main import prepare_shared_state
+
+    prepare_shared_state(before_fork=True)
+    # Objets existants exclus des collectes: le GC n'écrit plus dans leurs en-têtes,
+    # ce qui évite de dupliquer les pages partagées dans chaque worker
+    gc.freeze()
+    sock = _bind_socket(host, port)
+    children: Dict[int, int] = {}
+    stopping = False
+
+    def spawn(slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _run_worker(sock, log_level)
+            except BaseException:
+                _logger.exception("worker %s arrêté sur erreur", os.getpid())
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = slot
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    # kill -USR1 <maître>: mémoire résidente de chaque worker dans les logs
+    signal.signal(signal.SIGUSR1, lambda signum, frame: log_worker_memory(list(children)))
+    for slot in range(workers):
+        spawn(slot)
+    _logger.info("%s workers démarrés (maître %s) sur %s:%s", workers, os.getpid(), host, port)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        slot = children.pop(pid, None)
+        if slot is None or stopping:
+            continue
+        _logger.warning("worker %s terminé (status=%s): relance", pid, status)
+        time.sleep(0.5)
+        spawn(slot)
+    sock.close()
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="API Futurisys en mode multi-workers (prefork)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=7860)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+    return serve(args.workers, args.host, args.port, args.log_level)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,11 @@
 CREATE SCHEMA IF NOT EXISTS mart;
 
--- 1) Drop dans le bon ordre (enfants -> parent)
-DROP VIEW IF EXISTS mart.employee_features_input_by_id;
-DROP VIEW IF EXISTS mart.employee_features_input;
+-- 1) Extraits nettoyés et joints dans une table de transit. scripts/create_db.py la recopie ensuite
+--    dans mart.employee_features (rechargement complet, ou ingestion delta par id_employee avec
+--    ETL_DELTA: app/etl/delta.py) puis la supprime.
+DROP TABLE IF EXISTS mart.employee_features_stage;
 
-
-DROP TABLE IF EXISTS mart.employee_features;
-
-
-
-CREATE  TABLE mart.employee_features AS
+CREATE TABLE mart.employee_features_stage AS
 SELECT
     s.id_employee,
     so.a_quitte_l_entreprise,
@@ -45,8 +41,40 @@ SELECT
     so.domaine_etude,
     so.frequence_deplacement,
 
-    
     s.revenu_mensuel
 FROM raw.sirh_clean     AS s
 LEFT JOIN raw.eval_clean     AS e  ON e.id_employee = s.id_employee
 LEFT JOIN raw.sondage_clean  AS so ON so.id_employee = s.id_employee;
+
+
+CREATE INDEX ix_employee_features_stage_id ON mart.employee_features_stage (id_employee);
+
+-- 2) Table persistante, clé primaire sur id_employee (upserts de l'ingestion delta) et empreinte
+--    de ligne row_hash. Une ancienne table sans clé primaire (CREATE TABLE AS) est remplacée une fois.
+DO $$
+BEGIN
+    IF to_regclass('mart.employee_features') IS NOT NULL AND NOT EXISTS (
+        SELECT 1 FROM pg_constraint
+        WHERE conrelid = 'mart.employee_features'::regclass AND contype = 'p'
+    ) THEN
+        DROP TABLE mart.employee_features CASCADE;
+    END IF;
+    IF to_regclass('mart.employee_features') IS NULL THEN
+        CREATE TABLE mart.employee_features (LIKE mart.employee_features_stage);
+        ALTER TABLE mart.employee_features
+            ADD PRIMARY KEY (id_employee),
+            ADD COLUMN row_hash VARCHAR(16);
+    END IF;
+END $$;
+
+-- revenu_mensuel (hors modèle ORM) recopié depuis la table de transit par scripts/create_db.py
+ALTER TABLE mart.employee_features ADD COLUMN IF NOT EXISTS revenu_mensuel NUMERIC;
+
+-- 3) Manifeste: l'entrée employee_features porte le nombre de lignes et l'horodatage de la dernière
+--    écriture (mark_features_written, app/etl/delta.py), relu par le feature store de l'API.
+CREATE TABLE IF NOT EXISTS mart.etl_manifest (
+    name        VARCHAR PRIMARY KEY,
+    digest      VARCHAR(64) NOT NULL,
+    rows        INTEGER,
+    loaded_at   TIMESTAMPTZ NOT NULL DEFAULT now()
+);
@@ -18,12 +18,13 @@ CREATE TABLE IF NOT EXISTS ml_logs.prediction_log (
     latency_ms      INTEGER,                            
     status          TEXT        NOT NULL DEFAULT 'OK',  
     payload         JSONB       NOT NULL,               
-    output          JSONB       NOT NULL                
+    output          JSONB       NOT NULL,
+    -- cible de l'upsert INSERT ... ON CONFLICT (employee_id) DO UPDATE
+    CONSTRAINT uq_prediction_log_employee_id UNIQUE (employee_id)
 );
 
 -- Index: requêtes fréquentes
 CREATE INDEX IF NOT EXISTS ix_prediction_created_at       ON ml_logs.prediction_log (created_at);
-CREATE INDEX IF NOT EXISTS ix_prediction_employee         ON ml_logs.prediction_log (employee_id);
 CREATE INDEX IF NOT EXISTS gin_prediction_payload         ON ml_logs.prediction_log USING gin (payload jsonb_path_ops);
 CREATE INDEX IF NOT EXISTS gin_prediction_output          ON ml_logs.prediction_log USING gin (output  jsonb_path_ops);
 
@@ -0,0 +1,18 @@
+-- 06_mart_employee_scores.sql
+-- Scores matérialisés par employé (lus par /predict/by-id), reconstruits après ETL ou changement de modèle
+
+CREATE SCHEMA IF NOT EXISTS mart;
+
+CREATE TABLE IF NOT EXISTS mart.employee_scores (
+    id_employee             INTEGER          PRIMARY KEY,
+    proba                   DOUBLE PRECISION NOT NULL,
+    pred_quitte_entreprise  TEXT             NOT NULL,
+    model_version           TEXT,
+    scored_at               TIMESTAMPTZ      NOT NULL DEFAULT now(),
+    features_hash           VARCHAR(16)
+);
+
+-- bases créées avant le re-scoring incrémental
+ALTER TABLE mart.employee_scores ADD COLUMN IF NOT EXISTS features_hash VARCHAR(16);
+
+CREATE INDEX IF NOT EXISTS ix_employee_scores_model_version ON mart.employee_scores (model_version);
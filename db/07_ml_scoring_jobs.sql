@@ -0,0 +1,37 @@
+-- 07_ml_scoring_jobs.sql
+-- Jobs de scoring asynchrones (/jobs) et leurs résultats ; conservés entre deux initialisations
+
+CREATE SCHEMA IF NOT EXISTS ml_logs;
+
+CREATE TABLE IF NOT EXISTS ml_logs.scoring_jobs (
+    id               VARCHAR(32)      PRIMARY KEY,
+    created_at       TIMESTAMPTZ      NOT NULL DEFAULT now(),
+    source           TEXT             NOT NULL,
+    params           JSONB            NOT NULL,
+    status           TEXT             NOT NULL DEFAULT 'pending',
+    total            INTEGER,
+    rows_scored      INTEGER          NOT NULL DEFAULT 0,
+    rows_skipped     INTEGER          NOT NULL DEFAULT 0,
+    chunks_done      INTEGER          NOT NULL DEFAULT 0,
+    cursor           INTEGER,
+    rows_per_second  DOUBLE PRECISION,
+    model_version    TEXT,
+    owner            TEXT,
+    attempts         INTEGER          NOT NULL DEFAULT 0,
+    heartbeat_at     TIMESTAMPTZ,
+    started_at       TIMESTAMPTZ,
+    finished_at      TIMESTAMPTZ,
+    error            TEXT
+);
+
+CREATE INDEX IF NOT EXISTS ix_ml_logs_scoring_jobs_status ON ml_logs.scoring_jobs (status);
+
+CREATE TABLE IF NOT EXISTS ml_logs.scoring_job_results (
+    job_id                  VARCHAR(32)      NOT NULL REFERENCES ml_logs.scoring_jobs (id) ON DELETE CASCADE,
+    seq                     INTEGER          NOT NULL,
+    id_employee             BIGINT           NOT NULL,
+    proba                   DOUBLE PRECISION NOT NULL,
+    pred_quitte_entreprise  TEXT             NOT NULL,
+    model_version           TEXT,
+    PRIMARY KEY (job_id, seq)
+);
@@ -1,8 +1,14 @@
+import argparse
+import json
 import os
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Tuple
 
-import numpy as np
 import pandas as pd
 
 try:
@@ -10,7 +16,7 @@ try:
 except ImportError:
     psycopg = None  # Optional for SQLite-only usage
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, delete, func, insert, select, text
 import logging
 
 # Module logger (configured by the app's logging.basicConfig)
@@ -20,10 +26,33 @@ logger = logging.getLogger(__name__)
 try:
     from app.core.config import get_settings
     from app.db.base import Base
-    from app.db import models  # noqa: F401  (importe les modèles pour la metadata)
+    from app.db import models  # importe les modèles pour la metadata (et le manifeste ETL)
+    from app.db.schema import add_missing_columns
 except Exception:  # pragma: no cover
     get_settings = None
     Base = None
+    models = None
+    add_missing_columns = None
+
+from app.etl.cleaning import (
+    ETL_SCHEMA_VERSION,
+    FEATURE_TABLE_COLS,
+    add_log_features,
+    clean_eval,
+    clean_sirh,
+    clean_sondage,
+    merge_sources,
+    to_employee_features,
+)
+from app.etl.delta import (
+    MANIFEST_FEATURES_KEY,
+    DeltaResult,
+    apply_delta,
+    mark_features_written,
+    row_hash,
+)
+from app.etl.streaming import StreamingETL
+from app.ml.registry import file_digest
 
 
 HERE = Path(__file__).resolve().parent
@@ -43,8 +72,20 @@ FILES = [
     "03_mart_employee.sql",
     "04_mart_create_view.sql",
     "05_ml_logging.sql",
+    "06_mart_employee_scores.sql",
+    "07_ml_scoring_jobs.sql",
 ]
 
+# Table de transit remplie par db/03_mart_employee.sql, recopiée dans mart.employee_features
+PG_STAGE_TABLE = "mart.employee_features_stage"
+# Colonnes de mart.employee_features hors modèle ORM, recopiées telles quelles côté serveur
+PG_EXTRA_COLS = ("revenu_mensuel",)
+
+# PRAGMA SQLite du chargement en masse (ETL_BULK_LOAD), remis à leur valeur précédente ensuite:
+# journal de rollback en mémoire, pas de fsync, cache de 256 Mo. Appliqués à la base de l'application:
+# un arrêt brutal du processus ou de la machine pendant le chargement peut la corrompre (logs compris).
+BULK_PRAGMAS = {"journal_mode": "MEMORY", "synchronous": "OFF", "cache_size": "-262144"}
+
 
 def lancesql(conn, sql_text: str):
     with conn.cursor() as cur:
@@ -75,19 +116,178 @@ def _sqlite_engine():
     return create_engine(url, future=True, connect_args=connect_args)
 
 
-def _upper_strip_series(s: pd.Series) -> pd.Series:
-    return s.astype(str).str.strip().str.upper().replace({"": None})
+def _read_manifest(conn) -> Dict[str, Tuple[str, Optional[int]]]:
+    rows = conn.execute(select(models.EtlManifest.name, models.EtlManifest.digest, models.EtlManifest.rows)).all()
+    return {r.name: (r.digest, r.rows) for r in rows}
+
+
+@contextmanager
+def _sqlite_pragmas(conn, pragmas: Dict[str, str]):
+    """Applique des PRAGMA hors transaction et restaure les valeurs précédentes à la sortie."""
+    previous = {name: conn.exec_driver_sql(f"PRAGMA {name}").scalar() for name in pragmas}
+    for name, value in pragmas.items():
+        conn.exec_driver_sql(f"PRAGMA {name}={value}")
+    conn.commit()
+    try:
+        yield previous
+    finally:
+        if conn.in_transaction():
+            conn.rollback()
+        for name, value in previous.items():
+            conn.exec_driver_sql(f"PRAGMA {name}={value}")
+        conn.commit()
+
+
+def _insert_features(conn, df: pd.DataFrame) -> None:
+    df.to_sql("employee_features", con=conn, if_exists="append", index=False)
+
+
+def _bulk_insert_features(conn, df: pd.DataFrame, batch_size: int) -> None:
+    # executemany par lots de tuples Python, lignes dans l'ordre de la clé primaire (ajouts en fin de B-tree)
+    cols = list(df.columns)
+    sql = 'INSERT INTO employee_features ({}) VALUES ({})'.format(
+        ", ".join(f'"{c}"' for c in cols), ", ".join("?" * len(cols))
+    )
+    if "id_employee" in df.columns:
+        df = df.sort_values("id_employee", kind="stable")
+    for start in range(0, len(df), batch_size):
+        batch = df.iloc[start:start + batch_size].to_numpy(dtype=object).tolist()
+        conn.exec_driver_sql(sql, list(map(tuple, batch)))
+
+
+def _read_and_clean(path: Path, cleaner: Callable[[pd.DataFrame], pd.DataFrame]) -> Tuple[pd.DataFrame, float, float]:
+    # lecture puis nettoyage d'un extrait (indépendant des deux autres jusqu'aux jointures)
+    t0 = time.perf_counter()
+    df = pd.read_csv(path, encoding="utf-8")
+    t1 = time.perf_counter()
+    cleaner(df)
+    return df, t1 - t0, time.perf_counter() - t1
+
+
+def _load_features_in_memory(
+    sirh_path: Path, eval_path: Path, sond_path: Path, workers: int = 1
+) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """Chaîne ETL sur les fichiers entiers: `employee_features` et lignes lues par extrait.
+
+    Avec `workers > 1`, les trois extraits sont lus et nettoyés en parallèle
+    (threads : le parseur CSV de pandas libère le GIL) puis joints. La durée
+    de chaque étape est journalisée.
+    """
+    # Chargement CSV + nettoyage par extrait (app/etl/cleaning.py, partagé avec le scoring de fichiers)
+    logger.info("[Initialisation_SQLITE] Reading CSV files from %s (workers=%s)", sirh_path.parent, workers)
+    sources = ((sirh_path, clean_sirh), (eval_path, clean_eval), (sond_path, clean_sondage))
+    t0 = time.perf_counter()
+    if workers > 1:
+        with ThreadPoolExecutor(min(workers, len(sources)), thread_name_prefix="etl-read") as pool:
+            results = list(pool.map(lambda src: _read_and_clean(*src), sources))
+    else:
+        results = [_read_and_clean(*src) for src in sources]
+    timings = {"sources": time.perf_counter() - t0}
+    for (path, _), (_, read_s, clean_s) in zip(sources, results):
+        timings[f"read {path.name}"] = read_s
+        timings[f"clean {path.name}"] = clean_s
+    sirh, evaldf, sond = (df for df, _, _ in results)
+    logger.info(
+        "[Initialisation_SQLITE] Loaded CSVs: SIRH=%s rows, EVAL=%s rows, SOND=%s rows",
+        len(sirh), len(evaldf), len(sond)
+    )
+    rows = {sirh_path.name: len(sirh), eval_path.name: len(evaldf), sond_path.name: len(sond)}
+
+    # Jointures
+    t0 = time.perf_counter()
+    df = merge_sources(sirh, evaldf, sond)
+    timings["merge"] = time.perf_counter() - t0
+    try:
+        logger.info(
+            "[Initialisation_SQLITE] After merge: rows=%s, cols=%s, unique_ids=%s",
+            len(df), df.shape[1], df["id_employee"].nunique() if "id_employee" in df.columns else "N/A",
+        )
+    except Exception:
+        pass
 
+    # Features dérivées (logs naturels > 0)
+    t0 = time.perf_counter()
+    add_log_features(df)
 
-def lancesqlite_Initialisation():
+    missing_cols = [c for c in FEATURE_TABLE_COLS if c not in df.columns]
+    logger.info(
+        "[Initialisation_SQLITE] Columns present=%s/%s; missing=%s",
+        len(FEATURE_TABLE_COLS) - len(missing_cols), len(FEATURE_TABLE_COLS), missing_cols,
+    )
+    # Conformité NOT NULL du schéma ORM SQLite (id non nul, numériques à 0, catégorielles à "")
+    df_out = to_employee_features(df)
+    timings["features"] = time.perf_counter() - t0
+    logger.info(
+        "[Initialisation_SQLITE] Stage times: %s",
+        ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()),
+    )
+    return df_out, rows
+
+
+def lancesqlite_Initialisation(
+    force: bool = False,
+    stream: Optional[bool] = None,
+    chunk_size: Optional[int] = None,
+    csv_engine: Optional[str] = None,
+    bulk: Optional[bool] = None,
+    delta: Optional[bool] = None,
+    on_changes: Optional[Callable[[DeltaResult], None]] = None,
+    read_workers: Optional[int] = None,
+) -> bool:
+    """Charge les extraits CSV dans `employee_features` (SQLite) quand leur contenu a changé.
+
+    Le manifeste `etl_manifest` garde l'empreinte SHA-256 de chaque extrait et
+    la version du schéma (`ETL_SCHEMA_VERSION`) du dernier chargement réussi.
+    Si rien n'a changé et que la table contient encore le nombre de lignes
+    chargé, aucun CSV n'est relu. Sinon seule `employee_features`, l'unique
+    table dérivée des extraits, est rechargée avec le manifeste dans une même
+    transaction : les logs de prédiction, les jobs et les scores ne sont
+    jamais supprimés.
+
+    Par défaut (`ETL_STREAMING=false`) les trois extraits sont chargés en
+    mémoire ; en mode flux (`StreamingETL`, `app/etl/streaming.py`) ils sont
+    lus et écrits par blocs de `ETL_CHUNK_SIZE` lignes, pour une mémoire
+    constante quel que soit le volume. En mémoire, les trois extraits sont lus
+    et nettoyés en parallèle par `ETL_READ_WORKERS` threads.
+
+    `ETL_BULK_LOAD` remplace `DataFrame.to_sql` par des `executemany` de
+    `ETL_BULK_BATCH_SIZE` lignes, triées par `id_employee` : la clé primaire
+    est le seul index de `employee_features`, alimenté par ajouts en fin
+    d'arbre. `BULK_PRAGMAS` (journal en mémoire, sans fsync) s'applique le
+    temps du chargement, à la base de l'application elle-même : une erreur
+    Python annule toujours la transaction, mais un arrêt brutal du processus
+    ou de la machine en cours de chargement peut corrompre le fichier, logs
+    et jobs compris. Le débit d'écriture (lignes/s) est journalisé dans les
+    deux cas.
+
+    En mode delta (`ETL_DELTA`), les lignes produites sont comparées à la
+    table par leur empreinte (`row_hash`) et seules les insertions, mises à
+    jour et suppressions sont appliquées ; leurs identifiants sont transmis à
+    `on_changes` pour un recalcul sélectif des scores.
+
+    Args:
+        force: Recharge même si le manifeste est à jour.
+        stream: Force le mode flux (True) ou en mémoire (False) ; défaut `ETL_STREAMING`.
+        chunk_size: Lignes par bloc en mode flux ; défaut `ETL_CHUNK_SIZE`.
+        csv_engine: Lecteur CSV du mode flux, "pandas" ou "pyarrow" ; défaut `ETL_CSV_ENGINE`.
+        bulk: Chargement en masse (True) ou `to_sql` (False) ; défaut `ETL_BULK_LOAD`.
+        delta: Ingestion incrémentale (`apply_delta`) au lieu d'un rechargement
+            complet, si la table contient déjà des lignes ; défaut `ETL_DELTA`.
+        on_changes: Appelée après le commit avec les identifiants insérés, mis
+            à jour et supprimés (`DeltaResult`, `full=True` pour un rechargement complet).
+        read_workers: Threads de lecture et nettoyage des extraits en mode
+            mémoire (1 = séquentiel) ; défaut `ETL_READ_WORKERS`.
+
+    Returns:
+        Vrai si `employee_features` a été rechargée.
+    """
     logger.info("[Initialisation_SQLITE] Starting SQLite initialization")
     logger.info("[Initialisation_SQLITE] IMPORTS_DIR = %s", IMPORTS_DIR)
-    
-    # Check if CSV files exist; if not, create dummy data
+
     sirh_path = IMPORTS_DIR / "extrait_sirh.csv"
     eval_path = IMPORTS_DIR / "extrait_eval.csv"
     sond_path = IMPORTS_DIR / "extrait_sondage.csv"
-    
+
     logger.info(
         "[Initialisation_SQLITE] Checking CSV presence: sirh=%s(%s), eval=%s(%s), sond=%s(%s)",
         sirh_path,
@@ -97,247 +297,186 @@ def lancesqlite_Initialisation():
         sond_path,
         sond_path.exists(),
     )
-    csv_exists = sirh_path.exists() and eval_path.exists() and sond_path.exists()
-
-    if not csv_exists:
+    if not (sirh_path.exists() and eval_path.exists() and sond_path.exists()):
         msg = (
             f"[Initialisation_SQLITE] CSV files not found. Expected: "
             f"{sirh_path.name}, {eval_path.name}, {sond_path.name} in {IMPORTS_DIR}"
         )
         logger.error(msg)
         raise FileNotFoundError(msg)
-    else:
-        if not IMPORTS_DIR.exists():
-            raise SystemExit(f"Dossier imports introuvable: {IMPORTS_DIR}")
-        for p in (sirh_path, eval_path, sond_path):
-            if not p.exists():
-                raise SystemExit(f"Fichier manquant: {p}")
-        # Chargement CSV
-        logger.info("[Initialisation_SQLITE] Reading CSV files from %s", IMPORTS_DIR)
-        sirh = pd.read_csv(sirh_path, encoding="utf-8")
-        evaldf = pd.read_csv(eval_path, encoding="utf-8")
-        sond = pd.read_csv(sond_path, encoding="utf-8")
-        logger.info(
-            "[Initialisation_SQLITE] Loaded CSVs: SIRH=%s rows, EVAL=%s rows, SOND=%s rows",
-            len(sirh), len(evaldf), len(sond)
-        )
 
-    # SIRH: numériques + catégorielles en majuscules
-    for col in [
-        "id_employee",
-        "age",
-        "revenu_mensuel",
-        "nombre_experiences_precedentes",
-        "nombre_heures_travailless",
-        "annee_experience_totale",
-        "annees_dans_l_entreprise",
-        "annees_dans_le_poste_actuel",
-    ]:
-        if col in sirh.columns:
-            sirh[col] = pd.to_numeric(sirh[col], errors="coerce")
-    for col in ["genre", "statut_marital", "departement", "poste"]:
-        if col in sirh.columns:
-            sirh[col] = _upper_strip_series(sirh[col])
-
-    # EVAL: id_employee depuis eval_number + numériques + heure_supplementaires
-    if "eval_number" in evaldf.columns:
-        tmp = (
-            evaldf["eval_number"].astype(str).str.upper().str.replace(" ", "")
-            .str.replace(r"^\D+", "", regex=True)
-        )
-        evaldf["id_employee"] = pd.to_numeric(tmp, errors="coerce")
-    for col in [
-        "satisfaction_employee_environnement",
-        "note_evaluation_precedente",
-        "niveau_hierarchique_poste",
-        "satisfaction_employee_nature_travail",
-        "satisfaction_employee_equipe",
-        "satisfaction_employee_equilibre_pro_perso",
-        "note_evaluation_actuelle",
-        "augementation_salaire_precedente",
-    ]:
-        if col in evaldf.columns:
-            if col == "augementation_salaire_precedente":
-                evaldf[col] = (
-                    evaldf[col]
-                    .astype(str)
-                    .str.strip()
-                    .str.replace("%", "")
-                    .str.replace(",", ".")
-                )
-            evaldf[col] = pd.to_numeric(evaldf[col], errors="coerce")
-    if "heure_supplementaires" in evaldf.columns:
-        evaldf["heure_supplementaires"] = _upper_strip_series(evaldf["heure_supplementaires"])
-
-    # SONDAGE: id depuis code_sondage + numériques + catégorielles
-    if "code_sondage" in sond.columns:
-        sond["id_employee"] = pd.to_numeric(
-            sond["code_sondage"].astype(str).str.replace(" ", ""), errors="coerce"
-        )
-    for col in [
-        "a_quitte_l_entreprise",
-        "domaine_etude",
-        "ayant_enfants",
-        "frequence_deplacement",
-    ]:
-        if col in sond.columns:
-            sond[col] = _upper_strip_series(sond[col])
-    for col in [
-        "nombre_participation_pee",
-        "nb_formations_suivies",
-        "nombre_employee_sous_responsabilite",
-        "distance_domicile_travail",
-        "niveau_education",
-        "annees_depuis_la_derniere_promotion",
-        "annes_sous_responsable_actuel",
-    ]:
-        if col in sond.columns:
-            sond[col] = pd.to_numeric(sond[col], errors="coerce")
-
-    # Jointures
-    df = sirh.merge(evaldf, on="id_employee", how="left").merge(sond, on="id_employee", how="left")
-    try:
-        logger.info(
-            "[Initialisation_SQLITE] After merge: rows=%s, cols=%s, unique_ids=%s",
-            len(df), df.shape[1], df["id_employee"].nunique() if "id_employee" in df.columns else "N/A",
-        )
-    except Exception:
-        pass
-
-    # Features dérivées (logs naturels > 0)
-    def _log_pos(series: pd.Series) -> pd.Series:
-        s = pd.to_numeric(series, errors="coerce")
-        s = s.mask(~(s > 0))
-        return np.log(s)
-
-    if "annees_dans_l_entreprise" in df.columns:
-        df["anciennete_log"] = _log_pos(df["annees_dans_l_entreprise"])
-    else:
-        df["anciennete_log"] = np.nan
-    if "annee_experience_totale" in df.columns:
-        df["annee_experience_totale_log"] = _log_pos(df["annee_experience_totale"])
-    else:
-        df["annee_experience_totale_log"] = np.nan
-
-    # Colonnes cibles selon le modèle ORM EmployeeFeatures
-    cols = [
-        "id_employee",
-        "a_quitte_l_entreprise",
-        "age",
-        "nombre_experiences_precedentes",
-        "annees_dans_le_poste_actuel",
-        "satisfaction_employee_environnement",
-        "note_evaluation_precedente",
-        "niveau_hierarchique_poste",
-        "satisfaction_employee_nature_travail",
-        "satisfaction_employee_equipe",
-        "satisfaction_employee_equilibre_pro_perso",
-        "note_evaluation_actuelle",
-        "augementation_salaire_precedente",
-        "nombre_participation_pee",
-        "nb_formations_suivies",
-        "distance_domicile_travail",
-        "niveau_education",
-        "annees_depuis_la_derniere_promotion",
-        "annes_sous_responsable_actuel",
-        "anciennete_log",
-        "annee_experience_totale_log",
-        "genre",
-        "statut_marital",
-        "departement",
-        "poste",
-        "heure_supplementaires",
-        "domaine_etude",
-        "frequence_deplacement",
-    ]
-    cols_presentes = [c for c in cols if c in df.columns]
-    df_out = df[cols_presentes].copy()
-    missing_cols = [c for c in cols if c not in cols_presentes]
+    engine = _sqlite_engine()
+    assert Base is not None
+    # Tables absentes créées, tables existantes (logs compris) conservées telles quelles
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine)
+
+    # Empreintes courantes: une par extrait + version du schéma de employee_features
+    digests = {p.name: file_digest(str(p)) for p in (sirh_path, eval_path, sond_path)}
+    digests[MANIFEST_FEATURES_KEY] = f"schema-v{ETL_SCHEMA_VERSION}"
+    with engine.connect() as conn:
+        manifest = _read_manifest(conn)
+        n_rows = conn.execute(select(func.count()).select_from(models.EmployeeFeatures)).scalar_one()
+    changed = [name for name, digest in digests.items() if manifest.get(name, (None, None))[0] != digest]
+    loaded_rows = manifest.get(MANIFEST_FEATURES_KEY, (None, None))[1]
+    if not force and not changed and n_rows == loaded_rows:
+        logger.info("[Initialisation_SQLITE] Extraits inchangés (%s lignes): chargement ignoré", n_rows)
+        return False
     logger.info(
-        "[Initialisation_SQLITE] Columns present=%s/%s; missing=%s",
-        len(cols_presentes), len(cols), missing_cols,
+        "[Initialisation_SQLITE] Rechargement de employee_features: modifiés=%s, lignes=%s/%s, force=%s",
+        changed, n_rows, loaded_rows, force,
     )
 
-    # Assure la conformité NOT NULL du schéma ORM SQLite
-    # 1) id_employee non nul et entier
-    if "id_employee" in df_out.columns:
-        df_out = df_out[pd.notna(df_out["id_employee"])].copy()
-        df_out["id_employee"] = pd.to_numeric(df_out["id_employee"], errors="coerce").fillna(0).astype(int)
-
-    # 2) Remplissage des numériques manquants par 0
-    num_cols = [
-        "age",
-        "nombre_experiences_precedentes",
-        "annees_dans_le_poste_actuel",
-        "satisfaction_employee_environnement",
-        "note_evaluation_precedente",
-        "niveau_hierarchique_poste",
-        "satisfaction_employee_nature_travail",
-        "satisfaction_employee_equipe",
-        "satisfaction_employee_equilibre_pro_perso",
-        "note_evaluation_actuelle",
-        "augementation_salaire_precedente",
-        "nombre_participation_pee",
-        "nb_formations_suivies",
-        "distance_domicile_travail",
-        "niveau_education",
-        "annees_depuis_la_derniere_promotion",
-        "annes_sous_responsable_actuel",
-        "anciennete_log",
-        "annee_experience_totale_log",
-    ]
-    for c in num_cols:
-        if c in df_out.columns:
-            df_out[c] = pd.to_numeric(df_out[c], errors="coerce").fillna(0)
-
-    # 3) Remplissage des catégorielles manquantes par chaîne vide (sera normalisée à None côté API)
-    cat_cols = [
-        "a_quitte_l_entreprise",
-        "genre",
-        "statut_marital",
-        "departement",
-        "poste",
-        "heure_supplementaires",
-        "domaine_etude",
-        "frequence_deplacement",
-    ]
-    for c in cat_cols:
-        if c in df_out.columns:
-            df_out[c] = df_out[c].astype(object)
-            df_out[c] = df_out[c].where(pd.notna(df_out[c]), "")
-
-    # Écriture en base
-    engine = _sqlite_engine()
-    assert Base is not None
-    # Recrée proprement les tables de logs pour garantir un PK auto-incrément compatible SQLite
+    t0 = time.perf_counter()
+    settings = get_settings()
+    stream = settings.ETL_STREAMING if stream is None else stream
+    if stream:
+        # par blocs: mémoire indépendante du volume, même résultat que la chaîne en mémoire
+        etl = StreamingETL(
+            sirh_path, eval_path, sond_path,
+            chunk_size=chunk_size or settings.ETL_CHUNK_SIZE,
+            csv_engine=csv_engine or settings.ETL_CSV_ENGINE,
+        )
+        chunks, rows = etl, etl.rows
+    else:
+        workers = settings.ETL_READ_WORKERS if read_workers is None else read_workers
+        df_out, rows = _load_features_in_memory(sirh_path, eval_path, sond_path, workers=max(1, int(workers)))
+        chunks = [df_out]
+
+    # Écriture en base: table et manifeste dans la même transaction (une exception laisse l'état
+    # précédent; avec ETL_BULK_LOAD, pas un arrêt brutal: voir BULK_PRAGMAS)
+    bulk = settings.ETL_BULK_LOAD if bulk is None else bulk
+    # delta seulement sur une table déjà remplie: le premier chargement reste complet
+    delta = (settings.ETL_DELTA if delta is None else delta) and n_rows > 0
+    loaded_at = datetime.now(timezone.utc)
+    write_seconds, n_out = 0.0, 0
     try:
-        with engine.begin() as conn:
-            logger.info("[Initialisation_SQLITE] Dropping log tables if they exist")
-            conn.execute(text("DROP TABLE IF EXISTS prediction_log"))
-            conn.execute(text("DROP TABLE IF EXISTS error_log"))
-        logger.info("[Initialisation_SQLITE] Creating all tables via SQLAlchemy metadata")
-        Base.metadata.create_all(bind=engine)
-        with engine.begin() as conn:
-            logger.info("[Initialisation_SQLITE] Cleaning employee_features table")
-            conn.execute(text("DELETE FROM employee_features"))
-        logger.info("[Initialisation_SQLITE] Inserting %s rows into employee_features", len(df_out))
-        df_out.to_sql("employee_features", con=engine, if_exists="append", index=False)
-        has_12 = False
-        try:
-            if "id_employee" in df_out.columns:
-                has_12 = bool((df_out["id_employee"] == 12).any())
-        except Exception:
-            pass
+        with engine.connect() as conn, (_sqlite_pragmas(conn, BULK_PRAGMAS) if bulk else nullcontext()):
+            with conn.begin():
+                if delta:
+                    tw = time.perf_counter()
+                    changes = apply_delta(conn, chunks)
+                    write_seconds = time.perf_counter() - tw
+                    n_out = conn.execute(select(func.count()).select_from(models.EmployeeFeatures)).scalar_one()
+                    chunks = []
+                else:
+                    changes = DeltaResult(full=True)
+                    conn.execute(delete(models.EmployeeFeatures))
+                for chunk in chunks:
+                    chunk = chunk.assign(row_hash=row_hash(chunk))
+                    tw = time.perf_counter()
+                    if bulk:
+                        _bulk_insert_features(conn, chunk, settings.ETL_BULK_BATCH_SIZE)
+                    else:
+                        _insert_features(conn, chunk)
+                    write_seconds += time.perf_counter() - tw
+                    n_out += len(chunk)
+                rows[MANIFEST_FEATURES_KEY] = n_out
+                conn.execute(delete(models.EtlManifest))
+                conn.execute(
+                    insert(models.EtlManifest),
+                    [{"name": n, "digest": d, "rows": rows[n], "loaded_at": loaded_at} for n, d in digests.items()],
+                )
+        total = time.perf_counter() - t0
         logger.info(
-            "[Initialisation_SQLITE] Done. Inserted rows=%s; id_employee=12 present=%s",
-            len(df_out), has_12,
+            "[Initialisation_SQLITE] Done. rows=%s: etl %.2fs, write %.2fs (%.0f rows/s), total %.2fs (bulk=%s, streaming=%s, changes=%s)",
+            n_out, total - write_seconds, write_seconds, n_out / max(write_seconds, 1e-9), total, bulk, stream,
+            changes.summary(),
         )
     except Exception:
         logger.exception("[Initialisation_SQLITE] SQLite initialization failed")
         raise
-
-
-def lancepostgres_Initialisation():
+    if on_changes is not None:
+        on_changes(changes)
+    return True
+
+
+def _stage_chunks(conn, stage_table: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    # table de transit lue par pages (pagination par clé sur id_employee), colonnes de employee_features
+    cols = ", ".join(FEATURE_TABLE_COLS)
+    after = None
+    while True:
+        where = "id_employee IS NOT NULL" if after is None else "id_employee > :after"
+        df = pd.read_sql(
+            text(f"SELECT {cols} FROM {stage_table} WHERE {where} ORDER BY id_employee LIMIT :n"),
+            conn,
+            params={"after": after, "n": chunk_size},
+        )
+        if df.empty:
+            return
+        after = int(df["id_employee"].iloc[-1])
+        yield df
+
+
+def _copy_extra_cols(conn, stage_table: str, extra_cols: Tuple[str, ...]) -> None:
+    # colonnes hors ORM mises à jour côté serveur, seulement là où elles diffèrent de la table de transit
+    target = models.EmployeeFeatures.__table__.fullname
+    distinct = "IS DISTINCT FROM" if conn.dialect.name == "postgresql" else "IS NOT"
+    for c in extra_cols:
+        value = f"(SELECT s.{c} FROM {stage_table} AS s WHERE s.id_employee = {target}.id_employee)"
+        conn.exec_driver_sql(f"UPDATE {target} SET {c} = {value} WHERE {c} {distinct} {value}")
+
+
+def sync_features_from_stage(
+    engine, stage_table: str, delta: bool, chunk_size: int, extra_cols: Tuple[str, ...] = ()
+) -> DeltaResult:
+    """Recopie la table de transit du chemin PostgreSQL dans `employee_features`, puis la supprime.
+
+    Sans `delta`, la table est vidée puis remplie par un seul
+    `INSERT ... SELECT` exécuté par le serveur, sans `row_hash` (une
+    ingestion delta ultérieure réécrit alors une fois toutes les lignes).
+    Avec `delta` et une table déjà remplie, seules les lignes insérées,
+    modifiées (`row_hash`) ou supprimées sont écrites (`apply_delta`) ; avec
+    `delta` et une table vide, les pages sont insérées avec leur `row_hash`.
+    Les colonnes `extra_cols`, absentes du modèle ORM, sont recopiées côté
+    serveur. Une seule transaction : un échec laisse l'état précédent.
+    """
+    t0 = time.perf_counter()
+    target = models.EmployeeFeatures.__table__.fullname
+    with engine.begin() as conn:
+        n_rows = conn.execute(select(func.count()).select_from(models.EmployeeFeatures)).scalar_one()
+        chunks = _stage_chunks(conn, stage_table, chunk_size)
+        if delta and n_rows > 0:
+            changes = apply_delta(conn, chunks)
+            _copy_extra_cols(conn, stage_table, extra_cols)
+        elif delta:
+            changes = DeltaResult(full=True)
+            conn.execute(delete(models.EmployeeFeatures))
+            for chunk in chunks:
+                # table vide: simple insertion, pas d'upsert
+                records = chunk.assign(row_hash=row_hash(chunk))
+                conn.execute(insert(models.EmployeeFeatures), records.astype(object).where(records.notna(), None).to_dict("records"))
+            _copy_extra_cols(conn, stage_table, extra_cols)
+        else:
+            changes = DeltaResult(full=True)
+            conn.execute(delete(models.EmployeeFeatures))
+            cols = ", ".join(list(FEATURE_TABLE_COLS) + list(extra_cols))
+            conn.exec_driver_sql(
+                f"INSERT INTO {target} ({cols}) SELECT {cols} FROM {stage_table} WHERE id_employee IS NOT NULL"
+            )
+        n_out = conn.execute(select(func.count()).select_from(models.EmployeeFeatures)).scalar_one()
+        # marqueur de changement relu par le feature store (comme le manifeste du chemin SQLite)
+        mark_features_written(conn, rows=n_out, digest=f"schema-v{ETL_SCHEMA_VERSION}")
+        conn.exec_driver_sql(f"DROP TABLE {stage_table}")
+    logger.info(
+        "[Initialisation_PG] employee_features synchronisée en %.2fs (changes=%s)", time.perf_counter() - t0, changes.summary()
+    )
+    return changes
+
+
+def lancepostgres_Initialisation(
+    delta: Optional[bool] = None,
+    chunk_size: Optional[int] = None,
+    on_changes: Optional[Callable[[DeltaResult], None]] = None,
+):
+    """Exécute les scripts `db/*.sql` puis synchronise `mart.employee_features` depuis la table de transit.
+
+    Args:
+        delta: Ingestion incrémentale par `id_employee` au lieu d'un
+            rechargement complet, si la table contient déjà des lignes ; défaut `ETL_DELTA`.
+        chunk_size: Lignes relues par page dans la table de transit ; défaut `ETL_CHUNK_SIZE`.
+        on_changes: Appelée après le commit avec les identifiants touchés (`DeltaResult`).
+    """
     if psycopg is None:
         raise SystemExit("psycopg is required for PostgreSQL. Install it: pip install psycopg")
     
@@ -365,18 +504,94 @@ def lancepostgres_Initialisation():
             print(f"Running {path}...")
             sql = path.read_text(encoding="utf-8")
             lancesql(conn, sql)
+
+    # même base que les scripts SQL (paramètres POSTGRES_*), via SQLAlchemy pour l'ORM
+    settings = get_settings()
+    engine = create_engine("postgresql+psycopg://", creator=lambda: psycopg.connect(conn_str))
+    try:
+        changes = sync_features_from_stage(
+            engine,
+            PG_STAGE_TABLE,
+            delta=settings.ETL_DELTA if delta is None else delta,
+            chunk_size=chunk_size or settings.ETL_CHUNK_SIZE,
+            extra_cols=PG_EXTRA_COLS,
+        )
+    finally:
+        engine.dispose()
     print("PostgreSQL database ready.")
+    if on_changes is not None:
+        on_changes(changes)
+
 
+def refresh_employee_scores(changes: Optional[DeltaResult] = None):
+    """Met à jour les scores matérialisés (`employee_scores`) après un chargement des données.
 
-def main():
+    Après une ingestion delta (`changes.full` faux), seuls les employés
+    insérés, modifiés ou supprimés sont re-scorés ; sans chargement
+    (`changes` absent), les scores ne sont recalculés que s'ils ne sont plus
+    à jour pour le modèle courant ; sinon la table est reconstruite.
+    """
+    try:
+        import app.api  # noqa: F401  (importé d'abord: les modules ML dépendent de app.api.schemas)
+        from app.ml.population import rescore_employees
+        from app.ml.scoring import rebuild_employee_scores, scores_are_current
+        from app.ml.serve import model_service
+    except ImportError as e:  # pragma: no cover
+        logger.warning("[Scores] Modules applicatifs indisponibles: %s", e)
+        return
+    try:
+        if model_service.model is None:
+            model_service.load()
+        engine = create_engine(get_settings().DATABASE_URL, future=True)
+        if changes is None:
+            if scores_are_current(engine, model_service.version):
+                logger.info("[Scores] employee_scores à jour (model_version=%s)", model_service.version)
+                return
+        elif not changes.full:
+            stats = rescore_employees(engine, changes.changed_ids(), model_service)
+            logger.info(
+                "[Scores] employee_scores mise à jour: %s re-scorés, %s supprimés (model_version=%s)",
+                stats["rescored"], stats["deleted"], model_service.version,
+            )
+            return
+        n = rebuild_employee_scores(engine, model_service)
+        logger.info("[Scores] employee_scores reconstruite: %s lignes (model_version=%s)", n, model_service.version)
+    except Exception as e:
+        logger.warning("[Scores] Reconstruction de employee_scores ignorée: %s", e)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Initialise la base (SQLite ou PostgreSQL) depuis les extraits CSV.")
+    parser.add_argument("--force", action="store_true", help="SQLite: recharge employee_features même si les extraits n'ont pas changé")
+    parser.add_argument("--stream", action="store_true", default=None, help="SQLite: ETL par blocs, mémoire constante (défaut ETL_STREAMING)")
+    parser.add_argument("--chunk-size", type=int, default=None, help="lignes par bloc en mode --stream, ou par page de la table de transit PostgreSQL (défaut ETL_CHUNK_SIZE)")
+    parser.add_argument("--bulk", action="store_true", default=None, help="SQLite: chargement executemany + PRAGMA rapides (défaut ETL_BULK_LOAD)")
+    parser.add_argument("--delta", action="store_true", default=None, help="n'applique que les lignes insérées, modifiées ou supprimées (défaut ETL_DELTA)")
+    parser.add_argument("--changed-ids", help="fichier où écrire les id_employee touchés par le chargement, un par ligne")
+    parser.add_argument("--read-workers", type=int, default=None, help="threads de lecture/nettoyage des extraits hors --stream (défaut ETL_READ_WORKERS)")
+    parser.add_argument("--csv-engine", choices=["pandas", "pyarrow"], default=None, help="lecteur CSV du mode --stream (défaut ETL_CSV_ENGINE)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     print(f"[DEBUG] cwd        = {Path.cwd()}")
     print(f"[DEBUG] script dir = {HERE}")
     backend = _detect_backend()
     print(f"[DEBUG] Backend    = {backend}")
+    changes = []
     if backend == "sqlite":
-        lancesqlite_Initialisation()
+        lancesqlite_Initialisation(
+            force=args.force, stream=args.stream, chunk_size=args.chunk_size, csv_engine=args.csv_engine,
+            bulk=args.bulk, delta=args.delta, on_changes=changes.append, read_workers=args.read_workers,
+        )
+    else:
+        lancepostgres_Initialisation(delta=args.delta, chunk_size=args.chunk_size, on_changes=changes.append)
+    if not changes:
+        logger.info("[ETL] employee_features inchangée (manifeste à jour)")
     else:
-        lancepostgres_Initialisation()
+        logger.info("[ETL] Bilan du chargement: %s", json.dumps(changes[0].summary()))
+        if args.changed_ids:
+            Path(args.changed_ids).write_text("".join(f"{i}\n" for i in changes[0].changed_ids()), encoding="utf-8")
+    refresh_employee_scores(changes[0] if changes else None)
 
 
 if __name__ == "__main__":
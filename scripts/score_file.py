@@ -0,0 +1,40 @@
+"""Scoring d'un extrait CSV / Parquet par blocs, sans passer par l'API.
+
+    python -m scripts.score_file imports/extrait_sirh.csv -o scores.parquet \
+        --eval imports/extrait_eval.csv --sondage imports/extrait_sondage.csv
+
+Même traitement que `POST /api/v1/predict/file` (nettoyage de l'ETL,
+normalisation, inférence vectorisée par blocs) avec le modèle `MODEL_PATH`.
+"""
+import argparse
+import json
+import logging
+import sys
+
+import app.api  # noqa: F401  (importé d'abord: les modules ML dépendent de app.api.schemas)
+from app.core.config import get_settings
+from app.ml.file_scoring import FORMATS, FileScorer
+
+logger = logging.getLogger("score_file")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Score un fichier CSV ou Parquet d'employés")
+    parser.add_argument("input", help="fichier à scorer (extrait SIRH ou fichier déjà fusionné)")
+    parser.add_argument("-o", "--output", required=True, help="fichier de sortie (.csv ou .parquet)")
+    parser.add_argument("--eval", dest="eval_path", help="extrait des évaluations à joindre (eval_number)")
+    parser.add_argument("--sondage", dest="sondage_path", help="extrait du sondage à joindre (code_sondage)")
+    parser.add_argument("--format", choices=FORMATS, help="format d'entrée (défaut: extension)")
+    parser.add_argument("--output-format", choices=FORMATS, help="format de sortie (défaut: extension)")
+    parser.add_argument("--chunk-size", type=int, default=get_settings().PREDICT_FILE_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    scorer = FileScorer(chunk_size=args.chunk_size, eval_path=args.eval_path, sondage_path=args.sondage_path)
+    stats = scorer.score_file(args.input, args.output, args.format, args.output_format)
+    logger.info("Fichier scoré: %s", json.dumps(stats))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
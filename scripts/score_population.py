@@ -0,0 +1,96 @@
+"""Re-scoring nocturne de toute la table `employee_features` vers `employee_scores`.
+
+    python -m scripts.score_population --chunk-size 5000 --workers 4
+
+Lecture par pages (pagination par clé), inférence vectorisée par bloc
+(éventuellement sur un pool de processus), upsert des scores avec la version
+du modèle et l'horodatage du passage. Fonctionne sur SQLite et PostgreSQL
+(`DATABASE_URL`).
+
+Le script tourne dans son propre processus, avec une priorité abaissée
+(`--nice`) et des threads BLAS limités : il ne prend ni le GIL ni les cœurs
+des workers de l'API. Chaque bloc est écrit dans une transaction courte.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+import app.api  # noqa: F401  (importé d'abord: les modules ML dépendent de app.api.schemas)
+from app.core.config import get_settings
+from app.db.schema import add_missing_columns
+from app.ml.executor import make_executor
+from app.ml.population import PopulationScorer
+from app.ml.serve import MODEL_PATH, ModelService
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:  # pragma: no cover
+    threadpool_limits = None
+
+logger = logging.getLogger("score_population")
+
+
+def main(argv=None) -> int:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Score toute la population de employee_features")
+    parser.add_argument("--database-url", default=settings.DATABASE_URL, help="base à scorer (défaut: DATABASE_URL)")
+    parser.add_argument("--model", default=MODEL_PATH, help="modèle à utiliser (défaut: MODEL_PATH)")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="lignes lues, scorées et écrites par bloc")
+    parser.add_argument("--workers", type=int, default=0, help="processus d'inférence (0 = dans ce processus)")
+    parser.add_argument("--threads", type=int, default=1, help="threads BLAS/OpenMP par processus")
+    parser.add_argument("--nice", type=int, default=10, help="incrément de priorité (0 = inchangée)")
+    parser.add_argument("--pause-ms", type=float, default=0.0, help="pause entre deux blocs")
+    parser.add_argument("--no-prune", action="store_true", help="garde les scores d'employés disparus")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="ne recalcule que les lignes dont les features ou la version du modèle ont changé",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.nice and hasattr(os, "nice"):
+        os.nice(args.nice)
+    if threadpool_limits is not None:
+        threadpool_limits(limits=max(1, args.threads))
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.engine.url import make_url
+
+    url = make_url(args.database_url)
+    connect_args = {"check_same_thread": False} if url.get_backend_name() == "sqlite" else {}
+    engine = create_engine(args.database_url, pool_pre_ping=True, connect_args=connect_args)
+    # base créée avant l'ajout de employee_scores.features_hash
+    add_missing_columns(engine)
+
+    service = ModelService(args.model, compiled=settings.MODEL_COMPILED, engine=settings.MODEL_ENGINE).load()
+    # les processus héritent de la priorité abaissée (nice) du script
+    executor = make_executor(service, "process" if args.workers > 0 else "inline", args.workers, args.threads).start()
+    try:
+        scorer = PopulationScorer(
+            engine,
+            service,
+            executor,
+            chunk_size=args.chunk_size,
+            parallelism=max(1, args.workers),
+            pause_seconds=args.pause_ms / 1000.0,
+        )
+        stats = scorer.run(
+            prune=not args.no_prune,
+            incremental=args.incremental,
+            progress=lambda s: logger.info(
+                "%s lignes (%s recalculées, %s inchangées), %s lignes/s",
+                s["rows"], s["rescored"], s["skipped"], s["rows_per_second"],
+            ),
+        )
+    finally:
+        executor.stop()
+        engine.dispose()
+    # bilan en JSON sur une ligne, dans le journal comme la progression
+    logger.info("Passage terminé: %s", json.dumps(stats))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
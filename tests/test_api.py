@@ -19,6 +19,12 @@ def client(monkeypatch):
     # on evite d'utiliser un vrai model: on monkeypatch les fonctions
     monkeypatch.setattr(serve_mod.model_service, "load", lambda: None, raising=False)    
     monkeypatch.setattr(serve_mod.model_service, "predict_proba", lambda payload: serve_mod.SEUIL_FIXE, raising=False)
+    monkeypatch.setattr(
+        serve_mod.model_service,
+        "predict_proba_batch",
+        lambda payloads: [serve_mod.SEUIL_FIXE] * len(payloads),
+        raising=False,
+    )
     monkeypatch.setattr(serve_mod.model_service, "close", lambda: None, raising=False)
     
     # Mock aussi get_model pour éviter le téléchargement
@@ -166,3 +172,175 @@ def test_predict_handles_yes_variants(client):
         assert r.status_code == 200
 
 
+# Test /predict/batch: les elements valides sont scorés, les invalides rapportés sans casser le lot
+def test_predict_batch_mixed_valid_and_invalid(client):
+    headers = {"x-api-key": "test-key"}
+    items = [
+        {"id_employee": 1, "age": 30, "heure_supplementaires": "yes"},
+        {"id_employee": 2, "age": -5},  # negatif -> erreur
+        {"age": 40},  # pas d'id -> erreur
+        {"id_employee": 4, "annees_dans_l_entreprise": 3},
+    ]
+    r = client.post("/api/v1/predict/batch", json=items, headers=headers)
+    assert r.status_code == 200
+    body = r.json()
+    assert body["n_ok"] == 2
+    assert body["n_errors"] == 2
+    assert [it["index"] for it in body["results"]] == [0, 1, 2, 3]
+    assert body["results"][0]["pred_quitte_entreprise"] in {"OUI", "NON"}
+    assert body["results"][1]["employee_id"] == 2
+    assert body["results"][1]["errors"]
+    assert body["results"][1]["pred_quitte_entreprise"] is None
+    assert body["results"][2]["errors"]
+    assert body["results"][3]["employee_id"] == 4
+
+
+# Test /predict/batch: le lot passe en un seul appel modele
+def test_predict_batch_calls_model_once(client, monkeypatch):
+    calls = []
+
+    def fake_batch(payloads):
+        calls.append(payloads)
+        return [0.9] * len(payloads)
+
+    monkeypatch.setattr(serve_mod.model_service, "predict_proba_batch", fake_batch, raising=False)
+    headers = {"x-api-key": "test-key"}
+    items = [{"id_employee": i, "age": 30, "annees_dans_l_entreprise": 2} for i in range(1, 6)]
+    r = client.post("/api/v1/predict/batch", json=items, headers=headers)
+    assert r.status_code == 200
+    assert len(calls) == 1
+    assert len(calls[0]) == 5
+    assert calls[0][0]["anciennete_log"] is not None
+    assert all(it["pred_quitte_entreprise"] == "OUI" for it in r.json()["results"])
+
+
+# Test /predict/batch: lot trop gros -> 413
+def test_predict_batch_rejects_too_large(client, monkeypatch):
+    from app.core.config import get_settings
+    monkeypatch.setattr(get_settings(), "PREDICT_BATCH_MAX_SIZE", 2)
+    headers = {"x-api-key": "test-key"}
+    items = [{"id_employee": i} for i in range(1, 4)]
+    r = client.post("/api/v1/predict/batch", json=items, headers=headers)
+    assert r.status_code == 413
+
+
+# Test du cache: deux appels identiques -> un seul appel modele, et compteurs dans /stats
+def test_predict_uses_prediction_cache(client, monkeypatch):
+    from app.ml.cache import PredictionCache
+    from app.api import predict as predict_mod
+    cache = PredictionCache(max_entries=100)
+    monkeypatch.setattr(predict_mod, "prediction_cache", cache)
+    calls = []
+
+    def fake_proba(payload):
+        calls.append(payload)
+        return 0.9
+
+    monkeypatch.setattr(serve_mod.model_service, "predict_proba", fake_proba, raising=False)
+    headers = {"x-api-key": "test-key"}
+    payload = {"id_employee": 7, "age": 30, "genre": "f"}
+    for _ in range(3):
+        r = client.post("/api/v1/predict", json=payload, headers=headers)
+        assert r.status_code == 200
+        assert r.json()["pred_quitte_entreprise"] == "OUI"
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 2
+
+
+def test_stats_endpoint(client):
+    headers = {"x-api-key": "test-key"}
+    r = client.get("/api/v1/stats", headers=headers)
+    assert r.status_code == 200
+    body = r.json()
+    assert {"model", "prediction_cache", "micro_batcher"} <= set(body)
+    assert client.get("/api/v1/stats").status_code == 401
+
+
+# Test /predict/stream: NDJSON lu et score par paquets, lignes invalides rapportees sans couper le flux
+def test_predict_stream_chunks_and_reports_invalid_lines(client, monkeypatch):
+    import json
+    from app.core.config import get_settings
+
+    calls = []
+    active = serve_mod.ActiveModel(model=object(), version="v-stream")
+
+    def fake_encoded(X, a=None):
+        assert a is active
+        calls.append(len(X))
+        return [0.9] * len(X)
+
+    monkeypatch.setattr(serve_mod.model_service, "active", lambda: active)
+    monkeypatch.setattr(serve_mod.model_service, "transform", lambda payloads, a=None: payloads)
+    monkeypatch.setattr(serve_mod.model_service, "predict_proba_encoded", fake_encoded)
+    from app.api import predict_stream
+
+    logs = []
+    monkeypatch.setattr(predict_stream.log_writer, "write", lambda record: logs.append(record) or True)
+    monkeypatch.setattr(get_settings(), "PREDICT_STREAM_CHUNK_SIZE", 2)
+    monkeypatch.setattr(get_settings(), "PREDICT_STREAM_MAX_LINE_BYTES", 200)
+    # tampon minuscule: les resultats en attente passent par le fichier temporaire
+    monkeypatch.setattr(get_settings(), "PREDICT_STREAM_SPOOL_BYTES", 64)
+    lines = [
+        json.dumps({"id_employee": 1, "age": 30}),
+        "{pas du json",
+        "",
+        json.dumps({"id_employee": 2, "age": -5}),  # negatif -> erreur
+        json.dumps({"id_employee": 3}),
+        json.dumps({"id_employee": 4, "poste": "x" * 500}),  # ligne trop longue
+        json.dumps({"id_employee": 5, "annees_dans_l_entreprise": 2}),
+    ]
+    r = client.post(
+        "/api/v1/predict/stream",
+        content="\n".join(lines).encode("utf-8"),
+        headers={"x-api-key": "test-key", "content-type": "application/x-ndjson"},
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    out = {it["index"]: it for it in map(json.loads, r.text.splitlines())}
+    assert sorted(out) == [0, 1, 3, 4, 5, 6]
+    assert [out[i]["pred_quitte_entreprise"] for i in (0, 4, 6)] == ["OUI"] * 3
+    assert out[0]["employee_id"] == 1
+    # version du modèle figé qui a scoré le paquet
+    assert {out[i]["model_version"] for i in (0, 4, 6)} == {"v-stream"}
+    assert out[1]["errors"][0]["type"] == "json_invalid"
+    assert out[3]["employee_id"] == 2 and out[3]["errors"]
+    assert out[5]["errors"][0]["type"] == "line_too_long"
+    # 3 lignes valides, paquets de 2 -> 2 appels modele
+    assert calls == [2, 1]
+    # un log par paquet, pas un par ligne
+    assert [(r["payload"]["employee_ids"], r["output"]["n_oui"]) for r in logs] == [([1, 3], 2), ([5], 1)]
+
+
+@pytest.mark.asyncio
+async def test_predict_stream_spool_is_capped_for_slow_readers():
+    import anyio
+    from app.api.predict_stream import NDJSONStreamingResponse
+
+    produced = []
+    closed = anyio.Event()
+
+    async def lines():
+        try:
+            for i in range(10_000):
+                produced.append(i)
+                yield b"x" * 99 + b"\n"
+        finally:
+            closed.set()
+
+    sent = []
+
+    async def send(message):
+        # client qui ne lit rien tant que la production n'est pas arrêtée
+        if message["type"] == "http.response.body" and not closed.is_set():
+            await closed.wait()
+        sent.append(message)
+
+    response = NDJSONStreamingResponse(lines(), spool_bytes=256, max_spool_bytes=1000, overflow_line=b"STOP\n")
+    with anyio.fail_after(5):
+        await response({"type": "http"}, None, send)
+    body = b"".join(m.get("body", b"") for m in sent)
+    # lecture du corps arrêtée juste au-delà du plafond, ligne d'erreur en dernier
+    assert len(produced) <= 12
+    assert body.endswith(b"STOP\n")
+    assert body.count(b"\n") == len(produced) + 1
+    assert sent[-1] == {"type": "http.response.body", "body": b"", "more_body": False}
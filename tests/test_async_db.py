@@ -0,0 +1,113 @@
+"""Tests pour le chemin asynchrone (AsyncSession, routes async)"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from app.db import repository
+from app.db.async_session import async_database_url, check_async_driver
+from app.db.base import Base
+from app.db.repository import (
+    get_employee_features_async,
+    get_prediction_log_by_employee_id_async,
+    save_prediction_log_async,
+)
+
+from tests.test_db import _log
+from tests.test_scoring import _employee
+
+pytest.importorskip("aiosqlite")
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "async.db"
+    eng = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=eng)
+    with Session(eng) as db:
+        db.add_all([_employee(1, 10), _employee(2, 50)])
+        db.commit()
+    eng.dispose()
+    return path
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("sqlite:///./data/app.db", "sqlite+aiosqlite:///./data/app.db"),
+    ("postgresql://u:p@h:5432/d", "postgresql+asyncpg://u:p@h:5432/d"),
+    ("postgresql+psycopg://u:p@h:5432/d", "postgresql+psycopg://u:p@h:5432/d"),
+])
+def test_async_database_url(url, expected):
+    assert async_database_url(url) == expected
+
+
+@pytest.mark.asyncio
+async def test_async_repository_functions(db_path):
+    eng = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    async with async_sessionmaker(eng, expire_on_commit=False)() as db:
+        first = await save_prediction_log_async(db, **_log(1, "NON"))
+        second = await save_prediction_log_async(db, **_log(1, "OUI"))
+        assert second.id == first.id
+        row = await get_prediction_log_by_employee_id_async(db, employee_id=1)
+        assert row.output == {"pred_quitte_entreprise": "OUI"}
+        assert await get_prediction_log_by_employee_id_async(db, employee_id=9) is None
+        feats = await get_employee_features_async(db, employee_id=2, columns=["age", "genre"])
+        assert feats == {"age": 50, "genre": " f "}
+        assert await get_employee_features_async(db, employee_id=9, columns=["age"]) is None
+    await eng.dispose()
+
+
+@pytest.mark.asyncio
+async def test_async_upsert_orm_fallback(db_path, monkeypatch):
+    # dialecte sans ON CONFLICT: même résultat par SELECT puis mise à jour ou insertion
+    monkeypatch.setattr(repository, "_upsert_statement", lambda db: None)
+    eng = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    async with async_sessionmaker(eng, expire_on_commit=False)() as db:
+        first = await save_prediction_log_async(db, **_log(1, "NON"))
+        second = await save_prediction_log_async(db, **_log(1, "OUI"))
+        anonymous = await save_prediction_log_async(db, **_log(None, "NON"))
+        assert second.id == first.id != anonymous.id
+        row = await get_prediction_log_by_employee_id_async(db, employee_id=1)
+        assert row.output == {"pred_quitte_entreprise": "OUI"}
+    await eng.dispose()
+
+
+def test_check_async_driver(monkeypatch):
+    check_async_driver("sqlite:///./data/app.db")
+    monkeypatch.setattr("importlib.util.find_spec", lambda name: None if name == "asyncpg" else object())
+    with pytest.raises(RuntimeError, match="asyncpg"):
+        check_async_driver("postgresql://u:p@h:5432/d")
+    check_async_driver("postgresql+psycopg://u:p@h:5432/d")
+
+
+def test_async_routes_end_to_end(db_path, monkeypatch):
+    from app.api import predict_async
+    from app.db.async_session import get_async_db
+    from app.ml import serve as serve_mod
+
+    monkeypatch.setattr(serve_mod.model_service, "predict_proba", lambda payload: payload["age"] / 100)
+    monkeypatch.setattr(serve_mod.model_service, "version", None)
+    eng = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    factory = async_sessionmaker(eng, expire_on_commit=False)
+
+    async def _db():
+        async with factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(predict_async.router, prefix="/api/v1")
+    app.dependency_overrides[get_async_db] = _db
+    headers = {"x-api-key": "test-key"}
+    with TestClient(app) as client:
+        r = client.get("/api/v1/predict/by-id/2", headers=headers)
+        assert r.status_code == 200
+        assert r.json() == {"employee_id": 2, "pred_quitte_entreprise": "OUI", "model_version": None}
+        assert client.get("/api/v1/predict/by-id/99", headers=headers).status_code == 422
+        # log ecrit par l'upsert asynchrone (writer de fond arrete)
+        r = client.get("/api/v1/logs/prediction/2", headers=headers)
+        assert r.status_code == 200
+        assert r.json()["pred_quitte_entreprise"] == "OUI"
+        assert client.get("/api/v1/logs/prediction/1", headers=headers).status_code == 404
+        r = client.post("/api/v1/predict", json={"id_employee": 5, "age": 5}, headers=headers)
+        assert r.json() == {"employee_id": 5, "pred_quitte_entreprise": "NON", "model_version": None}
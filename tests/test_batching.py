@@ -0,0 +1,104 @@
+"""Tests pour le micro-batching des prédictions unitaires"""
+import threading
+
+import pytest
+
+from app.ml.batching import MicroBatcher
+from app.ml.serve import SEUIL_FIXE
+
+
+class FakeService:
+    """Service qui renvoie la valeur 'p' du payload et garde la taille des lots"""
+
+    def __init__(self):
+        self.batch_sizes = []
+        self.lock = threading.Lock()
+
+    def predict_proba_batch(self, payloads):
+        with self.lock:
+            self.batch_sizes.append(len(payloads))
+        return [p["p"] for p in payloads]
+
+    def predict_proba(self, payload):
+        return payload["p"]
+
+
+def test_micro_batcher_groups_concurrent_requests():
+    svc = FakeService()
+    mb = MicroBatcher(svc, max_batch_size=8, max_wait_us=200_000).start()
+    mb._last_batch_size = 2  # force l'attente comme sous charge
+    results = {}
+    barrier = threading.Barrier(16)
+
+    def worker(i):
+        barrier.wait()
+        results[i] = mb.predict_proba({"p": i / 100})
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    mb.stop()
+
+    # chaque appelant recoit son propre resultat
+    assert results == {i: i / 100 for i in range(16)}
+    # moins d'appels modele que de requetes, et jamais plus que max_batch_size
+    assert sum(svc.batch_sizes) == 16
+    assert len(svc.batch_sizes) < 16
+    assert max(svc.batch_sizes) <= 8
+
+
+def test_micro_batcher_propagates_errors_to_each_caller():
+    class Boom(FakeService):
+        def predict_proba_batch(self, payloads):
+            raise RuntimeError("boom")
+
+    mb = MicroBatcher(Boom(), max_batch_size=4, max_wait_us=0).start()
+    with pytest.raises(RuntimeError):
+        mb.predict_proba({"p": 0.5})
+    mb.stop()
+
+
+def test_micro_batcher_stop_never_strands_a_caller():
+    # soumissions concurrentes pendant stop(): chaque Future est résolu (file drainée ou calcul direct)
+    for _ in range(20):
+        svc = FakeService()
+        mb = MicroBatcher(svc, max_batch_size=4, max_wait_us=0).start()
+        futures = []
+        barrier = threading.Barrier(5)
+
+        def worker():
+            barrier.wait()
+            futures.extend(mb.submit({"p": 0.1}) for _ in range(50))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        barrier.wait()
+        mb.stop()
+        for t in threads:
+            t.join()
+        assert [f.result(timeout=2) for f in futures] == [0.1] * 200
+        assert mb._queue.empty()
+
+
+def test_micro_batcher_not_started_scores_inline():
+    svc = FakeService()
+    mb = MicroBatcher(svc)
+    assert not mb.running
+    assert mb.predict_label({"p": SEUIL_FIXE}) == 1
+    assert mb.predict_label({"p": 0.0}) == 0
+    assert svc.batch_sizes == []
+
+
+def test_micro_batcher_stats():
+    svc = FakeService()
+    mb = MicroBatcher(svc, max_batch_size=4, max_wait_us=0).start()
+    mb.predict_proba({"p": 0.2})
+    mb.predict_proba({"p": 0.3})
+    stats = mb.stats()
+    mb.stop()
+    assert stats["running"] is True
+    assert stats["rows"] == 2
+    assert stats["batches"] == 2
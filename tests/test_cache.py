@@ -0,0 +1,64 @@
+"""Tests pour le cache de prédictions (LRU + TTL + version du modèle)"""
+import time
+
+from app.ml.cache import PredictionCache, payload_key
+
+
+def test_payload_key_is_canonical():
+    assert payload_key({"a": 1, "b": "X"}) == payload_key({"b": "X", "a": 1})
+    assert payload_key({"a": 1}) != payload_key({"a": 2})
+
+
+def test_cache_hit_and_miss_counters():
+    c = PredictionCache(max_entries=10)
+    assert c.get({"a": 1}, "v1") is None
+    c.put({"a": 1}, "v1", 0.4)
+    assert c.get({"a": 1}, "v1") == 0.4
+    s = c.stats()
+    assert (s["hits"], s["misses"], s["entries"]) == (1, 1, 1)
+
+
+def test_cache_invalidated_when_model_version_changes():
+    c = PredictionCache()
+    c.put({"a": 1}, "v1", 0.4)
+    assert c.get({"a": 1}, "v2") is None
+    assert len(c) == 0
+    assert c.stats()["invalidations"] == 1
+
+
+def test_cache_lru_eviction_by_entries():
+    c = PredictionCache(max_entries=2)
+    c.put({"a": 1}, "v", 0.1)
+    c.put({"a": 2}, "v", 0.2)
+    c.get({"a": 1}, "v")  # rend {"a": 1} recent
+    c.put({"a": 3}, "v", 0.3)
+    assert c.get({"a": 2}, "v") is None
+    assert c.get({"a": 1}, "v") == 0.1
+    assert c.stats()["evictions"] == 1
+
+
+def test_cache_bounded_by_memory():
+    c = PredictionCache(max_entries=1000, max_bytes=600)
+    for i in range(20):
+        c.put({"a": i}, "v", 0.5)
+    assert c.stats()["bytes"] <= 600
+    assert 0 < len(c) < 20
+
+
+def test_cache_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    c = PredictionCache(ttl_seconds=10)
+    c.put({"a": 1}, "v", 0.7)
+    now[0] += 5
+    assert c.get({"a": 1}, "v") == 0.7
+    now[0] += 10
+    assert c.get({"a": 1}, "v") is None
+    assert len(c) == 0
+
+
+def test_disabled_cache_is_noop():
+    c = PredictionCache(enabled=False)
+    c.put({"a": 1}, "v", 0.7)
+    assert c.get({"a": 1}, "v") is None
+    assert c.stats()["misses"] == 0
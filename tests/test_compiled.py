@@ -0,0 +1,94 @@
+"""Tests pour le mode d'inférence compilé (parité avec le pipeline scikit-learn)"""
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder, StandardScaler
+
+from app.ml.compiled import CompiledPreprocessor, compile_pipeline
+from app.ml.serve import ModelService
+
+REAL_MODEL = os.path.join(os.path.dirname(__file__), "..", "app", "ml", "model.pkl")
+
+
+def _make_pipeline():
+    # meme structure que le modele de prod: num / ord / nom
+    rng = np.random.RandomState(0)
+    n = 120
+    X = pd.DataFrame({
+        "age": rng.randint(20, 60, n).astype(float),
+        "distance": rng.rand(n) * 30,
+        "frequence": rng.choice(["AUCUN", "OCCASIONNEL", "FREQUENT", np.nan], n),
+        "genre": rng.choice(["F", "M"], n),
+        "poste": rng.choice(["MANAGER", "CONSULTANT", "TECHLEAD", np.nan], n),
+    })
+    y = rng.randint(0, 2, n)
+    prep = ColumnTransformer([
+        ("num", Pipeline([("scaler", StandardScaler())]), ["age", "distance"]),
+        ("ord", Pipeline([
+            ("imputer", SimpleImputer(strategy="most_frequent")),
+            ("ord", OrdinalEncoder(categories=[["AUCUN", "OCCASIONNEL", "FREQUENT"]],
+                                   handle_unknown="use_encoded_value", unknown_value=-1)),
+        ]), ["frequence"]),
+        ("nom", Pipeline([
+            ("imputer", SimpleImputer(strategy="most_frequent")),
+            ("ohe", OneHotEncoder(handle_unknown="ignore", sparse_output=False)),
+        ]), ["genre", "poste"]),
+    ])
+    pipe = Pipeline([("prep", prep), ("modele", GradientBoostingClassifier(n_estimators=20, random_state=0))])
+    return pipe.fit(X, y)
+
+
+def test_compiled_transform_matches_column_transformer():
+    pipe = _make_pipeline()
+    compiled = CompiledPreprocessor(pipe)
+    payloads = compiled.sample_payloads(40)
+    expected = pipe.steps[0][1].transform(pd.DataFrame(payloads))
+    assert np.array_equal(compiled.transform(payloads), expected)
+
+
+def test_compiled_parity_with_unknown_and_missing_values():
+    pipe = _make_pipeline()
+    compiled, err = compile_pipeline(pipe)
+    assert err == pytest.approx(0.0, abs=1e-12)
+    payloads = [
+        {"age": 30.0, "distance": 2.0, "frequence": "FREQUENT", "genre": "F", "poste": "MANAGER"},
+        {"age": 45.0, "distance": 9.5, "frequence": None, "genre": "X", "poste": None},
+        {"age": 22.0, "distance": 1.0, "frequence": "INCONNU", "genre": "M", "poste": float("nan")},
+    ]
+    assert compiled.parity_error(pipe, payloads) == pytest.approx(0.0, abs=1e-12)
+
+
+def test_model_service_compiled_mode(tmp_path):
+    pipe = _make_pipeline()
+    path = tmp_path / "pipe.pkl"
+    joblib.dump(pipe, path)
+    plain = ModelService(str(path)).load()
+    fast = ModelService(str(path), compiled=True).load()
+    assert fast.compiled_active
+    assert not plain.compiled_active
+    payloads = CompiledPreprocessor(pipe).sample_payloads(10)
+    assert np.allclose(fast.predict_proba_batch(payloads), plain.predict_proba_batch(payloads))
+
+
+def test_model_service_compiled_falls_back_for_unsupported_model(tmp_path):
+    from sklearn.ensemble import RandomForestClassifier
+    model = RandomForestClassifier(n_estimators=2, random_state=0).fit(np.random.rand(10, 3), [0, 1] * 5)
+    path = tmp_path / "rf.pkl"
+    joblib.dump(model, path)
+    svc = ModelService(str(path), compiled=True).load()
+    assert not svc.compiled_active
+    assert 0 <= svc.predict_proba({"a": 0.1, "b": 0.2, "c": 0.3}) <= 1
+
+
+@pytest.mark.skipif(not os.path.exists(REAL_MODEL), reason="model.pkl absent")
+def test_compiled_parity_on_production_model():
+    pipe = joblib.load(REAL_MODEL)
+    _, err = compile_pipeline(pipe)
+    assert err == pytest.approx(0.0, abs=1e-9)
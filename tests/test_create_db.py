@@ -0,0 +1,363 @@
+"""Tests pour l'initialisation SQLite idempotente (manifeste des extraits CSV)"""
+import shutil
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, func, insert, select, text
+
+from app.core.config import Settings
+from app.db.models import EmployeeFeatures, EtlManifest, PredictionLog
+from app.etl.cleaning import (
+    add_log_features,
+    clean_eval,
+    clean_sirh,
+    clean_sondage,
+    merge_sources,
+    to_employee_features,
+    upper_strip_series,
+)
+from app.etl.delta import row_hash
+from app.etl.streaming import StreamingETL, read_csv_chunks
+from scripts import create_db
+
+from tests.test_file_scoring import EVAL, SIRH, SONDAGE
+
+
+@pytest.fixture
+def imports(tmp_path, monkeypatch):
+    folder = tmp_path / "imports"
+    folder.mkdir()
+    for src in (SIRH, EVAL, SONDAGE):
+        shutil.copy(src, folder)
+    settings = Settings(DATABASE_URL=f"sqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setattr(create_db, "IMPORTS_DIR", folder)
+    monkeypatch.setattr(create_db, "get_settings", lambda: settings)
+    return folder, create_engine(settings.DATABASE_URL)
+
+
+def _count(engine, model):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(model)).scalar_one()
+
+
+def test_initialisation_skips_unchanged_extracts_and_keeps_logs(imports):
+    folder, engine = imports
+    assert create_db.lancesqlite_Initialisation() is True
+    assert _count(engine, EmployeeFeatures) == 1470
+    with engine.connect() as conn:
+        manifest = dict(conn.execute(select(EtlManifest.name, EtlManifest.rows)).all())
+    assert manifest == {
+        "extrait_sirh.csv": 1470, "extrait_eval.csv": 1470, "extrait_sondage.csv": 1470, "employee_features": 1470,
+    }
+
+    with engine.begin() as conn:
+        conn.execute(insert(PredictionLog), [{"endpoint": "/predict", "payload": {}, "output": {}}])
+    assert create_db.lancesqlite_Initialisation() is False
+    # l'historique des logs survit au redémarrage
+    assert _count(engine, PredictionLog) == 1
+
+    # extrait modifié -> rechargement, logs toujours conservés
+    sirh = pd.read_csv(folder / "extrait_sirh.csv")
+    sirh.iloc[1:].to_csv(folder / "extrait_sirh.csv", index=False)
+    assert create_db.lancesqlite_Initialisation() is True
+    assert _count(engine, EmployeeFeatures) == 1469
+    assert _count(engine, PredictionLog) == 1
+    assert create_db.lancesqlite_Initialisation() is False
+
+
+def test_initialisation_reloads_on_schema_version_row_loss_or_force(imports, monkeypatch):
+    _, engine = imports
+    assert create_db.lancesqlite_Initialisation() is True
+
+    # table vidée hors ETL: le nombre de lignes ne correspond plus au manifeste
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM employee_features WHERE id_employee = 1"))
+    assert create_db.lancesqlite_Initialisation() is True
+    assert _count(engine, EmployeeFeatures) == 1470
+
+    monkeypatch.setattr(create_db, "ETL_SCHEMA_VERSION", create_db.ETL_SCHEMA_VERSION + 1)
+    assert create_db.lancesqlite_Initialisation() is True
+    assert create_db.lancesqlite_Initialisation() is False
+    assert create_db.lancesqlite_Initialisation(force=True) is True
+
+
+def test_initialisation_requires_all_extracts(imports):
+    folder, _ = imports
+    (folder / "extrait_eval.csv").unlink()
+    with pytest.raises(FileNotFoundError):
+        create_db.lancesqlite_Initialisation()
+
+
+def _in_memory_features(sirh, evaldf, sond):
+    return to_employee_features(add_log_features(merge_sources(clean_sirh(sirh), clean_eval(evaldf), clean_sondage(sond))))
+
+
+@pytest.mark.parametrize("csv_engine", ["pandas", "pyarrow"])
+def test_streaming_etl_matches_in_memory_chain(csv_engine):
+    if csv_engine == "pyarrow":
+        pytest.importorskip("pyarrow")
+    assert [len(c) for c in read_csv_chunks(SIRH, 400, csv_engine)] == [400, 400, 400, 270]
+
+    etl = StreamingETL(SIRH, EVAL, SONDAGE, chunk_size=400, csv_engine=csv_engine)
+    out = pd.concat(list(etl), ignore_index=True)
+    ref = _in_memory_features(pd.read_csv(SIRH), pd.read_csv(EVAL), pd.read_csv(SONDAGE)).reset_index(drop=True)
+    pd.testing.assert_frame_equal(out, ref, check_dtype=False)
+    assert etl.chunks == 4 and etl.sorted
+    assert etl.rows == {"extrait_sirh.csv": 1470, "extrait_eval.csv": 1470, "extrait_sondage.csv": 1470}
+
+
+def test_streaming_etl_unsorted_and_partial_sources(tmp_path):
+    # SIRH mélangé, évaluations incomplètes et dupliquées: mêmes lignes que les jointures gauches en mémoire
+    sirh = pd.read_csv(SIRH).sample(frac=1.0, random_state=0)
+    evaldf = pd.read_csv(EVAL)
+    evaldf = pd.concat([evaldf.iloc[100:], evaldf.iloc[[200]]], ignore_index=True)
+    paths = {"sirh": tmp_path / "sirh.csv", "eval": tmp_path / "eval.csv"}
+    sirh.to_csv(paths["sirh"], index=False)
+    evaldf.to_csv(paths["eval"], index=False)
+
+    etl = StreamingETL(paths["sirh"], paths["eval"], SONDAGE, chunk_size=250)
+    out = pd.concat(list(etl), ignore_index=True)
+    ref = _in_memory_features(sirh, evaldf, pd.read_csv(SONDAGE)).reset_index(drop=True)
+    pd.testing.assert_frame_equal(out, ref, check_dtype=False)
+    assert not etl.sorted and len(out) == 1471
+
+
+def test_initialisation_streaming_mode(imports):
+    _, engine = imports
+    assert create_db.lancesqlite_Initialisation(stream=True, chunk_size=500) is True
+    with engine.connect() as conn:
+        streamed = pd.read_sql(select(EmployeeFeatures).order_by(EmployeeFeatures.id_employee), conn)
+        assert conn.execute(select(EtlManifest.rows).where(EtlManifest.name == "employee_features")).scalar_one() == 1470
+    # même contenu que le chargement en mémoire: le manifeste reste valable d'un mode à l'autre
+    assert create_db.lancesqlite_Initialisation(stream=False) is False
+    assert create_db.lancesqlite_Initialisation(stream=False, force=True) is True
+    with engine.connect() as conn:
+        in_memory = pd.read_sql(select(EmployeeFeatures).order_by(EmployeeFeatures.id_employee), conn)
+    pd.testing.assert_frame_equal(streamed, in_memory)
+
+
+def _pragmas(engine):
+    with engine.connect() as conn:
+        return [conn.exec_driver_sql(f"PRAGMA {name}").scalar() for name in create_db.BULK_PRAGMAS]
+
+
+def test_bulk_load_matches_to_sql_and_restores_pragmas(imports):
+    _, engine = imports
+    assert create_db.lancesqlite_Initialisation(bulk=False) is True
+    with engine.connect() as conn:
+        reference = pd.read_sql(select(EmployeeFeatures).order_by(EmployeeFeatures.id_employee), conn)
+    before = _pragmas(engine)
+
+    assert create_db.lancesqlite_Initialisation(force=True, bulk=True, stream=True, chunk_size=500) is True
+    with engine.connect() as conn:
+        bulk = pd.read_sql(select(EmployeeFeatures).order_by(EmployeeFeatures.id_employee), conn)
+    pd.testing.assert_frame_equal(bulk, reference)
+    assert _pragmas(engine) == before
+
+
+def test_sqlite_pragmas_restored_after_failure(imports):
+    _, engine = imports
+    before = _pragmas(engine)
+    with engine.connect() as conn:
+        with pytest.raises(RuntimeError):
+            with create_db._sqlite_pragmas(conn, create_db.BULK_PRAGMAS) as previous:
+                assert [conn.exec_driver_sql(f"PRAGMA {n}").scalar() for n in previous] == ["memory", 0, -262144]
+                raise RuntimeError("échec du chargement")
+    assert _pragmas(engine) == before
+
+
+def _table(engine):
+    with engine.connect() as conn:
+        return pd.read_sql(select(EmployeeFeatures).order_by(EmployeeFeatures.id_employee), conn)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_delta_ingestion_applies_only_changes(imports, stream):
+    folder, engine = imports
+    changes = []
+    assert create_db.lancesqlite_Initialisation(delta=True, on_changes=changes.append) is True
+    # table vide: premier chargement complet
+    assert changes[-1].full and changes[-1].changed_ids() == []
+
+    sirh = pd.read_csv(folder / "extrait_sirh.csv")
+    sirh.loc[sirh["id_employee"] == 1, "age"] += 1
+    new_row = sirh[sirh["id_employee"] == 4].assign(id_employee=99999)
+    sirh = pd.concat([sirh[sirh["id_employee"] != 2], new_row], ignore_index=True)
+    sirh.to_csv(folder / "extrait_sirh.csv", index=False)
+    evaldf = pd.read_csv(folder / "extrait_eval.csv")
+    evaldf.loc[evaldf["eval_number"] == "E_5", "note_evaluation_actuelle"] += 1
+    evaldf.to_csv(folder / "extrait_eval.csv", index=False)
+
+    assert create_db.lancesqlite_Initialisation(delta=True, stream=stream, chunk_size=300, on_changes=changes.append) is True
+    delta = changes[-1]
+    assert (sorted(delta.inserted), sorted(delta.updated), delta.deleted) == ([99999], [1, 5], [2])
+    assert delta.unchanged == 1467 and not delta.full
+    assert delta.changed_ids() == [1, 2, 5, 99999]
+    after_delta = _table(engine)
+
+    # même contenu qu'un rechargement complet des mêmes extraits (comparé par empreinte: le texte
+    # stocké dans les colonnes String numériques dépend du type du bloc écrit, "2" ou "2.0")
+    assert create_db.lancesqlite_Initialisation(force=True, delta=False) is True
+    full = _table(engine)
+    assert list(after_delta["id_employee"]) == list(full["id_employee"])
+    assert list(after_delta["row_hash"]) == list(full["row_hash"])
+    assert after_delta["row_hash"].notna().all()
+    assert (after_delta.loc[after_delta["id_employee"] == 1, "age"].item(), len(after_delta)) == (
+        sirh.loc[sirh["id_employee"] == 1, "age"].item(), 1470,
+    )
+
+    assert create_db.lancesqlite_Initialisation(force=True, delta=True, on_changes=changes.append) is True
+    assert changes[-1].changed_ids() == [] and changes[-1].unchanged == 1470
+
+
+def test_row_hash_ignores_read_path_types():
+    ref = _in_memory_features(pd.read_csv(SIRH), pd.read_csv(EVAL), pd.read_csv(SONDAGE)).head(5)
+    typed = ref.copy()
+    typed["age"] = typed["age"].astype(float)
+    assert list(row_hash(ref)) == list(row_hash(typed))
+    typed.loc[typed.index[2], "genre"] = "X"
+    assert list(row_hash(ref) != row_hash(typed)) == [False, False, True, False, False]
+
+
+def test_cleaning_single_pass_normalization():
+    # valeurs sales: espaces, casse, préfixes, pourcentages à virgule, absents
+    evaldf = pd.DataFrame({
+        "eval_number": ["E_12", " e 7", "EVAL-0003", None, "E_x"],
+        "augementation_salaire_precedente": ["11 %", " 1,5% ", "20", None, "n/a"],
+        "heure_supplementaires": [" oui", "Non ", "", None, float("nan")],
+    })
+    clean_eval(evaldf)
+    assert evaldf["id_employee"].tolist()[:3] == [12, 7, 3] and evaldf["id_employee"].iloc[3:].isna().all()
+    assert evaldf["augementation_salaire_precedente"].tolist()[:3] == [11.0, 1.5, 20.0]
+    assert evaldf["augementation_salaire_precedente"].iloc[3:].isna().all()
+    # comportement historique de astype(str): None devient "NONE" et NaN "NAN"
+    assert evaldf["heure_supplementaires"].tolist() == ["OUI", "NON", None, "NONE", "NAN"]
+
+    sond = pd.DataFrame({"code_sondage": ["00 0012", "7"]})
+    assert clean_sondage(sond)["id_employee"].tolist() == [12, 7]
+    assert clean_sondage(pd.DataFrame({"code_sondage": [12, 7]}))["id_employee"].tolist() == [12, 7]
+    assert upper_strip_series(pd.Series([1.0, 2.5], index=[5, 9])).to_dict() == {5: "1.0", 9: "2.5"}
+
+    # lecture par défaut (numériques typés) ou tout en texte (mode flux): même résultat
+    as_text = _in_memory_features(*(pd.read_csv(p, dtype=str) for p in (SIRH, EVAL, SONDAGE)))
+    typed = _in_memory_features(*(pd.read_csv(p) for p in (SIRH, EVAL, SONDAGE)))
+    pd.testing.assert_frame_equal(as_text, typed, check_dtype=False)
+
+
+def test_parallel_source_loading_matches_sequential(imports, caplog):
+    folder = imports[0]
+    paths = [folder / name for name in ("extrait_sirh.csv", "extrait_eval.csv", "extrait_sondage.csv")]
+    with caplog.at_level("INFO", logger=create_db.logger.name):
+        parallel, rows = create_db._load_features_in_memory(*paths, workers=3)
+    sequential, _ = create_db._load_features_in_memory(*paths, workers=1)
+    pd.testing.assert_frame_equal(parallel, sequential)
+    assert rows == {p.name: 1470 for p in paths}
+    stages = next(r.getMessage() for r in caplog.records if "Stage times" in r.getMessage())
+    for stage in ("sources", "read extrait_eval.csv", "clean extrait_sondage.csv", "merge", "features"):
+        assert stage in stages
+
+
+def test_cli_refreshes_only_changed_scores(imports, monkeypatch):
+    import app.api  # noqa: F401  (ordre d'import des modules ML)
+    from app.ml import population, scoring, serve
+
+    folder, _ = imports
+    calls = []
+    monkeypatch.setattr(serve, "model_service", SimpleNamespace(model=object(), version="v1"))
+    monkeypatch.setattr(
+        population, "rescore_employees",
+        lambda bind, ids, service: calls.append(("rescore", list(ids))) or {"rescored": len(ids), "deleted": 0},
+    )
+    monkeypatch.setattr(scoring, "rebuild_employee_scores", lambda bind, service: calls.append(("rebuild",)) or 0)
+    current = {"value": True}
+    monkeypatch.setattr(scoring, "scores_are_current", lambda bind, version: current["value"])
+
+    create_db.main(["--delta"])
+    assert calls == [("rebuild",)]
+    # manifeste à jour: aucun recalcul tant que les scores suivent le modèle courant
+    create_db.main(["--delta"])
+    assert calls == [("rebuild",)]
+
+    sirh = pd.read_csv(folder / "extrait_sirh.csv")
+    sirh.loc[sirh["id_employee"] == 1, "age"] += 1
+    sirh.to_csv(folder / "extrait_sirh.csv", index=False)
+    create_db.main(["--delta"])
+    assert calls[-1] == ("rescore", [1])
+
+    # extraits inchangés mais scores d'un autre modèle: reconstruction complète
+    current["value"] = False
+    create_db.main([])
+    assert calls == [("rebuild",), ("rescore", [1]), ("rebuild",)]
+
+
+def _fill_stage(engine, *mutations):
+    # table de transit comme db/03_mart_employee.sql: colonnes ORM + revenu_mensuel (hors ORM)
+    cols = ", ".join(create_db.FEATURE_TABLE_COLS)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE IF EXISTS employee_features_stage")
+        conn.exec_driver_sql(
+            f"CREATE TABLE employee_features_stage AS SELECT {cols}, id_employee * 10 AS revenu_mensuel FROM employee_features"
+        )
+        for sql in mutations:
+            conn.exec_driver_sql(sql)
+
+
+def _sync(engine, delta):
+    return create_db.sync_features_from_stage(
+        engine, "employee_features_stage", delta=delta, chunk_size=400, extra_cols=("revenu_mensuel",)
+    )
+
+
+def test_postgres_stage_sync_full_then_delta(imports):
+    import app.api  # noqa: F401  (ordre d'import des modules ML)
+    from app.ml.feature_store import table_signature
+
+    _, engine = imports
+    create_db.lancesqlite_Initialisation()
+    with engine.begin() as conn:
+        reference = pd.read_sql("SELECT * FROM employee_features ORDER BY id_employee", conn)
+        conn.exec_driver_sql("ALTER TABLE employee_features ADD COLUMN revenu_mensuel NUMERIC")
+
+    def table():
+        with engine.connect() as conn:
+            return pd.read_sql("SELECT * FROM employee_features ORDER BY id_employee", conn)
+
+    # rechargement complet sans delta: INSERT ... SELECT côté serveur, sans row_hash, table de transit supprimée
+    _fill_stage(engine)
+    assert _sync(engine, delta=False).full is True
+    loaded = table()
+    with engine.connect() as conn:
+        assert "employee_features_stage" not in pd.read_sql("SELECT name FROM sqlite_master", conn)["name"].tolist()
+    assert loaded["row_hash"].isna().all()
+    pd.testing.assert_frame_equal(loaded[reference.columns].drop(columns="row_hash"), reference.drop(columns="row_hash"))
+    assert list(loaded["revenu_mensuel"]) == list(loaded["id_employee"] * 10)
+
+    # premier chargement delta (table vide): insertion simple avec row_hash
+    _fill_stage(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM employee_features"))
+    assert _sync(engine, delta=True).full is True
+    loaded = table()
+    pd.testing.assert_frame_equal(loaded[reference.columns], reference)
+    assert list(loaded["revenu_mensuel"]) == list(loaded["id_employee"] * 10)
+
+    # delta: une ligne modifiée (même longueur), une supprimée, un revenu modifié, le reste intact
+    edited, dropped, paid = (int(i) for i in reference["id_employee"].iloc[1:4])
+    _fill_stage(
+        engine,
+        f"UPDATE employee_features_stage SET genre = CASE genre WHEN 'M' THEN 'F' ELSE 'M' END WHERE id_employee = {edited}",
+        f"DELETE FROM employee_features_stage WHERE id_employee = {dropped}",
+        f"UPDATE employee_features_stage SET revenu_mensuel = 1 WHERE id_employee = {paid}",
+    )
+    with engine.connect() as conn:
+        marker = table_signature(conn)
+    changes = _sync(engine, delta=True)
+    with engine.connect() as conn:
+        # marqueur du feature store renouvelé, nombre de lignes à jour
+        assert table_signature(conn) != marker
+        assert table_signature(conn)[1] == 1469
+    assert (changes.full, changes.updated, changes.deleted, changes.inserted) == (False, [edited], [dropped], [])
+    assert changes.unchanged == 1468
+    assert _count(engine, EmployeeFeatures) == 1469
+    assert table().set_index("id_employee").loc[paid, "revenu_mensuel"] == 1
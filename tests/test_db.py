@@ -1,8 +1,10 @@
 """Tests pour la couche DB (models, repository)"""
 import pytest
 from app.db.models import EmployeeFeatures, PredictionLog
-from app.db.repository import save_prediction_log, _to_jsonable
+from app.db.repository import save_prediction_log, save_prediction_logs, _to_jsonable
 from app.db.session import engine
+from app.db.base import Base
+from sqlalchemy import create_engine
 from sqlalchemy.orm import Session
 from datetime import datetime
 
@@ -60,3 +62,75 @@ def test_to_jsonable_conversion():
     lst = [np.int64(1), 2, "test"]
     result = _to_jsonable(lst)
     assert result == [1, 2, "test"]
+
+
+@pytest.fixture
+def mem_db():
+    """Session sur une base SQLite en mémoire avec toutes les tables"""
+    eng = create_engine("sqlite://")
+    Base.metadata.create_all(bind=eng)
+    with Session(eng) as db:
+        yield db
+
+
+def _log(employee_id, pred="OUI"):
+    return {
+        "endpoint": "/predict/batch",
+        "requested_by": None,
+        "employee_id": employee_id,
+        "latency_ms": 3,
+        "status": "OK",
+        "payload": {"age": 30},
+        "output": {"pred_quitte_entreprise": pred},
+    }
+
+
+def test_save_prediction_logs_bulk_upsert(mem_db):
+    """Test que save_prediction_logs insère puis met à jour par employee_id"""
+    save_prediction_log(mem_db, **_log(1, "NON"))
+    n = save_prediction_logs(mem_db, [_log(1, "OUI"), _log(2), _log(2, "NON"), _log(None)])
+    assert n == 3
+    rows = mem_db.query(PredictionLog).order_by(PredictionLog.id).all()
+    assert len(rows) == 3
+    by_emp = {r.employee_id: r for r in rows}
+    assert by_emp[1].output == {"pred_quitte_entreprise": "OUI"}
+    assert by_emp[2].output == {"pred_quitte_entreprise": "NON"}
+    assert by_emp[None].endpoint == "/predict/batch"
+    assert save_prediction_logs(mem_db, []) == 0
+
+
+def test_save_prediction_log_is_one_statement(mem_db):
+    """Test que l'upsert unitaire passe par une seule instruction INSERT ... ON CONFLICT"""
+    from sqlalchemy import event
+
+    statements = []
+    eng = mem_db.get_bind()
+    listener = lambda conn, cursor, stmt, *a: statements.append(stmt)  # noqa: E731
+    event.listen(eng, "before_cursor_execute", listener)
+    first = save_prediction_log(mem_db, **_log(5, "NON"))
+    second = save_prediction_log(mem_db, **_log(5, "OUI"))
+    event.remove(eng, "before_cursor_execute", listener)
+    assert len(statements) == 2
+    assert all("ON CONFLICT" in s for s in statements)
+    assert second.id == first.id
+    assert second.output == {"pred_quitte_entreprise": "OUI"}
+    assert mem_db.query(PredictionLog).count() == 1
+
+
+def test_save_prediction_log_concurrent_writers(tmp_path):
+    """Test que des écritures concurrentes pour un même employé ne lèvent pas d'erreur de doublon"""
+    from concurrent.futures import ThreadPoolExecutor
+    from sqlalchemy.orm import sessionmaker
+
+    eng = create_engine(f"sqlite:///{tmp_path / 'logs.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=eng)
+    factory = sessionmaker(bind=eng)
+
+    def write(i):
+        with factory() as db:
+            save_prediction_log(db, **_log(i % 3, "OUI" if i % 2 else "NON"))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(write, range(60)))
+    with factory() as db:
+        assert db.query(PredictionLog).count() == 3
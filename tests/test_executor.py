@@ -0,0 +1,84 @@
+"""Tests pour les exécuteurs d'inférence (inline, threads, processus)"""
+import os
+import signal
+
+import joblib
+import numpy as np
+import pytest
+
+from app.ml.executor import (
+    InferenceExecutor,
+    ProcessPoolInferenceExecutor,
+    ThreadPoolInferenceExecutor,
+    make_executor,
+)
+from app.ml.serve import ModelService
+
+from tests.test_compiled import _make_pipeline
+
+PAYLOADS = [
+    {"age": 25.0 + i, "distance": 0.5 * i, "frequence": ["AUCUN", "FREQUENT", None][i % 3],
+     "genre": "FM"[i % 2], "poste": ["MANAGER", "TECHLEAD", "X"][i % 3]}
+    for i in range(30)
+]
+
+
+@pytest.fixture
+def service(tmp_path):
+    path = tmp_path / "pipe.pkl"
+    joblib.dump(_make_pipeline(), path)
+    return ModelService(str(path)).load()
+
+
+def test_make_executor_modes(service):
+    assert type(make_executor(service, "inline")) is InferenceExecutor
+    assert isinstance(make_executor(service, "thread", workers=2), ThreadPoolInferenceExecutor)
+    assert make_executor(service, "process", workers=0).workers == (os.cpu_count() or 1)
+    with pytest.raises(ValueError):
+        make_executor(service, "gpu")
+
+
+@pytest.mark.parametrize("mode", ["inline", "thread"])
+def test_executor_parity(service, mode):
+    ex = make_executor(service, mode, workers=2).start()
+    try:
+        expected = service.predict_proba_batch(PAYLOADS)
+        assert np.allclose(ex.predict_proba_batch(PAYLOADS), expected, atol=1e-12)
+        assert ex.predict_proba(PAYLOADS[3]) == pytest.approx(expected[3])
+        assert ex.predict_label_batch(PAYLOADS).tolist() == service.predict_label_batch(PAYLOADS).tolist()
+        stats = ex.stats()
+        assert stats["mode"] == mode
+        assert stats["pending"] == 0
+        assert stats["tasks"] == 3
+    finally:
+        ex.stop()
+
+
+def test_process_executor_parity_and_restart(service):
+    ex = ProcessPoolInferenceExecutor(service, workers=2).start()
+    try:
+        expected = service.predict_proba_batch(PAYLOADS)
+        assert np.allclose(ex.predict_proba_batch(PAYLOADS), expected, atol=1e-12)
+        X = service.transform(PAYLOADS[:4])
+        assert np.allclose(ex.predict_proba_encoded(X), expected[:4], atol=1e-12)
+
+        # un processus tue casse le pool: il est recree et la tache rejouee
+        pids = ex.worker_pids()
+        assert pids
+        os.kill(pids[0], signal.SIGKILL)
+        assert np.allclose(ex.predict_proba_batch(PAYLOADS), expected, atol=1e-12)
+        assert ex.stats()["restarts"] == 1
+        assert ex.stats()["model_version"] == service.version
+
+        # rechargement a chaud: nouveau pool sur la nouvelle version, l'ancienne matrice reste servie
+        old = service.active()
+        X_old = service.transform(PAYLOADS, old)
+        pipe = _make_pipeline()
+        pipe.named_steps["modele"].learning_rate = 0.5
+        joblib.dump(pipe, service.model_path)
+        service.reload()
+        assert np.allclose(ex.predict_proba_batch(PAYLOADS), service.predict_proba_batch(PAYLOADS), atol=1e-12)
+        assert ex.stats()["model_version"] == service.version
+        assert np.allclose(ex.predict_proba_encoded(X_old, old), expected, atol=1e-12)
+    finally:
+        ex.stop()
@@ -0,0 +1,146 @@
+"""Tests pour le feature store en mémoire (employee_features)"""
+import os
+
+import numpy as np
+import pytest
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.api.predict import _normalize_payload
+from app.api.schemas import ALL_FEATURES, COL_NUM
+from app.db.models import EmployeeFeatures
+from app.etl.delta import mark_features_written
+from app.ml.feature_store import FeatureStore
+from app.ml.serve import ActiveModel, ModelService
+
+from tests.test_compiled import REAL_MODEL
+from tests.test_scoring import _employee, engine  # noqa: F401 (fixture)
+
+
+class EncodedService:
+    """Matrice prétraitée = colonne age; proba = age / 100"""
+
+    version = "v-test"
+
+    def __init__(self):
+        self.transforms = 0
+
+    def active(self):
+        return ActiveModel(version=self.version)
+
+    def transform(self, payloads, active=None):
+        self.transforms += 1
+        return np.array([[p["age"]] for p in payloads], dtype=float)
+
+    def predict_proba_encoded(self, X, active=None):
+        return X[:, 0] / 100
+
+
+def test_lookup_and_payloads_match_orm_path(engine):  # noqa: F811
+    store = FeatureStore(EncodedService(), refresh_seconds=0).load(engine)
+    pos, found = store.lookup([3, 42, 1])
+    assert found.tolist() == [True, False, True]
+    with Session(engine) as db:
+        rows = [db.get(EmployeeFeatures, i) for i in (3, 1)]
+    expected = [_normalize_payload({c: getattr(r, c) for c in ALL_FEATURES}) for r in rows]
+    # les numeriques sont stockes en float (niveau_hierarchique_poste est un texte en base)
+    for x in expected:
+        x.update({c: float(x[c]) for c in COL_NUM})
+    assert store.payloads(pos[found]) == expected
+    assert store.get(42) is None
+    assert store.stats()["rows"] == 3
+
+
+def test_predict_proba_uses_encoded_matrix_once_per_version(engine):  # noqa: F811
+    svc = EncodedService()
+    store = FeatureStore(svc, refresh_seconds=0).load(engine)
+    pos, _ = store.lookup([2, 1])
+    assert store.predict_proba(pos) == pytest.approx([0.5, 0.1])
+    store.predict_proba(pos)
+    assert svc.transforms == 1
+    # nouveau modele -> matrice recalculee
+    svc.version = "v2"
+    store.predict_proba(pos)
+    assert svc.transforms == 2
+
+
+def test_refresh_if_stale_detects_table_changes(engine):  # noqa: F811
+    store = FeatureStore(EncodedService(), refresh_seconds=0).load(engine)
+    assert not store.refresh_if_stale()
+    with Session(engine) as db:
+        db.execute(update(EmployeeFeatures).where(EmployeeFeatures.id_employee == 2).values(age=70))
+        db.add(_employee(4, 20))
+        mark_features_written(db.connection())
+        db.commit()
+    assert store.refresh_if_stale()
+    assert store.get(2)["age"] == 70.0
+    assert store.lookup([4])[1][0]
+    assert store.n_reloads == 2
+    assert not store.refresh_if_stale()
+
+
+def test_refresh_follows_write_marker_only(engine):  # noqa: F811
+    store = FeatureStore(EncodedService(), refresh_seconds=0).load(engine)
+    # modification de même longueur, marqueur renouvelé: rechargement
+    with Session(engine) as db:
+        db.execute(update(EmployeeFeatures).where(EmployeeFeatures.id_employee == 1).values(genre=" m "))
+        mark_features_written(db.connection())
+        db.commit()
+    assert store.refresh_if_stale()
+    assert store.get(1)["genre"] == "M"
+
+    # deux marquages successifs donnent toujours deux marqueurs distincts
+    with Session(engine) as db:
+        first = mark_features_written(db.connection())
+        second = mark_features_written(db.connection())
+        db.commit()
+    assert second > first
+    assert store.refresh_if_stale() and not store.refresh_if_stale()
+    # sans marqueur, la table n'est pas relue
+    with Session(engine) as db:
+        db.execute(update(EmployeeFeatures).where(EmployeeFeatures.id_employee == 2).values(heure_supplementaires="non"))
+        db.commit()
+    assert not store.refresh_if_stale()
+
+
+@pytest.mark.skipif(not os.path.exists(REAL_MODEL), reason="model.pkl absent")
+@pytest.mark.parametrize("compiled", [False, True])
+def test_feature_store_parity_on_production_model(engine, compiled):  # noqa: F811
+    svc = ModelService(REAL_MODEL, compiled=compiled).load()
+    store = FeatureStore(svc, refresh_seconds=0).load(engine)
+    with Session(engine) as db:
+        rows = db.query(EmployeeFeatures).order_by(EmployeeFeatures.id_employee).all()
+    payloads = [_normalize_payload({c: getattr(r, c) for c in ALL_FEATURES}) for r in rows]
+    pos, found = store.lookup([r.id_employee for r in rows])
+    assert found.all()
+    assert np.allclose(store.predict_proba(pos), svc.predict_proba_batch(payloads), atol=1e-12)
+
+
+def test_predict_by_id_reads_feature_store(engine, monkeypatch):  # noqa: F811
+    from fastapi.testclient import TestClient
+    from sqlalchemy.orm import sessionmaker
+
+    from app.api import predict as predict_mod
+    from app.db.session import get_db
+    from app.main import create_app
+
+    store = FeatureStore(EncodedService(), refresh_seconds=0).load(engine)
+    monkeypatch.setattr(predict_mod, "feature_store", store)
+    # aucun score materialise et chemin ORM interdit
+    monkeypatch.setattr(predict_mod, "_predict_label", lambda x, version=None: pytest.fail("chemin ORM appele"))
+
+    SessionTest = sessionmaker(bind=engine)
+
+    def _db():
+        db = SessionTest()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = create_app()
+    app.dependency_overrides[get_db] = _db
+    client = TestClient(app)
+    r = client.get("/api/v1/predict/by-id/2", headers={"x-api-key": "test-key"})
+    assert r.status_code == 200
+    assert r.json()["pred_quitte_entreprise"] == "OUI"
@@ -0,0 +1,125 @@
+"""Tests pour le scoring de fichiers CSV / Parquet par blocs"""
+import io
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+os.environ.setdefault("API_KEY", "test-key")
+
+from app.api import predict_file as predict_file_mod
+from app.etl.cleaning import add_log_features, clean_eval, clean_sirh, clean_sondage, merge_sources, to_employee_features
+from app.ml.file_scoring import FileScorer
+from app.ml.scoring import score_frame
+from app.ml.serve import ModelService
+
+from tests.test_compiled import REAL_MODEL
+
+IMPORTS = os.path.join(os.path.dirname(__file__), "..", "imports")
+SIRH = os.path.join(IMPORTS, "extrait_sirh.csv")
+EVAL = os.path.join(IMPORTS, "extrait_eval.csv")
+SONDAGE = os.path.join(IMPORTS, "extrait_sondage.csv")
+
+pytestmark = pytest.mark.skipif(not os.path.exists(REAL_MODEL), reason="model.pkl absent")
+
+
+@pytest.fixture(scope="module")
+def service():
+    return ModelService(REAL_MODEL).load()
+
+
+@pytest.fixture(scope="module")
+def expected(service):
+    # référence: même chaîne que create_db.py puis employee_scores
+    df = merge_sources(
+        clean_sirh(pd.read_csv(SIRH)), clean_eval(pd.read_csv(EVAL)), clean_sondage(pd.read_csv(SONDAGE))
+    )
+    features = to_employee_features(add_log_features(df))
+    return features["id_employee"].to_numpy(), np.asarray(score_frame(features, service), dtype=float)
+
+
+def test_score_file_chunks_match_etl_path(service, expected, tmp_path):
+    dst = tmp_path / "scores.csv"
+    scorer = FileScorer(service, chunk_size=400, eval_path=EVAL, sondage_path=SONDAGE)
+    stats = scorer.score_file(SIRH, str(dst))
+
+    assert stats["chunks"] == 4
+    assert stats["rows_in"] == stats["rows_scored"] == len(expected[0])
+    assert stats["model_version"] == service.version
+    out = pd.read_csv(dst)
+    assert list(out.columns) == ["id_employee", "proba", "pred_quitte_entreprise", "model_version"]
+    assert np.array_equal(out["id_employee"], expected[0])
+    assert np.allclose(out["proba"], expected[1])
+    assert set(out["pred_quitte_entreprise"]) <= {"OUI", "NON"}
+
+
+def test_score_file_parquet_merged_input(service, expected, tmp_path):
+    pytest.importorskip("pyarrow")
+    # fichier déjà fusionné (colonnes des trois extraits), sans identifiant sur une ligne
+    merged = pd.read_csv(SIRH).merge(
+        pd.read_csv(EVAL).assign(id_employee=lambda d: d["eval_number"].str.extract(r"(\d+)")[0].astype(int)),
+        on="id_employee",
+    )
+    merged.loc[0, "id_employee"] = None
+    src, dst = tmp_path / "in.parquet", tmp_path / "out.parquet"
+    merged.to_parquet(src, index=False)
+
+    stats = FileScorer(service, chunk_size=500, sondage_path=SONDAGE).score_file(str(src), str(dst))
+
+    assert stats["rows_skipped"] == 1
+    out = pd.read_parquet(dst)
+    assert len(out) == len(merged) - 1
+    assert np.allclose(out["proba"], expected[1][1:])
+
+
+def test_score_file_empty_input(service, tmp_path):
+    src, dst = tmp_path / "vide.csv", tmp_path / "out.csv"
+    src.write_text("id_employee,age\n", encoding="utf-8")
+    stats = FileScorer(service).score_file(str(src), str(dst))
+    assert stats["rows_scored"] == 0
+    assert list(pd.read_csv(dst).columns) == ["id_employee", "proba", "pred_quitte_entreprise", "model_version"]
+
+
+def test_score_chunk_without_employee_id_raises_value_error(service):
+    with pytest.raises(ValueError, match="id_employee"):
+        FileScorer(service).score_chunk(pd.DataFrame({"age": [30], "genre": ["M"]}), service.active())
+
+
+@pytest.fixture
+def client(service, monkeypatch):
+    monkeypatch.setattr(
+        predict_file_mod, "FileScorer", lambda chunk_size: FileScorer(service, chunk_size=chunk_size)
+    )
+    app = FastAPI()
+    app.include_router(predict_file_mod.router, prefix="/api/v1")
+    return TestClient(app)
+
+
+def test_predict_file_endpoint(client, service):
+    frame = to_employee_features(add_log_features(merge_sources(
+        clean_sirh(pd.read_csv(SIRH)), clean_eval(pd.read_csv(EVAL)), clean_sondage(pd.read_csv(SONDAGE))
+    )))
+    body = frame.head(50).to_csv(index=False).encode("utf-8")
+    headers = {"X-API-Key": "test-key", "Content-Type": "text/csv"}
+
+    r = client.post("/api/v1/predict/file", content=body, headers=headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/csv")
+    assert r.headers["x-rows-scored"] == "50"
+    assert r.headers["x-model-version"] == service.version
+    out = pd.read_csv(io.BytesIO(r.content))
+    assert np.allclose(out["proba"], score_frame(frame.head(50), service))
+
+    # sans identifiant employé -> 422
+    r = client.post("/api/v1/predict/file", content=b"age,genre\n30,M\n", headers=headers)
+    assert r.status_code == 422
+    assert "id_employee" in r.json()["detail"]
+
+    # format inconnu -> 415 ; sans clé -> 401
+    r = client.post("/api/v1/predict/file", content=body, headers={**headers, "Content-Type": "application/json"})
+    assert r.status_code == 415
+    r = client.post("/api/v1/predict/file", content=body, headers={"Content-Type": "text/csv"})
+    assert r.status_code == 401
@@ -0,0 +1,233 @@
+"""Tests pour les jobs de scoring asynchrones (soumission, reprise, pagination)"""
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+
+os.environ.setdefault("API_KEY", "test-key")
+
+from app.api import jobs as jobs_api
+from app.db.base import Base
+from app.db.models import ScoringJob
+from app.etl.cleaning import add_log_features, clean_eval, clean_sirh, clean_sondage, merge_sources, to_employee_features
+from app.ml import jobs as jobs_mod
+from app.ml.jobs import JobRunner, filter_clauses
+from app.ml.scoring import score_frame
+from app.ml.serve import ModelService
+
+from tests.test_compiled import REAL_MODEL
+from tests.test_file_scoring import EVAL, SIRH, SONDAGE
+
+pytestmark = pytest.mark.skipif(not os.path.exists(REAL_MODEL), reason="model.pkl absent")
+
+
+@pytest.fixture(scope="module")
+def service():
+    return ModelService(REAL_MODEL).load()
+
+
+@pytest.fixture(scope="module")
+def features():
+    return to_employee_features(add_log_features(merge_sources(
+        clean_sirh(pd.read_csv(SIRH)), clean_eval(pd.read_csv(EVAL)), clean_sondage(pd.read_csv(SONDAGE))
+    )))
+
+
+@pytest.fixture
+def engine(features, tmp_path):
+    # base sur fichier: une connexion par thread, comme en production (pas de connexion partagée)
+    eng = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=eng)
+    features.to_sql("employee_features", con=eng, if_exists="append", index=False)
+    return eng
+
+
+def _runner(engine, service, tmp_path, **kw):
+    kw.setdefault("workers", 0)
+    return JobRunner(engine, service, chunk_size=kw.pop("chunk_size", 100), jobs_dir=str(tmp_path / "jobs"), **kw)
+
+
+def _all_results(runner, job_id):
+    return pd.DataFrame(runner.results(job_id, limit=100000))
+
+
+def test_ids_job_scores_and_counts_missing(engine, service, features, tmp_path):
+    runner = _runner(engine, service, tmp_path)
+    job = runner.submit_ids([4, 1, 2, 2, 999999])
+    assert job["status"] == "pending" and job["total"] == 4
+
+    assert runner.run_once() is True
+    assert runner.run_once() is False
+    status = runner.status(job["job_id"])
+    assert status["status"] == "succeeded"
+    assert (status["rows_scored"], status["rows_skipped"], status["progress"]) == (3, 1, 1.0)
+
+    out = _all_results(runner, job["job_id"])
+    assert list(out["seq"]) == [0, 1, 2]
+    assert list(out["id_employee"]) == [1, 2, 4]
+    expected = score_frame(features[features["id_employee"].isin([1, 2, 4])], service)
+    assert np.allclose(out["proba"], expected)
+    assert set(out["model_version"]) == {service.version}
+
+
+class _Crash(BaseException):
+    """Arrêt brutal du processus au milieu d'un job (non intercepté par le runner)"""
+
+
+def test_filter_job_resumes_from_last_committed_chunk(engine, service, features, tmp_path, monkeypatch):
+    spec = {"age": {"gte": 30}, "departement": ["COMMERCIAL", "CONSULTING"]}
+    first = _runner(engine, service, tmp_path)
+    job_id = first.submit_filter(spec)["job_id"]
+
+    commit = first._commit_chunk
+
+    def crash_after_two(job, *args):
+        if job["chunks_done"] == 2:
+            raise _Crash()
+        return commit(job, *args)
+
+    monkeypatch.setattr(first, "_commit_chunk", crash_after_two)
+    with pytest.raises(_Crash):
+        first.run_once()
+    # processus "mort": le job reste running, 200 lignes commitées
+    jobs_mod._LIVE_OWNERS.discard(first.owner)
+    assert first.status(job_id)["status"] == "running"
+    assert first.status(job_id)["rows_scored"] == 200
+
+    second = _runner(engine, service, tmp_path)
+    assert second.run_once() is True
+    status = second.status(job_id)
+    assert status["status"] == "succeeded"
+    assert status["attempts"] == 2 and second.n_resumed == 1
+
+    with engine.connect() as conn:
+        expected_ids = sorted(
+            conn.execute(select(jobs_mod.EmployeeFeatures.id_employee).where(*filter_clauses(spec))).scalars()
+        )
+    out = _all_results(second, job_id)
+    assert status["rows_scored"] == status["total"] == len(expected_ids)
+    assert list(out["seq"]) == list(range(len(expected_ids)))
+    assert list(out["id_employee"]) == expected_ids
+    ref = features.set_index("id_employee").loc[expected_ids].reset_index()
+    assert np.allclose(out["proba"], score_frame(ref, service))
+
+
+def test_running_job_with_live_owner_is_not_reclaimed(engine, service, tmp_path):
+    a = _runner(engine, service, tmp_path)
+    job_id = a.submit_ids([1])["job_id"]
+    assert a._claim()["id"] == job_id
+    b = _runner(engine, service, tmp_path)
+    assert b._claim() is None
+    # battement de cœur trop ancien: repris malgré un propriétaire vivant
+    c = _runner(engine, service, tmp_path, stale_seconds=-1)
+    assert c._claim()["id"] == job_id
+
+
+def test_stale_claim_cannot_write_after_reclaim(engine, service, tmp_path):
+    # deux threads d'un même runner (même owner): seule la dernière réservation peut écrire
+    runner = _runner(engine, service, tmp_path, stale_seconds=-1)
+    job_id = runner.submit_ids([1, 2])["job_id"]
+    stale = runner._claim()
+    fresh = runner._claim()
+    assert (stale["id"], fresh["attempts"]) == (job_id, stale["attempts"] + 1)
+
+    scored = pd.DataFrame({"id_employee": [1], "proba": [0.5], "pred_quitte_entreprise": ["OUI"]})
+    assert runner._commit_chunk(stale, scored, 0, 1, None, "v") is False
+    runner._finish(stale, "failed", "périmé")
+    assert runner.status(job_id)["status"] == "running"
+    assert runner._commit_chunk(fresh, scored, 0, 1, None, "v") is True
+    assert [r["seq"] for r in runner.results(job_id)] == [0]
+
+
+def test_heartbeat_refreshed_during_long_chunk(engine, service, tmp_path, monkeypatch):
+    runner = _runner(engine, service, tmp_path, stale_seconds=0.3)
+    job_id = runner.submit_ids([1])["job_id"]
+    job = runner._claim()
+    chunks = runner._chunks
+
+    def slow_chunks(*args):
+        for item in chunks(*args):
+            time.sleep(0.6)
+            # bloc plus long que stale_seconds: un autre runner ne peut pas reprendre le job
+            assert _runner(engine, service, tmp_path, stale_seconds=0.3)._claim() is None
+            yield item
+
+    monkeypatch.setattr(runner, "_chunks", slow_chunks)
+    assert runner.run_job(job) == "succeeded"
+    assert runner.status(job_id)["attempts"] == 1
+
+
+def test_file_job_and_unknown_filter(engine, service, tmp_path):
+    runner = _runner(engine, service, tmp_path, chunk_size=500)
+    upload = tmp_path / "upload.csv"
+    shutil.copy(SIRH, upload)
+    job = runner.submit_file(str(upload), "csv")
+    assert not upload.exists() and job["total"] is None
+
+    runner.run_once()
+    status = runner.status(job["job_id"])
+    assert status["status"] == "succeeded"
+    assert (status["rows_scored"], status["chunks_done"]) == (1470, 3)
+    assert os.listdir(tmp_path / "jobs") == []
+
+    with pytest.raises(ValueError):
+        runner.submit_filter({"salaire_secret": 1})
+    with pytest.raises(ValueError):
+        runner.submit_filter({"age": {"between": [1, 2]}})
+
+
+def test_failed_job_reports_error(engine, tmp_path):
+    runner = _runner(engine, ModelService(str(tmp_path / "absent.pkl")), tmp_path)
+    job_id = runner.submit_ids([1])["job_id"]
+    runner.run_once()
+    status = runner.status(job_id)
+    assert status["status"] == "failed"
+    assert "FileNotFoundError" in status["error"]
+
+
+def test_jobs_endpoints(engine, service, tmp_path, monkeypatch):
+    runner = _runner(engine, service, tmp_path, workers=2, poll_seconds=0.05)
+    monkeypatch.setattr(jobs_api, "job_runner", runner)
+    app = FastAPI()
+    app.include_router(jobs_api.router, prefix="/api/v1")
+    client = TestClient(app)
+    headers = {"X-API-Key": "test-key"}
+
+    r = client.post("/api/v1/jobs", json={"filter": {"genre": "F"}}, headers=headers)
+    assert r.status_code == 202
+    job_id = r.json()["job_id"]
+    assert r.json()["status"] == "pending"
+
+    runner.start()
+    try:
+        deadline = time.time() + 30
+        while client.get(f"/api/v1/jobs/{job_id}", headers=headers).json()["status"] != "succeeded":
+            assert time.time() < deadline
+            time.sleep(0.05)
+    finally:
+        runner.stop()
+
+    status = client.get(f"/api/v1/jobs/{job_id}", headers=headers).json()
+    assert status["rows_per_second"] > 0 and status["progress"] == 1.0
+
+    seen, after = [], -1
+    while True:
+        page = client.get(f"/api/v1/jobs/{job_id}/results", params={"after": after, "limit": 250}, headers=headers).json()
+        if not page["items"]:
+            break
+        seen.extend(item["id_employee"] for item in page["items"])
+        after = page["next_after"]
+    assert len(seen) == len(set(seen)) == status["total"]
+
+    assert client.get("/api/v1/jobs/inconnu", headers=headers).status_code == 404
+    assert client.post("/api/v1/jobs", json={"ids": [1], "filter": {}}, headers=headers).status_code == 422
+    assert client.post("/api/v1/jobs", json={"filter": {"nope": 1}}, headers=headers).status_code == 422
+    assert client.post("/api/v1/jobs", json={"ids": [1]}).status_code == 401
+    with engine.connect() as conn:
+        assert conn.execute(select(ScoringJob.status).where(ScoringJob.id == job_id)).scalar_one() == "succeeded"
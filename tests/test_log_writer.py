@@ -0,0 +1,102 @@
+"""Tests pour l'écriture des logs de prédiction en arrière-plan"""
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.base import Base
+from app.db.log_writer import PredictionLogWriter
+from app.db.models import PredictionLog
+
+from tests.test_db import _log
+
+
+@pytest.fixture
+def session_factory():
+    eng = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=eng)
+    return sessionmaker(bind=eng)
+
+
+def _count(session_factory):
+    with session_factory() as db:
+        return db.query(PredictionLog).count()
+
+
+def test_writer_inline_when_stopped(session_factory):
+    writer = PredictionLogWriter(session_factory)
+    assert writer.write(_log(1))
+    assert _count(session_factory) == 1
+    assert writer.stats()["written"] == 1
+
+
+def test_writer_batches_and_drains_on_stop(session_factory):
+    writer = PredictionLogWriter(session_factory, batch_size=50, flush_interval_ms=10000).start()
+    assert writer.write_many([_log(i) for i in range(1, 121)]) == 120
+    writer.stop()
+    assert not writer.running
+    assert _count(session_factory) == 120
+    stats = writer.stats()
+    assert stats["written"] == 120
+    assert stats["queue_depth"] == 0
+    # 120 records en lots de 50 au plus
+    assert stats["flushes"] >= 3
+
+
+def test_writer_drops_when_queue_full(session_factory):
+    gate = threading.Event()
+
+    def slow_factory():
+        gate.wait(5)
+        return session_factory()
+
+    writer = PredictionLogWriter(slow_factory, max_queue=2, batch_size=1, flush_interval_ms=0).start()
+    # le premier record est pris par le thread (bloque sur gate), les deux suivants remplissent la file
+    writer.write(_log(1))
+    for _ in range(100):
+        if writer.stats()["queue_depth"] == 0:
+            break
+        time.sleep(0.01)
+    accepted = writer.write_many([_log(i) for i in range(2, 6)])
+    assert accepted == 2
+    assert writer.stats()["dropped"] == 2
+    gate.set()
+    writer.stop()
+    assert _count(session_factory) == 3
+
+
+def test_writer_counts_failures(session_factory):
+    writer = PredictionLogWriter(sessionmaker(bind=create_engine("sqlite://")))  # tables absentes
+    writer.write(_log(1))
+    assert writer.stats()["failed"] == 1
+
+
+def test_predict_needs_no_db_session(monkeypatch, session_factory):
+    from fastapi.testclient import TestClient
+
+    from app.api import predict as predict_mod
+    from app.db.session import get_db
+    from app.main import create_app
+    from app.ml import serve as serve_mod
+
+    monkeypatch.setattr(serve_mod.model_service, "predict_proba", lambda payload: 0.9)
+    writer = PredictionLogWriter(session_factory)
+    monkeypatch.setattr(predict_mod, "log_writer", writer)
+
+    def _no_db():
+        raise AssertionError("/predict ne doit pas ouvrir de session")
+
+    app = create_app()
+    app.dependency_overrides[get_db] = _no_db
+    r = TestClient(app).post(
+        "/api/v1/predict", json={"id_employee": 7, "age": 30}, headers={"x-api-key": "test-key"}
+    )
+    assert r.status_code == 200
+    with session_factory() as db:
+        row = db.query(PredictionLog).one()
+    assert row.employee_id == 7
+    assert row.output["pred_quitte_entreprise"] == "OUI"
+    assert "model_version" in row.output
@@ -37,6 +37,7 @@ def test_model_service_load_and_predict_with_dummy_model(tmp_path, monkeypatch):
     
     # Vérifier que le modèle est chargé
     assert svc.model is not None
+    assert svc.version is not None and len(svc.version) == 12
     
     # Test predict_proba
     payload = {f"feature_{i}": 0.5 for i in range(5)}
@@ -65,3 +66,23 @@ def test_model_service_predict_uses_threshold():
     svc.predict_proba = MagicMock(return_value=0.1)  # < SEUIL_FIXE
     assert svc.predict_label({}) == 0
 
+
+def test_model_service_batch_matches_single(tmp_path):
+    """Test que predict_proba_batch donne les mêmes probas que des appels unitaires"""
+    from sklearn.ensemble import RandomForestClassifier
+    import pandas as pd
+    rng = np.random.RandomState(0)
+    X_train = pd.DataFrame(rng.rand(30, 3), columns=["a", "b", "c"])
+    y_train = rng.randint(0, 2, 30)
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(X_train, y_train)
+    model_path = tmp_path / "rf.pkl"
+    joblib.dump(model, model_path)
+
+    svc = ModelService(str(model_path)).load()
+    payloads = [{"a": float(r[0]), "b": float(r[1]), "c": float(r[2])} for r in rng.rand(7, 3)]
+    batch = svc.predict_proba_batch(payloads)
+    single = [svc.predict_proba(p) for p in payloads]
+    assert batch.shape == (7,)
+    assert np.allclose(batch, single)
+    assert list(svc.predict_label_batch(payloads)) == [int(p >= SEUIL_FIXE) for p in single]
+    assert svc.predict_proba_batch([]).shape == (0,)
@@ -0,0 +1,175 @@
+"""Tests pour le re-scoring complet de la population (employee_scores)"""
+import json
+import logging
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, insert, inspect, select, text, update
+from sqlalchemy.pool import StaticPool
+
+from app.api import stats  # noqa: F401  (ordre d'import des modules ML)
+from app.db.base import Base
+from app.db.models import EmployeeFeatures, EmployeeScore
+from app.db.schema import add_missing_columns
+from app.ml.executor import make_executor
+from app.ml.population import PopulationScorer, iter_feature_pages, rescore_employees
+from app.ml.scoring import features_hash, score_frame
+from app.ml.serve import ModelService
+
+from tests.test_compiled import REAL_MODEL
+from tests.test_jobs import features  # noqa: F401  (fixture)
+
+pytestmark = pytest.mark.skipif(not os.path.exists(REAL_MODEL), reason="model.pkl absent")
+
+
+@pytest.fixture(scope="module")
+def service():
+    return ModelService(REAL_MODEL).load()
+
+
+@pytest.fixture
+def engine(features):
+    eng = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=eng)
+    features.to_sql("employee_features", con=eng, if_exists="append", index=False)
+    with eng.begin() as conn:
+        # score d'un employé disparu et score périmé d'un employé existant
+        old = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        conn.execute(insert(EmployeeScore), [
+            {"id_employee": 999999, "proba": 0.5, "pred_quitte_entreprise": "OUI", "model_version": "old", "scored_at": old},
+            {"id_employee": 1, "proba": 0.0, "pred_quitte_entreprise": "NON", "model_version": "old", "scored_at": old},
+        ])
+    return eng
+
+
+def _scores(engine):
+    with engine.connect() as conn:
+        return pd.read_sql(select(EmployeeScore).order_by(EmployeeScore.id_employee), conn)
+
+
+def test_iter_feature_pages_is_keyset_paginated(engine, features):
+    pages = list(iter_feature_pages(engine, 400))
+    assert [len(p) for p in pages] == [400, 400, 400, 270]
+    ids = np.concatenate([p["id_employee"].to_numpy() for p in pages])
+    assert np.array_equal(ids, np.sort(features["id_employee"].to_numpy()))
+
+
+@pytest.mark.parametrize("mode,parallelism", [("inline", 1), ("thread", 3)])
+def test_population_scorer_upserts_and_prunes(engine, service, features, mode, parallelism):
+    executor = make_executor(service, mode, workers=parallelism).start()
+    seen = []
+    try:
+        stats = PopulationScorer(engine, service, executor, chunk_size=500, parallelism=parallelism).run(progress=seen.append)
+    finally:
+        executor.stop()
+
+    assert (stats["rows"], stats["chunks"], stats["pruned"]) == (1470, 3, 1)
+    assert stats["rows_per_second"] > 0
+    assert [s["rows"] for s in seen] == [500, 1000, 1470]
+    out = _scores(engine)
+    ref = features.sort_values("id_employee")
+    assert np.array_equal(out["id_employee"], ref["id_employee"])
+    assert np.allclose(out["proba"], score_frame(ref, service))
+    assert set(out["model_version"]) == {service.version}
+    assert out["scored_at"].nunique() == 1
+
+
+def _cli_stats(caplog):
+    # bilan JSON du dernier passage, journalisé par le script
+    message = [r.getMessage() for r in caplog.records if r.getMessage().startswith("Passage terminé: ")][-1]
+    caplog.clear()
+    return json.loads(message.split(": ", 1)[1])
+
+
+def test_score_population_cli(tmp_path, features, caplog):
+    from scripts.score_population import main
+
+    db = tmp_path / "pop.db"
+    eng = create_engine(f"sqlite:///{db}")
+    Base.metadata.create_all(bind=eng)
+    features.to_sql("employee_features", con=eng, if_exists="append", index=False)
+
+    caplog.set_level(logging.INFO, logger="score_population")
+    assert main(["--database-url", f"sqlite:///{db}", "--model", REAL_MODEL, "--chunk-size", "700", "--nice", "0"]) == 0
+    stats = _cli_stats(caplog)
+    assert (stats["rows"], stats["chunks"]) == (1470, 3)
+    assert len(_scores(eng)) == 1470
+
+    main(["--database-url", f"sqlite:///{db}", "--model", REAL_MODEL, "--nice", "0", "--incremental"])
+    stats = _cli_stats(caplog)
+    assert (stats["rescored"], stats["skipped"]) == (0, 1470)
+
+
+def test_features_hash_is_stable_on_normalized_inputs(features):
+    rows = features.head(3).copy()
+    variant = rows.copy()
+    variant["genre"] = variant["genre"].map(lambda g: f" {g.lower()} ")
+    variant["age"] = variant["age"].astype(float)
+    assert list(features_hash(rows)) == list(features_hash(variant))
+    assert len(features_hash(rows)[0]) == 16
+
+    variant.loc[variant.index[1], "age"] += 1
+    changed = features_hash(variant) != features_hash(rows)
+    assert list(changed) == [False, True, False]
+
+
+def test_incremental_run_rescores_only_changed_rows(engine, service, features):
+    scorer = PopulationScorer(engine, service, chunk_size=500)
+    first = scorer.run()
+    assert (first["rescored"], first["skipped"]) == (1470, 0)
+
+    with engine.begin() as conn:
+        conn.execute(update(EmployeeFeatures).where(EmployeeFeatures.id_employee.in_([1, 2, 4])).values(age=EmployeeFeatures.age + 1))
+        # espaces/casse: même entrée du modèle, pas de re-scoring
+        conn.execute(update(EmployeeFeatures).where(EmployeeFeatures.id_employee == 5).values(genre=" f "))
+        conn.execute(update(EmployeeScore).where(EmployeeScore.id_employee == 7).values(model_version="old"))
+        conn.execute(text("DELETE FROM employee_features WHERE id_employee = 8"))
+
+    second = scorer.run(incremental=True)
+    assert (second["rows"], second["rescored"], second["skipped"], second["pruned"]) == (1469, 4, 1465, 1)
+
+    with engine.connect() as conn:
+        current = pd.read_sql(select(EmployeeFeatures).order_by(EmployeeFeatures.id_employee), conn)
+    out = _scores(engine)
+    assert np.array_equal(out["id_employee"], current["id_employee"])
+    assert np.allclose(out["proba"], score_frame(current, service))
+    assert list(out["features_hash"]) == list(features_hash(current))
+    assert set(out["model_version"]) == {service.version}
+
+    third = scorer.run(incremental=True)
+    assert (third["rescored"], third["skipped"]) == (0, 1469)
+
+
+def test_add_missing_columns_upgrades_existing_table():
+    eng = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    with eng.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE employee_scores (id_employee INTEGER PRIMARY KEY, proba FLOAT NOT NULL, "
+            "pred_quitte_entreprise VARCHAR NOT NULL, model_version VARCHAR, scored_at DATETIME NOT NULL)"
+        ))
+    assert "employee_scores.features_hash" in add_missing_columns(eng)
+    assert "features_hash" in {c["name"] for c in inspect(eng).get_columns("employee_scores")}
+    assert add_missing_columns(eng) == []
+
+
+def test_rescore_employees_updates_only_given_ids(engine, service, features):
+    PopulationScorer(engine, service, chunk_size=500).run(prune=False)
+    with engine.begin() as conn:
+        conn.execute(update(EmployeeFeatures).where(EmployeeFeatures.id_employee.in_([1, 2])).values(age=EmployeeFeatures.age + 5))
+        conn.execute(update(EmployeeFeatures).where(EmployeeFeatures.id_employee == 4).values(age=EmployeeFeatures.age + 5))
+        conn.execute(text("DELETE FROM employee_features WHERE id_employee = 7"))
+    before = _scores(engine).set_index("id_employee")
+
+    stats = rescore_employees(engine, [2, 1, 7, 999999], service, batch_size=2)
+    assert stats == {"rescored": 2, "deleted": 2}
+
+    out = _scores(engine).set_index("id_employee")
+    assert 7 not in out.index and 999999 not in out.index
+    with engine.connect() as conn:
+        current = pd.read_sql(select(EmployeeFeatures).where(EmployeeFeatures.id_employee.in_([1, 2, 4])).order_by(EmployeeFeatures.id_employee), conn)
+    assert np.allclose(out.loc[[1, 2], "proba"], score_frame(current.iloc[:2], service))
+    # id 4 modifié mais non transmis: score inchangé
+    assert out.loc[4, "proba"] == before.loc[4, "proba"]
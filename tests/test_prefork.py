@@ -0,0 +1,85 @@
+"""Tests pour le mode multi-workers (prefork) et la mesure mémoire"""
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import joblib
+import numpy as np
+import pytest
+
+from app.core.memory import process_memory
+from app.ml.serve import ModelService
+
+from tests.test_compiled import REAL_MODEL
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_process_memory_current_process():
+    mem = process_memory()
+    assert mem["pid"] == os.getpid()
+    if os.path.exists("/proc/self/smaps_rollup"):
+        assert mem["rss_bytes"] > 0
+        assert 0 < mem["pss_bytes"] <= mem["rss_bytes"]
+
+
+def test_model_service_mmap_load(tmp_path):
+    from tests.test_compiled import _make_pipeline
+
+    path = tmp_path / "pipe.pkl"
+    joblib.dump(_make_pipeline(), path)
+    ref = ModelService(str(path)).load()
+    svc = ModelService(str(path), mmap=True).load()
+    assert svc.version == ref.version
+    payloads = [{"age": 30.0, "distance": 2.0, "frequence": "AUCUN", "genre": "F", "poste": "MANAGER"}]
+    assert np.allclose(svc.predict_proba_batch(payloads), ref.predict_proba_batch(payloads))
+
+
+def _children(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return sorted(int(p) for p in f.read().split())
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="fork + /proc requis")
+@pytest.mark.skipif(not os.path.exists(REAL_MODEL), reason="model.pkl absent")
+def test_prefork_workers_share_state_and_restart(tmp_path):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'app.db'}", API_KEY="k")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.prefork", "--workers", "2", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.time() + 90
+        while True:
+            try:
+                r = httpx.get(f"http://127.0.0.1:{port}/api/v1/stats", headers={"x-api-key": "k"}, timeout=2)
+                break
+            except httpx.TransportError:
+                assert proc.poll() is None and time.time() < deadline
+                time.sleep(0.5)
+        body = r.json()
+        assert body["model"]["loaded"]
+        assert body["process"]["pid"] in _children(proc.pid)
+
+        # un worker tue est remplace
+        workers = _children(proc.pid)
+        assert len(workers) == 2
+        os.kill(workers[0], signal.SIGKILL)
+        deadline = time.time() + 30
+        while True:
+            now = _children(proc.pid)
+            if len(now) == 2 and workers[0] not in now:
+                break
+            assert time.time() < deadline
+            time.sleep(0.2)
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+    assert proc.returncode == 0
@@ -0,0 +1,59 @@
+"""Tests pour le registre de modèles (un chargement par contenu)"""
+import shutil
+
+import joblib
+import pytest
+
+from app.ml.registry import ModelRegistry, model_registry
+from app.ml.serve import ModelService
+
+from tests.test_compiled import _make_pipeline
+
+
+@pytest.fixture
+def model_file(tmp_path):
+    path = tmp_path / "pipe.pkl"
+    joblib.dump(_make_pipeline(), path)
+    return path
+
+
+def test_registry_loads_each_content_once(model_file, tmp_path):
+    reg = ModelRegistry()
+    a = reg.get(str(model_file))
+    # meme contenu sous un autre chemin -> meme instance
+    copy = tmp_path / "copie.pkl"
+    shutil.copy(model_file, copy)
+    b = reg.get(str(copy))
+    assert b.model is a.model
+    assert reg.loads == 1 and reg.hits == 1
+    stats = reg.stats()
+    assert stats["artifacts"][0]["file_bytes"] == model_file.stat().st_size
+    assert stats["artifacts"][0]["load_seconds"] >= 0
+
+    # contenu different -> nouveau chargement
+    joblib.dump(_make_pipeline(), copy, compress=3)
+    c = reg.get(str(copy))
+    assert c.model is not a.model
+    assert c.version != a.version
+    assert reg.loads == 2
+    assert reg.release(a.version) == 1
+    assert len(reg.artifacts()) == 1
+    with pytest.raises(FileNotFoundError):
+        reg.get(str(tmp_path / "absent.pkl"))
+
+
+def test_model_services_share_registry_instance(model_file):
+    s1 = ModelService(str(model_file)).load()
+    s2 = ModelService(str(model_file), compiled=True).load()
+    assert s1.model is s2.model
+    assert s1.version == s2.version
+    assert any(a.version == s1.version for a in model_registry.artifacts())
+
+
+def test_get_model_returns_served_model(model_file, monkeypatch):
+    from app.ml import model_loader
+
+    svc = ModelService(str(model_file))
+    monkeypatch.setattr(model_loader, "model_service", svc)
+    assert model_loader.get_model() is svc.model
+    assert svc.model is not None
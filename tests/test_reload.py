@@ -0,0 +1,131 @@
+"""Tests pour le rechargement à chaud du modèle (bascule atomique)"""
+import joblib
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sklearn.dummy import DummyClassifier
+
+from app.ml.reload import ModelReloader
+from app.ml.serve import ModelService, ModelValidationError, file_version
+
+from tests.test_compiled import _make_pipeline
+
+
+def _variant(learning_rate):
+    # meme pipeline, probabilites differentes (learning_rate lu a la prediction)
+    pipe = _make_pipeline()
+    pipe.named_steps["modele"].learning_rate = learning_rate
+    return pipe
+
+
+@pytest.fixture
+def model_file(tmp_path):
+    path = tmp_path / "model.pkl"
+    joblib.dump(_variant(0.1), path)
+    return path
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+def test_reload_swaps_validated_model(model_file, compiled):
+    svc = ModelService(str(model_file), compiled=compiled).load()
+    payloads = [{"age": 30.0, "distance": 2.0, "frequence": "FREQUENT", "genre": "F", "poste": "MANAGER"}]
+    before = svc.predict_proba_batch(payloads)
+    old = svc.active()
+
+    # meme fichier -> pas de bascule
+    assert svc.reload()["swapped"] is False
+
+    joblib.dump(_variant(0.5), model_file)
+    result = svc.reload()
+    assert result["swapped"] is True
+    assert result["previous_version"] == old.version
+    assert svc.version == result["version"] != old.version
+    assert svc.compiled_active is compiled
+    after = svc.predict_proba_batch(payloads)
+    assert not np.allclose(before, after)
+    # une requete commencee avant la bascule termine sur l'ancien modele
+    assert np.array_equal(svc.predict_proba_batch(payloads, old), before)
+    assert svc.stats()["reloads"] == 1
+
+
+def test_reload_rejects_invalid_model_and_keeps_current(model_file, tmp_path):
+    svc = ModelService(str(model_file)).load()
+    version = svc.version
+    bad = tmp_path / "bad.pkl"
+    # classes sans la classe positive
+    joblib.dump(DummyClassifier().fit([[0], [1]], [2, 3]), bad)
+    with pytest.raises(ModelValidationError):
+        svc.reload(str(bad))
+    (tmp_path / "corrompu.pkl").write_bytes(b"pas un pickle")
+    with pytest.raises(ModelValidationError):
+        svc.reload(str(tmp_path / "corrompu.pkl"))
+    assert svc.version == version
+    assert svc.model_path == str(model_file)
+    assert svc.stats()["reload_failures"] == 2
+    assert svc.stats()["last_reload_error"]
+
+
+def test_reload_rejects_truncated_artifact_and_releases_candidate(model_file, tmp_path):
+    from app.ml.registry import model_registry
+
+    svc = ModelService(str(model_file)).load()
+    version = svc.version
+    # pickle tronqué: EOFError / UnpicklingError à la désérialisation
+    data = model_file.read_bytes()
+    truncated = tmp_path / "tronque.pkl"
+    truncated.write_bytes(data[: len(data) // 2])
+    with pytest.raises(ModelValidationError):
+        svc.reload(str(truncated))
+    # artefact lisible mais refusé: il ne reste pas dans le registre
+    bad = tmp_path / "bad.pkl"
+    joblib.dump(DummyClassifier().fit([[0], [1]], [2, 3]), bad)
+    with pytest.raises(ModelValidationError):
+        svc.reload(str(bad))
+    versions = {a.version for a in model_registry.artifacts()}
+    assert version in versions
+    assert file_version(str(bad)) not in versions
+    assert svc.version == version
+    assert svc.stats()["reload_failures"] == 2
+
+
+def test_reloader_watches_file(model_file):
+    svc = ModelService(str(model_file)).load()
+    reloader = ModelReloader(svc, watch_seconds=0)
+    reloader.start()
+    assert reloader.check() is None
+    version = svc.version
+
+    joblib.dump(_variant(0.5), model_file)
+    assert reloader.check()["swapped"] is True
+    assert svc.version != version
+
+    # fichier refuse: modele conserve, pas de nouvelle tentative tant qu'il ne change pas
+    joblib.dump(DummyClassifier().fit([[0], [1]], [0, 0]), model_file)
+    version = svc.version
+    assert reloader.check() is None
+    assert reloader.check() is None
+    assert svc.version == version
+    assert svc.stats()["reload_failures"] == 1
+
+
+def test_admin_reload_endpoint(model_file, monkeypatch):
+    from app.api import admin
+
+    svc = ModelService(str(model_file)).load()
+    monkeypatch.setattr(admin, "model_reloader", ModelReloader(svc))
+    app = FastAPI()
+    app.include_router(admin.router, prefix="/api/v1")
+    client = TestClient(app)
+    headers = {"x-api-key": "test-key"}
+
+    assert client.post("/api/v1/admin/model/reload").status_code == 401
+    joblib.dump(_variant(0.5), model_file)
+    r = client.post("/api/v1/admin/model/reload", headers=headers)
+    assert r.status_code == 200
+    assert r.json()["swapped"] is True
+    assert r.json()["version"] == svc.version
+
+    joblib.dump(DummyClassifier().fit([[0], [1]], [2, 3]), model_file)
+    r = client.post("/api/v1/admin/model/reload", headers=headers)
+    assert r.status_code == 422
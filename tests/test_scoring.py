@@ -0,0 +1,159 @@
+"""Tests pour les scores matérialisés (employee_scores)"""
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api.predict import _normalize_payload
+from app.api.schemas import ALL_FEATURES
+from app.db.base import Base
+from app.db.models import EmployeeFeatures, EmployeeScore
+from app.ml.scoring import normalize_frame, rebuild_employee_scores, scores_are_current
+
+
+class FakeService:
+    """Proba = age / 100, version fixe"""
+
+    version = "v-test"
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict_proba_batch(self, payloads):
+        self.calls += 1
+        return np.array([p["age"] / 100 for p in payloads])
+
+    def predict_proba(self, payload):
+        raise AssertionError("le chemin unitaire ne doit pas etre appele")
+
+
+def _employee(i, age, **kw):
+    values = {c: 0 for c in ALL_FEATURES}
+    values.update(genre=" f ", statut_marital="marié(e)", departement="", poste="Manager",
+                  heure_supplementaires="oui", domaine_etude="Autre", frequence_deplacement="Frequent")
+    values.update(kw, age=age)
+    return EmployeeFeatures(id_employee=i, a_quitte_l_entreprise="NON", **values)
+
+
+@pytest.fixture
+def engine():
+    eng = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=eng)
+    with Session(eng) as db:
+        db.add_all([_employee(1, 10), _employee(2, 50), _employee(3, 5, heure_supplementaires=" no ")])
+        db.commit()
+    return eng
+
+
+def test_normalize_frame_matches_normalize_payload():
+    rows = [
+        {"genre": " f ", "departement": "", "heure_supplementaires": "yes", "age": 30.0, "poste": None},
+        {"genre": "M", "departement": " Consulting", "heure_supplementaires": " 0 ", "age": 41.0, "poste": "x"},
+    ]
+    got = normalize_frame(pd.DataFrame(rows)).to_dict("records")
+    assert got == [_normalize_payload(r) for r in rows]
+
+
+def test_rebuild_employee_scores(engine):
+    svc = FakeService()
+    assert not scores_are_current(engine, svc.version)
+    assert rebuild_employee_scores(engine, svc) == 3
+    assert svc.calls == 1  # une seule passe vectorisee
+    assert scores_are_current(engine, svc.version)
+    assert not scores_are_current(engine, "autre-version")
+    with Session(engine) as db:
+        s1, s2 = db.get(EmployeeScore, 1), db.get(EmployeeScore, 2)
+    assert s1.proba == pytest.approx(0.10)
+    assert s1.pred_quitte_entreprise == "NON"
+    assert s2.pred_quitte_entreprise == "OUI"
+    assert s2.model_version == "v-test"
+    # une reconstruction remplace la table
+    assert rebuild_employee_scores(engine, svc) == 3
+
+
+def test_predict_by_id_reads_materialized_score(engine, monkeypatch):
+    from app.db.session import get_db
+    from app.main import create_app
+    from app.ml import serve as serve_mod
+
+    svc = FakeService()
+    rebuild_employee_scores(engine, svc)
+    monkeypatch.setattr(serve_mod.model_service, "version", svc.version)
+    monkeypatch.setattr(serve_mod.model_service, "predict_proba", svc.predict_proba)
+
+    SessionTest = sessionmaker(bind=engine)
+
+    def _db():
+        db = SessionTest()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = create_app()
+    app.dependency_overrides[get_db] = _db
+    client = TestClient(app)
+    headers = {"x-api-key": "test-key"}
+    r = client.get("/api/v1/predict/by-id/2", headers=headers)
+    assert r.status_code == 200
+    # version du modele qui a produit le score materialise
+    assert r.json() == {"employee_id": 2, "pred_quitte_entreprise": "OUI", "model_version": svc.version}
+
+    # version differente -> retour au calcul en direct
+    monkeypatch.setattr(serve_mod.model_service, "version", "nouvelle")
+    monkeypatch.setattr(serve_mod.model_service, "predict_proba", lambda payload: 0.0)
+    r = client.get("/api/v1/predict/by-id/2", headers=headers)
+    assert r.json()["pred_quitte_entreprise"] == "NON"
+    assert r.json()["model_version"] == "nouvelle"
+
+
+def test_predict_by_ids_single_query_and_model_call(engine, monkeypatch):
+    from sqlalchemy import event
+
+    from app.db.session import get_db
+    from app.main import create_app
+    from app.ml import serve as serve_mod
+
+    svc = FakeService()
+    monkeypatch.setattr(serve_mod.model_service, "predict_proba_batch", svc.predict_proba_batch)
+    monkeypatch.setattr(serve_mod.model_service, "predict_proba", svc.predict_proba)
+
+    SessionTest = sessionmaker(bind=engine)
+
+    def _db():
+        db = SessionTest()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    selects = []
+
+    def _count(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT") and "employee_features" in statement:
+            selects.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _count)
+    app = create_app()
+    app.dependency_overrides[get_db] = _db
+    client = TestClient(app)
+    r = client.post(
+        "/api/v1/predict/by-ids",
+        json={"employee_ids": [3, 99, 2, 1, 2]},
+        headers={"x-api-key": "test-key"},
+    )
+    event.remove(engine, "before_cursor_execute", _count)
+    assert r.status_code == 200
+    body = r.json()
+    # ordre de la requete conserve (doublons compris), ids manquants a part
+    assert [x["employee_id"] for x in body["results"]] == [3, 2, 1, 2]
+    assert [x["pred_quitte_entreprise"] for x in body["results"]] == ["NON", "OUI", "NON", "OUI"]
+    assert body["missing"] == [99]
+    assert svc.calls == 1
+    assert len(selects) == 1
+
+    r = client.post("/api/v1/predict/by-ids", json={"employee_ids": []}, headers={"x-api-key": "test-key"})
+    assert r.status_code == 422
@@ -0,0 +1,80 @@
+"""Tests pour le moteur d'arbres aplati (parité avec GradientBoostingClassifier)"""
+import os
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier
+
+from app.ml.serve import ModelService
+from app.ml.tree_engine import FlatGradientBoosting
+
+from tests.test_compiled import REAL_MODEL, _make_pipeline
+
+
+def _fit_gbc(n_classes=2, **params):
+    rng = np.random.RandomState(1)
+    X = rng.normal(size=(300, 6))
+    y = (X[:, 0] + X[:, 1] ** 2 > 0.5).astype(int) if n_classes == 2 else rng.randint(0, n_classes, 300)
+    return GradientBoostingClassifier(random_state=0, **params).fit(X, y), X
+
+
+@pytest.mark.parametrize("params", [
+    {"n_estimators": 30, "max_depth": 3},
+    {"n_estimators": 15, "max_depth": 5, "learning_rate": 0.3},
+    {"n_estimators": 10, "max_depth": 2, "init": "zero"},
+])
+def test_flat_engine_parity(params):
+    gbc, X = _fit_gbc(**params)
+    flat = FlatGradientBoosting(gbc)
+    # beaucoup plus de lignes que CHUNK_ROWS pour couvrir le decoupage
+    X_test = np.random.RandomState(2).normal(size=(1500, 6))
+    assert np.allclose(flat.predict_proba(X_test), gbc.predict_proba(X_test), atol=1e-12)
+    assert np.allclose(flat.decision_function(X), gbc.decision_function(X), atol=1e-12)
+    assert flat.parity_error(gbc) < 1e-12
+
+
+def test_flat_engine_rejects_multiclass_and_nan():
+    gbc, _ = _fit_gbc(n_classes=3, n_estimators=5)
+    with pytest.raises(ValueError):
+        FlatGradientBoosting(gbc)
+    gbc, _ = _fit_gbc(n_estimators=5)
+    flat = FlatGradientBoosting(gbc)
+    X = np.zeros((2, 6))
+    X[1, 3] = np.nan
+    with pytest.raises(ValueError):
+        flat.predict_proba(X)
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+def test_model_service_flat_engine(tmp_path, compiled):
+    pipe = _make_pipeline()
+    path = tmp_path / "pipe.pkl"
+    joblib.dump(pipe, path)
+    ref = ModelService(str(path)).load()
+    svc = ModelService(str(path), compiled=compiled, engine="flat").load()
+    assert svc.flat_active
+    assert svc.compiled_active is compiled
+    payloads = [
+        {"age": 30.0 + i, "distance": 1.5 * i, "frequence": ["AUCUN", "FREQUENT", None][i % 3],
+         "genre": "FM"[i % 2], "poste": ["MANAGER", "TECHLEAD", "X"][i % 3]}
+        for i in range(12)
+    ]
+    assert np.allclose(svc.predict_proba_batch(payloads), ref.predict_proba_batch(payloads), atol=1e-12)
+
+
+def test_model_service_flat_engine_falls_back_for_other_estimators(tmp_path):
+    from sklearn.ensemble import RandomForestClassifier
+    model = RandomForestClassifier(n_estimators=2, random_state=0).fit(np.random.rand(10, 3), [0, 1] * 5)
+    path = tmp_path / "rf.pkl"
+    joblib.dump(model, path)
+    svc = ModelService(str(path), engine="flat").load()
+    assert not svc.flat_active
+
+
+@pytest.mark.skipif(not os.path.exists(REAL_MODEL), reason="model.pkl absent")
+def test_flat_engine_parity_on_production_model():
+    pipe = joblib.load(REAL_MODEL)
+    flat = FlatGradientBoosting.from_model(pipe)
+    X = flat.sample_inputs(2000, seed=5)
+    assert flat.parity_error(pipe.steps[-1][1], X) < 1e-9